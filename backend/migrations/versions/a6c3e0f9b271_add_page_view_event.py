@@ -0,0 +1,40 @@
+"""add page_view_event table for beacon analytics
+
+Revision ID: a6c3e0f9b271
+Revises: f4d2b8e6a113
+Create Date: 2025-10-25 09:18:55.640127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e0f9b271'
+down_revision = 'f4d2b8e6a113'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'page_view_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=10), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=True),
+        sa.Column('visitor_hash', sa.String(length=16), nullable=True),
+        sa.Column('read_seconds', sa.Integer(), nullable=True),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('page_view_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_page_view_event_occurred_at'), ['occurred_at'], unique=False)
+        batch_op.create_index('idx_page_view_event_article', ['article_id', 'occurred_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('page_view_event', schema=None) as batch_op:
+        batch_op.drop_index('idx_page_view_event_article')
+        batch_op.drop_index(batch_op.f('ix_page_view_event_occurred_at'))
+
+    op.drop_table('page_view_event')
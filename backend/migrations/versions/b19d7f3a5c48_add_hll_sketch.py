@@ -0,0 +1,30 @@
+"""add hll_sketch table for local HyperLogLog sketches
+
+Revision ID: b19d7f3a5c48
+Revises: a6c3e0f9b271
+Create Date: 2025-10-25 16:47:30.285914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b19d7f3a5c48'
+down_revision = 'a6c3e0f9b271'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'hll_sketch',
+        sa.Column('key', sa.String(length=200), nullable=False),
+        sa.Column('registers', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('hll_sketch')
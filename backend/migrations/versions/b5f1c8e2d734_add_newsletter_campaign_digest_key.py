@@ -0,0 +1,28 @@
+"""add digest_key to newsletter_campaign
+
+Revision ID: b5f1c8e2d734
+Revises: a3d7e5c91f04
+Create Date: 2025-10-30 09:27:03.561842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5f1c8e2d734'
+down_revision = 'a3d7e5c91f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('newsletter_campaign', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('digest_key', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_newsletter_campaign_digest_key', ['digest_key'])
+
+
+def downgrade():
+    with op.batch_alter_table('newsletter_campaign', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_newsletter_campaign_digest_key', type_='unique')
+        batch_op.drop_column('digest_key')
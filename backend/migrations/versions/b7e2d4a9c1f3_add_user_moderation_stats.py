@@ -0,0 +1,165 @@
+"""add moderation_log and comment_report model tables and materialized user_moderation_stats
+
+Revision ID: b7e2d4a9c1f3
+Revises: 298a9c079f26
+Create Date: 2025-10-21 10:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a9c1f3'
+down_revision = '298a9c079f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    # moderation_log esisteva solo nello script SQL per PostgreSQL
+    if 'moderation_log' not in existing_tables:
+        op.create_table(
+            'moderation_log',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('action_type', sa.String(length=50), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('admin_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['admin_id'], ['user.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('moderation_log', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_moderation_log_user_id'), ['user_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_moderation_log_action_type'), ['action_type'], unique=False)
+            batch_op.create_index(batch_op.f('ix_moderation_log_created_at'), ['created_at'], unique=False)
+
+    # Anche comment_report (modello CommentReport) era solo nello script SQL
+    if 'comment_report' not in existing_tables:
+        op.create_table(
+            'comment_report',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('comment_id', sa.Integer(), nullable=False),
+            sa.Column('reporter_id', sa.Integer(), nullable=False),
+            sa.Column('reason', sa.String(length=100), nullable=False),
+            sa.Column('additional_info', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['comment_id'], ['comment.id'], ),
+            sa.ForeignKeyConstraint(['reporter_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('comment_id', 'reporter_id', name='unique_comment_report')
+        )
+        with op.batch_alter_table('comment_report', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_comment_report_comment_id'), ['comment_id'], unique=False)
+
+    op.create_table(
+        'user_moderation_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_comments', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_reports', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_warnings', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_bans', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_moderation_action', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('user_moderation_stats', schema=None) as batch_op:
+        batch_op.create_index('idx_user_moderation_stats_reports', ['total_reports'], unique=False)
+
+    # Backfill: ogni tabella aggregata una volta per utente, poi unita
+    user = sa.table('user', sa.column('id'))
+    comment = sa.table('comment', sa.column('id'), sa.column('user_id'))
+    report = sa.table('comment_report', sa.column('id'), sa.column('comment_id'))
+    log = sa.table(
+        'moderation_log',
+        sa.column('user_id'), sa.column('action_type'), sa.column('created_at'),
+    )
+    stats = sa.table(
+        'user_moderation_stats',
+        sa.column('user_id'), sa.column('total_comments'), sa.column('total_reports'),
+        sa.column('total_warnings'), sa.column('total_bans'),
+        sa.column('last_moderation_action'), sa.column('updated_at'),
+    )
+
+    comments_sq = (
+        sa.select(comment.c.user_id, sa.func.count(comment.c.id).label('total'))
+        .group_by(comment.c.user_id)
+        .subquery()
+    )
+    reports_sq = (
+        sa.select(comment.c.user_id, sa.func.count(report.c.id).label('total'))
+        .select_from(report.join(comment, comment.c.id == report.c.comment_id))
+        .group_by(comment.c.user_id)
+        .subquery()
+    )
+    actions_sq = (
+        sa.select(
+            log.c.user_id,
+            sa.func.sum(sa.case((log.c.action_type == 'warning', 1), else_=0)).label('warnings'),
+            sa.func.sum(sa.case((log.c.action_type == 'ban', 1), else_=0)).label('bans'),
+            sa.func.max(log.c.created_at).label('last_action'),
+        )
+        .group_by(log.c.user_id)
+        .subquery()
+    )
+
+    backfill = (
+        sa.select(
+            user.c.id,
+            sa.func.coalesce(comments_sq.c.total, 0),
+            sa.func.coalesce(reports_sq.c.total, 0),
+            sa.func.coalesce(actions_sq.c.warnings, 0),
+            sa.func.coalesce(actions_sq.c.bans, 0),
+            actions_sq.c.last_action,
+            sa.func.current_timestamp(),
+        )
+        .select_from(
+            user.outerjoin(comments_sq, comments_sq.c.user_id == user.c.id)
+            .outerjoin(reports_sq, reports_sq.c.user_id == user.c.id)
+            .outerjoin(actions_sq, actions_sq.c.user_id == user.c.id)
+        )
+    )
+    op.execute(stats.insert().from_select(
+        ['user_id', 'total_comments', 'total_reports', 'total_warnings',
+         'total_bans', 'last_moderation_action', 'updated_at'],
+        backfill,
+    ))
+
+
+def _created_here(inspector, table, index_name):
+    """
+    Tabella creata da questa revisione: gli indici dello script SQL hanno
+    prefisso idx_, quelli creati qui ix_ (le tabelle già presenti restano)
+    """
+    if table not in inspector.get_table_names():
+        return False
+    return index_name in {index['name'] for index in inspector.get_indexes(table)}
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    with op.batch_alter_table('user_moderation_stats', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_moderation_stats_reports')
+
+    op.drop_table('user_moderation_stats')
+
+    if _created_here(inspector, 'comment_report', 'ix_comment_report_comment_id'):
+        with op.batch_alter_table('comment_report', schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f('ix_comment_report_comment_id'))
+        op.drop_table('comment_report')
+
+    if _created_here(inspector, 'moderation_log', 'ix_moderation_log_user_id'):
+        with op.batch_alter_table('moderation_log', schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f('ix_moderation_log_created_at'))
+            batch_op.drop_index(batch_op.f('ix_moderation_log_action_type'))
+            batch_op.drop_index(batch_op.f('ix_moderation_log_user_id'))
+        op.drop_table('moderation_log')
@@ -0,0 +1,28 @@
+"""add event_key to page_view_event
+
+Revision ID: c2e6a8f4b913
+Revises: b5f1c8e2d734
+Create Date: 2025-11-03 10:12:47.218634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e6a8f4b913'
+down_revision = 'b5f1c8e2d734'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('page_view_event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_key', sa.String(length=32), nullable=True))
+        batch_op.create_unique_constraint('uq_page_view_event_event_key', ['event_key'])
+
+
+def downgrade():
+    with op.batch_alter_table('page_view_event', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_page_view_event_event_key', type_='unique')
+        batch_op.drop_column('event_key')
@@ -0,0 +1,28 @@
+"""add article.trending_score
+
+Revision ID: c5e8a2d47b16
+Revises: b19d7f3a5c48
+Create Date: 2025-10-26 10:12:44.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a2d47b16'
+down_revision = 'b19d7f3a5c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trending_score', sa.Float(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_article_trending_score'), ['trending_score'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_article_trending_score'))
+        batch_op.drop_column('trending_score')
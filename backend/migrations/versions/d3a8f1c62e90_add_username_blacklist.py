@@ -0,0 +1,80 @@
+"""add username_blacklist and cache_generation tables
+
+Revision ID: d3a8f1c62e90
+Revises: b7e2d4a9c1f3
+Create Date: 2025-10-22 09:41:17.502318
+
+"""
+import json
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f1c62e90'
+down_revision = 'b7e2d4a9c1f3'
+branch_labels = None
+depends_on = None
+
+
+SEED_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'utils', 'forbidden_usernames.json'
+)
+
+
+def upgrade():
+    op.create_table(
+        'cache_generation',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+    blacklist = op.create_table(
+        'username_blacklist',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=80), nullable=False),
+        sa.Column('match_type', sa.String(length=20), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('banned_user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['banned_user_id'], ['user.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('term', 'match_type', name='unique_blacklist_term')
+    )
+
+    # Seed dal file JSON usato finora
+    try:
+        with open(SEED_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+
+    rows = {}
+    for match_type, key in (('exact', 'exact_matches'), ('substring', 'substring_matches')):
+        for term in data.get(key, []):
+            rows[(term.lower(), match_type)] = {
+                'term': term.lower(), 'match_type': match_type, 'source': 'reserved',
+            }
+    # Gli username bannati finiti nel file diventano voci di tipo 'ban'
+    for banned in data.get('banned_users', []):
+        term = (banned.get('username') or '').lower()
+        if term:
+            rows[(term, 'substring')] = {
+                'term': term, 'match_type': 'substring', 'source': 'ban',
+                'reason': banned.get('reason'),
+            }
+
+    if rows:
+        op.bulk_insert(blacklist, [
+            {'reason': None, 'banned_user_id': None, **row} for row in rows.values()
+        ])
+
+
+def downgrade():
+    op.drop_table('username_blacklist')
+    op.drop_table('cache_generation')
@@ -0,0 +1,40 @@
+"""add leaderboard_entry table
+
+Revision ID: d7f1b3e59a24
+Revises: c5e8a2d47b16
+Create Date: 2025-10-26 15:38:02.771940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f1b3e59a24'
+down_revision = 'c5e8a2d47b16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'leaderboard_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('board', sa.String(length=30), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('entity_key', sa.String(length=255), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('label', sa.String(length=255), nullable=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('board', 'period', 'entity_key', name='unique_leaderboard_entry')
+    )
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.create_index('idx_leaderboard_rank', ['board', 'period', 'score'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_index('idx_leaderboard_rank')
+    op.drop_table('leaderboard_entry')
@@ -0,0 +1,43 @@
+"""add stripe_event table
+
+Revision ID: e2a9c4f71d38
+Revises: d7f1b3e59a24
+Create Date: 2025-10-27 10:12:44.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9c4f71d38'
+down_revision = 'd7f1b3e59a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stripe_event',
+        sa.Column('id', sa.String(length=255), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.create_index('idx_stripe_event_queue', ['status', 'received_at'], unique=False)
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.create_index('idx_donations_transaction_id', ['transaction_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('idx_donations_transaction_id')
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.drop_index('idx_stripe_event_queue')
+    op.drop_table('stripe_event')
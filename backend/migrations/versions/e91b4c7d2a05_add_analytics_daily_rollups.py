@@ -0,0 +1,51 @@
+"""add analytics_daily and analytics_rollup_day tables
+
+Revision ID: e91b4c7d2a05
+Revises: d3a8f1c62e90
+Create Date: 2025-10-23 15:20:08.734512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b4c7d2a05'
+down_revision = 'd3a8f1c62e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analytics_daily',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'metric', 'dimension', 'entity_id', name='unique_analytics_daily')
+    )
+    with op.batch_alter_table('analytics_daily', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_analytics_daily_lookup', ['metric', 'dimension', 'entity_id', 'day'], unique=False
+        )
+
+    op.create_table(
+        'analytics_rollup_day',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('closed', sa.Boolean(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade():
+    op.drop_table('analytics_rollup_day')
+
+    with op.batch_alter_table('analytics_daily', schema=None) as batch_op:
+        batch_op.drop_index('idx_analytics_daily_lookup')
+
+    op.drop_table('analytics_daily')
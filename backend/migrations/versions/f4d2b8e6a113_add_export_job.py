@@ -0,0 +1,49 @@
+"""add export_job table for background analytics exports
+
+Revision ID: f4d2b8e6a113
+Revises: e91b4c7d2a05
+Create Date: 2025-10-24 11:05:42.918340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d2b8e6a113'
+down_revision = 'e91b4c7d2a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'export_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('export_type', sa.String(length=50), nullable=False),
+        sa.Column('format', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('requested_by', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('total_rows', sa.Integer(), nullable=True),
+        sa.Column('rows_written', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bytes_written', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('parts_written', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by'], ['user.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('export_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_export_job_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('export_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_export_job_status'))
+
+    op.drop_table('export_job')
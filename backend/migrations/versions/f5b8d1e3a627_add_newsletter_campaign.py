@@ -0,0 +1,71 @@
+"""add newsletter_campaign and newsletter_delivery tables
+
+Revision ID: f5b8d1e3a627
+Revises: e2a9c4f71d38
+Create Date: 2025-10-28 09:41:15.220937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b8d1e3a627'
+down_revision = 'e2a9c4f71d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'newsletter_campaign',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('html_body', sa.Text(), nullable=False),
+        sa.Column('text_body', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rate_limit', sa.Float(), nullable=True),
+        sa.Column('concurrency', sa.Integer(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('total_recipients', sa.Integer(), nullable=False),
+        sa.Column('sent_count', sa.Integer(), nullable=False),
+        sa.Column('failed_count', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('newsletter_campaign', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_newsletter_campaign_status'), ['status'], unique=False)
+
+    op.create_table(
+        'newsletter_delivery',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('subscriber_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('claim_token', sa.String(length=32), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['campaign_id'], ['newsletter_campaign.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['subscriber_id'], ['newsletter_subscriber.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('campaign_id', 'subscriber_id', name='unique_newsletter_delivery')
+    )
+    with op.batch_alter_table('newsletter_delivery', schema=None) as batch_op:
+        batch_op.create_index('idx_newsletter_delivery_queue', ['campaign_id', 'status', 'subscriber_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('newsletter_delivery', schema=None) as batch_op:
+        batch_op.drop_index('idx_newsletter_delivery_queue')
+    op.drop_table('newsletter_delivery')
+    with op.batch_alter_table('newsletter_campaign', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_newsletter_campaign_status'))
+    op.drop_table('newsletter_campaign')
@@ -2,10 +2,23 @@
 Celery Configuration for Lit Investor Blog
 Gestisce task asincroni come invio email, processing immagini, etc.
 """
-from celery import Celery
+from celery import Celery, Task
+from flask import has_app_context
 import os
 
 
+_flask_app = None
+
+
+def get_flask_app():
+    """App Flask usata dai task (creata una sola volta per processo worker)"""
+    global _flask_app
+    if _flask_app is None:
+        from src.main import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
 def make_celery(app_name=__name__):
     """
     Crea istanza Celery
@@ -19,10 +32,19 @@ def make_celery(app_name=__name__):
     broker_url = os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
     result_backend = os.getenv('CELERY_RESULT_BACKEND', broker_url)
     
+    class FlaskTask(Task):
+        """Esegue ogni task dentro l'app context (necessario per db.session e modelli)"""
+        def __call__(self, *args, **kwargs):
+            if has_app_context():
+                return self.run(*args, **kwargs)
+            with get_flask_app().app_context():
+                return self.run(*args, **kwargs)
+    
     celery = Celery(
         app_name,
         broker=broker_url,
-        backend=result_backend
+        backend=result_backend,
+        task_cls=FlaskTask
     )
     
     # Configurazione
@@ -119,35 +141,35 @@ def send_contact_emails_task(user_email, user_name, user_message):
 
 
 @celery.task(name='tasks.process_uploaded_image')
-def process_uploaded_image_task(image_path, max_width=2000, quality=85):
+def process_uploaded_image_task(job_id):
     """
-    Processa immagine caricata (resize, optimize)
+    Converte un'immagine caricata (vedi image_jobs.stage_upload) e la
+    sostituisce atomicamente al file finale
     
     Args:
-        image_path: Path dell'immagine
-        max_width: Larghezza massima
-        quality: Qualità JPEG (1-100)
+        job_id: Token restituito dall'upload
     """
     try:
-        from PIL import Image
-        import os
+        from src.utils.convert_img import process_job
+        from src.utils.image_jobs import uploads_folder
+        
+        return {'status': process_job(uploads_folder(), job_id), 'job_id': job_id}
+    
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.resume_stale_uploads')
+def resume_stale_uploads_task():
+    """Rielabora gli upload rimasti in attesa e pulisce i vecchi errori (task schedulato)"""
+    try:
+        from src.utils.image_jobs import purge_errors, stale_job_ids
+        
+        job_ids = stale_job_ids()
+        for job_id in job_ids:
+            process_uploaded_image_task.delay(job_id)
         
-        # Apri immagine
-        with Image.open(image_path) as img:
-            # Convert to RGB se necessario
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize se troppo grande
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Salva ottimizzata
-            img.save(image_path, 'JPEG', quality=quality, optimize=True)
-        
-        return {'status': 'processed', 'path': image_path}
+        return {'status': 'resumed', 'jobs': job_ids, 'purged_errors': purge_errors()}
     
     except Exception as e:
         return {'status': 'failed', 'error': str(e)}
@@ -238,8 +260,250 @@ def generate_sitemap_task():
         return {'status': 'failed', 'error': str(e)}
 
 
+@celery.task(name='tasks.rollup_analytics')
+def rollup_analytics_task():
+    """
+    Aggiorna i rollup giornalieri analytics (task schedulato)
+    Chiude i giorni conclusi e ricalcola solo il giorno corrente;
+    sposta anche l'epoca del trending (rebase_trending)
+    """
+    try:
+        from src.extensions import db
+        from src.utils.analytics_rollup import rollup_pending
+        from src.utils.leaderboards import refresh_periods
+        from src.utils.trending import rebase_trending
+        
+        # Epoca del trending a ieri: il moltiplicatore del forward decay resta limitato
+        rebase_trending()
+        days = rollup_pending()
+        
+        # Classifiche a finestra ricostruite dai rollup appena aggiornati
+        refresh_periods()
+        db.session.commit()
+        return {'status': 'rolled_up', 'days': [day.isoformat() for day in days]}
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.run_export', acks_late=True, reject_on_worker_lost=True)
+def run_export_task(job_id):
+    """
+    Esegue un export job in chunk (vedi src/utils/export_jobs.py)
+    acks_late: se il worker muore il messaggio torna in coda e il job riprende
+    dall'ultimo checkpoint. Esaurito il time budget il task si riaccoda.
+    """
+    from src.utils.export_jobs import run_export_job
+    
+    outcome = run_export_job(job_id)
+    if outcome == 'requeue':
+        run_export_task.delay(job_id)
+    
+    return {'status': outcome, 'job_id': job_id}
+
+
+@celery.task(name='tasks.resume_stale_exports')
+def resume_stale_exports_task():
+    """Riaccoda gli export job con lease scaduto (task schedulato)"""
+    try:
+        from src.utils.export_jobs import stale_job_ids
+        
+        job_ids = stale_job_ids()
+        for job_id in job_ids:
+            run_export_task.delay(job_id)
+        
+        return {'status': 'resumed', 'jobs': job_ids}
+    
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.drain_analytics_events')
+def drain_analytics_events_task(batch_size=1000):
+    """
+    Svuota il buffer eventi del beacon analytics (task schedulato)
+    Inserimenti in blocco in page_view_event + aggiornamento views_count
+    """
+    try:
+        from src.utils.event_buffer import drain_events
+        from src.utils.page_views import ingest_events
+        
+        processed = drain_events(ingest_events, batch_size=batch_size)
+        return {'status': 'drained', 'events': processed}
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.process_stripe_events')
+def process_stripe_events_task(batch_size=100):
+    """
+    Applica alle donazioni gli eventi webhook Stripe in attesa, a blocchi
+    Accodato dal webhook e schedulato come rete di sicurezza
+    """
+    try:
+        from src.utils.stripe_events import process_all
+        
+        events, changed = process_all(batch_size=batch_size)
+        return {'status': 'processed', 'events': events, 'donations': changed}
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.dispatch_email_outbox')
+def dispatch_email_outbox_task(batch_size=50):
+    """
+    Invia le email transazionali in coda (email_outbox), a blocchi
+    Accodato dopo il commit delle route e schedulato come rete di sicurezza
+    """
+    try:
+        from src.utils.email_outbox import dispatch_pending
+        
+        return {'status': 'dispatched', **dispatch_pending(batch_size=batch_size)}
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.purge_email_outbox')
+def purge_email_outbox_task():
+    """Elimina le email inviate oltre il periodo di conservazione (task schedulato)"""
+    try:
+        from src.utils.email_outbox import purge_sent
+        
+        return {'status': 'purged', 'deleted': purge_sent()}
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.start_newsletter_campaign')
+def start_newsletter_campaign_task(campaign_id):
+    """
+    Avvia (o riprende) una campagna newsletter: un chord con un task di
+    invio per chunk di iscritti e la chiusura della campagna come callback
+    """
+    from celery import chord
+    from src.utils.newsletter_campaigns import finish_campaign, prepare_campaign
+    
+    chunks = prepare_campaign(campaign_id)
+    if chunks is None:
+        return {'status': 'skipped', 'campaign_id': campaign_id}
+    if not chunks:
+        return {'status': finish_campaign(campaign_id), 'campaign_id': campaign_id}
+    
+    chord(
+        send_newsletter_chunk_task.s(campaign_id, first_id, last_id)
+        for first_id, last_id in chunks
+    )(finish_newsletter_campaign_task.s(campaign_id))
+    return {'status': 'dispatched', 'campaign_id': campaign_id, 'chunks': len(chunks)}
+
+
+@celery.task(name='tasks.send_newsletter_chunk', acks_late=True, reject_on_worker_lost=True)
+def send_newsletter_chunk_task(campaign_id, first_id, last_id):
+    """Invia un chunk di una campagna (riprende dai destinatari in attesa)"""
+    try:
+        from src.utils.newsletter_campaigns import send_chunk
+        
+        return send_chunk(campaign_id, first_id, last_id)
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.finish_newsletter_campaign')
+def finish_newsletter_campaign_task(results, campaign_id):
+    """Callback del chord: chiude la campagna o la rilancia sui destinatari rimasti"""
+    from src.utils.newsletter_campaigns import finish_campaign
+    
+    outcome = finish_campaign(campaign_id, results)
+    if outcome == 'continue':
+        start_newsletter_campaign_task.delay(campaign_id)
+    
+    return {'status': outcome, 'campaign_id': campaign_id}
+
+
+@celery.task(name='tasks.send_newsletter_digest')
+def send_newsletter_digest_task():
+    """
+    Digest settimanale: una campagna per ogni combinazione distinta di
+    categorie seguite dagli iscritti (task schedulato)
+    """
+    try:
+        from src.utils.newsletter_digest import build_digest
+        
+        digests = build_digest()
+        return {
+            'status': 'queued',
+            'campaigns': [digest['campaign_id'] for digest in digests],
+            'recipients': sum(digest['recipients'] for digest in digests),
+        }
+    
+    except Exception as e:
+        from src.extensions import db
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery.task(name='tasks.resume_stale_campaigns')
+def resume_stale_campaigns_task():
+    """Riprende le campagne newsletter con lease scaduto (task schedulato)"""
+    try:
+        from src.utils.newsletter_campaigns import stale_campaign_ids
+        
+        campaign_ids = stale_campaign_ids()
+        for campaign_id in campaign_ids:
+            start_newsletter_campaign_task.delay(campaign_id)
+        
+        return {'status': 'resumed', 'campaigns': campaign_ids}
+    
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e)}
+
+
 # Configurazione schedule (beat)
 celery.conf.beat_schedule = {
+    'drain-analytics-events': {
+        'task': 'tasks.drain_analytics_events',
+        'schedule': 60.0,  # Ogni minuto
+    },
+    'process-stripe-events': {
+        'task': 'tasks.process_stripe_events',
+        'schedule': 60.0,  # Ogni minuto (eventi non accodati dal webhook)
+    },
+    'dispatch-email-outbox': {
+        'task': 'tasks.dispatch_email_outbox',
+        'schedule': 60.0,  # Ogni minuto (nuovi tentativi e email non accodate)
+    },
+    'resume-stale-exports': {
+        'task': 'tasks.resume_stale_exports',
+        'schedule': 600.0,  # Ogni 10 minuti
+    },
+    'resume-stale-campaigns': {
+        'task': 'tasks.resume_stale_campaigns',
+        'schedule': 600.0,  # Ogni 10 minuti
+    },
+    'resume-stale-uploads': {
+        'task': 'tasks.resume_stale_uploads',
+        'schedule': 600.0,  # Ogni 10 minuti
+    },
+    'rollup-analytics-hourly': {
+        'task': 'tasks.rollup_analytics',
+        'schedule': 3600.0,  # Ogni ora
+    },
     'cleanup-sessions-daily': {
         'task': 'tasks.cleanup_old_sessions',
         'schedule': 86400.0,  # Ogni 24 ore
@@ -248,6 +512,14 @@ celery.conf.beat_schedule = {
         'task': 'tasks.generate_sitemap',
         'schedule': 86400.0,  # Ogni 24 ore
     },
+    'send-newsletter-digest-weekly': {
+        'task': 'tasks.send_newsletter_digest',
+        'schedule': 604800.0,  # Ogni 7 giorni (NEWSLETTER_DIGEST_DAYS)
+    },
+    'purge-email-outbox-daily': {
+        'task': 'tasks.purge_email_outbox',
+        'schedule': 86400.0,  # Ogni 24 ore
+    },
 }
 
 
@@ -263,16 +535,18 @@ def subscribe():
     
     return jsonify({'message': 'Subscribed'})
 
-# Dopo (asincrono - non blocca):
-from src.celery_app import send_newsletter_confirmation_task
+# Dopo (outbox - non blocca, l'email è salvata con l'iscrizione):
+from src.utils.email_outbox import queue_message, schedule_dispatch
 
 @newsletter_bp.route('/subscribe', methods=['POST'])
 def subscribe():
     email = request.json['email']
     # ... validazione ...
     
-    # Invia email in background
-    send_newsletter_confirmation_task.delay(email)
+    db.session.add(NewsletterSubscriber(email=email))
+    queue_message("newsletter_confirmation", email)
+    db.session.commit()
+    schedule_dispatch()  # Invio in background (tasks.dispatch_email_outbox)
     
     return jsonify({'message': 'Subscribed'})  # Ritorna subito!
 """
@@ -18,6 +18,14 @@ class Config:
     # File Upload
     MAX_CONTENT_LENGTH = 26 * 1024 * 1024  # 26MB
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'static', 'uploads', 'avatars')
+    # Processi locali per la conversione delle immagini quando Celery non è disponibile
+    IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+    # Varianti responsive delle copertine: larghezze (px) e formati (avif solo se supportato da Pillow)
+    IMAGE_WIDTHS = [int(w) for w in os.getenv('IMAGE_WIDTHS', '320,640,960,1200,1920').split(',') if w.strip()]
+    IMAGE_FORMATS = [f.strip().lower() for f in os.getenv('IMAGE_FORMATS', 'webp,avif').split(',') if f.strip()]
+    
+    # Export in background (file non pubblici, scaricabili solo dagli admin)
+    EXPORT_FOLDER = os.getenv('EXPORT_FOLDER', os.path.join(os.path.dirname(__file__), 'exports'))
     
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -38,11 +46,40 @@ class Config:
     SMTP_PORT = int(os.getenv('SMTP_PORT', 465))
     SMTP_USER = os.getenv('SMTP_USER')
     SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+    SMTP_SECURITY = os.getenv('SMTP_SECURITY')  # ssl, starttls, none (default: ssl su 465, altrimenti starttls)
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+    SMTP_IDLE_TIMEOUT = int(os.getenv('SMTP_IDLE_TIMEOUT', 60))
     FROM_EMAIL = os.getenv('FROM_EMAIL')
     FROM_NAME = os.getenv('FROM_NAME', 'Rio Capital Blog')
     CONTACT_ADMIN_EMAIL = os.getenv('CONTACT_ADMIN_EMAIL')
     EMAIL_TEST_MODE = os.getenv('EMAIL_TEST_MODE', 'false').lower() == 'true'
     
+    # Campagne newsletter: tetto di invii al secondo (tutti i worker),
+    # connessioni SMTP parallele per task e iscritti per chunk del chord
+    NEWSLETTER_RATE_LIMIT = float(os.getenv('NEWSLETTER_RATE_LIMIT', 10))
+    NEWSLETTER_CONCURRENCY = int(os.getenv('NEWSLETTER_CONCURRENCY', 4))
+    NEWSLETTER_CHUNK_SIZE = int(os.getenv('NEWSLETTER_CHUNK_SIZE', 500))
+    
+    # Digest: giorni coperti e articoli per numero
+    NEWSLETTER_DIGEST_DAYS = int(os.getenv('NEWSLETTER_DIGEST_DAYS', 7))
+    NEWSLETTER_DIGEST_MAX_ARTICLES = int(os.getenv('NEWSLETTER_DIGEST_MAX_ARTICLES', 10))
+    SITE_URL = os.getenv('SITE_URL', 'https://tuosito.com')  # link agli articoli nelle email
+    
+    # Redis (cache e contatori condivisi tra worker; opzionale in sviluppo)
+    REDIS_URL = os.getenv('REDIS_URL')
+    
+    # Buffer eventi analytics su file (usato quando Redis non è disponibile)
+    ANALYTICS_EVENT_DIR = os.getenv(
+        'ANALYTICS_EVENT_DIR', os.path.join(os.path.dirname(__file__), 'database', 'analytics_events')
+    )
+    
+    # Trending: epoca del forward decay ed emivita del punteggio.
+    # I punteggi salvati crescono come 2^(ore dall'epoca / emivita): con 48h
+    # spostare l'epoca (e lanciare 'flask rebuild-trending') entro ~5 anni.
+    TRENDING_EPOCH = os.getenv('TRENDING_EPOCH', '2025-01-01')
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 48))
+    
     # Compression
     COMPRESS_ALGORITHM = ['br', 'gzip', 'deflate']
     COMPRESS_BR_LEVEL = 4
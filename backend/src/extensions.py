@@ -2,9 +2,17 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from authlib.integrations.flask_client import OAuth
+from flask_limiter import Limiter
+
+from src.utils.rate_limiter import get_rate_limit_key
 
 db = SQLAlchemy()
 oauth = OAuth()
 
-# Limiter verrà inizializzato in main.py
-limiter = None
+# Limiter verrà inizializzato in main.py (init_limiter)
+# Nessun limite di default: valgono solo quelli dichiarati sulle route
+limiter = Limiter(
+    key_func=get_rate_limit_key,
+    strategy="fixed-window",  # o "moving-window" per più accuracy
+    headers_enabled=True,  # Aggiunge header X-RateLimit-*
+)
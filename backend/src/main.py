@@ -16,6 +16,8 @@ from src.extensions import db, oauth
 from src.models.user import User
 from src.models.category import Category
 from src.middleware.security import add_security_headers, add_hsts_header
+from src.utils.redis_cache import cache
+from src.utils.rate_limiter import init_limiter
 
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
@@ -37,19 +39,23 @@ from src.routes.seo import seo_bp
 from src.routes.moderation import moderation_bp
 
 
-def create_app(config_name=None):
+def create_app(config_name=None, config_overrides=None):
     """
     Application Factory Function
     
     Args:
         config_name: Nome della configurazione ('development', 'production', 'testing')
                      Se None, usa FLASK_ENV dalla variabile d'ambiente
+        config_overrides: Valori di configurazione che sostituiscono quelli della classe
+                          (es: database temporaneo per 'flask analytics-bench')
     """
     app = Flask(__name__)
 
     # Carica configurazione dal file config.py
     config_class = get_config(config_name)
     app.config.from_object(config_class)
+    if config_overrides:
+        app.config.update(config_overrides)
     
     # Inizializza e valida configurazione
     config_class.init_app(app)
@@ -77,6 +83,8 @@ def create_app(config_name=None):
 
     db.init_app(app)
     oauth.init_app(app)
+    cache.init_app(app)
+    init_limiter(app)
     Migrate(app, db)
     
     # CORS con configurazione sicura
@@ -217,6 +225,16 @@ def create_app(config_name=None):
     app.cli.add_command(create_admin)
     app.cli.add_command(seed_db)
     app.cli.add_command(check_security)
+    app.cli.add_command(rebuild_moderation_stats)
+    app.cli.add_command(backfill_analytics)
+    app.cli.add_command(rebuild_trending_command)
+    app.cli.add_command(analytics_bench)
+    app.cli.add_command(stripe_simulate)
+    app.cli.add_command(process_stripe_events)
+    app.cli.add_command(smtp_check)
+    app.cli.add_command(send_campaign_command)
+    app.cli.add_command(dispatch_emails)
+    app.cli.add_command(build_digest_command)
 
     return app
 
@@ -249,7 +267,7 @@ def create_admin(username, email, password):
 @click.command(name="seed-db")
 @with_appcontext
 def seed_db():
-    """Popola il database con le categorie di default."""
+    """Popola il database con le categorie di default e la blacklist username."""
     if Category.query.count() == 0:
         admin_user = User.query.filter_by(role="admin").first()
         if admin_user:
@@ -290,6 +308,278 @@ def seed_db():
     else:
         print("✅ Le categorie esistono già.")
 
+    from src.utils.username_blacklist import invalidate_blacklist, seed_blacklist
+
+    added = seed_blacklist()
+    db.session.commit()
+    if added:
+        invalidate_blacklist()
+        print(f"✅ Blacklist username: {added} parole riservate importate.")
+
+
+@click.command(name="rebuild-moderation-stats")
+@with_appcontext
+def rebuild_moderation_stats():
+    """Ricalcola da zero la tabella user_moderation_stats."""
+    from src.utils.moderation_stats import refresh_moderation_stats
+
+    refresh_moderation_stats()
+    db.session.commit()
+    print("✅ Statistiche di moderazione ricalcolate.")
+
+
+@click.command(name="backfill-analytics")
+@click.option("--days", default=365, show_default=True, help="Giorni di storico da aggregare.")
+@click.option("--start", "start_date", default=None, help="Data iniziale YYYY-MM-DD (sostituisce --days).")
+@with_appcontext
+def backfill_analytics(days, start_date):
+    """Ricalcola i rollup analytics giornalieri e le classifiche per lo storico."""
+    from datetime import datetime, timedelta
+    from src.utils.analytics_rollup import backfill, rollup_pending
+    from src.utils.leaderboards import refresh_all_time, refresh_periods
+
+    if start_date:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    else:
+        start = datetime.utcnow().date() - timedelta(days=days)
+
+    processed = backfill(start)
+    rollup_pending()
+    refresh_all_time()
+    refresh_periods()
+    db.session.commit()
+    print(f"✅ Rollup analytics ricalcolati per {processed} giorni (da {start.isoformat()}).")
+
+
+@click.command(name="rebuild-trending")
+@with_appcontext
+def rebuild_trending_command():
+    """Ricalcola trending_score di tutti gli articoli dalle tabelle sorgente."""
+    from src.utils.trending import rebuild_trending
+
+    updated = rebuild_trending()
+    db.session.commit()
+    print(f"✅ Trending ricalcolato per {updated} articoli.")
+
+
+@click.command(name="analytics-bench")
+@click.option("--users", type=int, default=None, help="Utenti da generare.")
+@click.option("--articles", type=int, default=None, help="Articoli da generare.")
+@click.option("--likes", type=int, default=None, help="Like da generare.")
+@click.option("--comments", type=int, default=None, help="Commenti da generare.")
+@click.option("--shares", type=int, default=None, help="Condivisioni da generare.")
+@click.option("--donations", type=int, default=None, help="Donazioni da generare.")
+@click.option("--views", type=int, default=None, help="Visualizzazioni da generare.")
+@click.option("--seed", "seed_value", type=int, default=42, show_default=True, help="Seed del generatore casuale.")
+def analytics_bench(users, articles, likes, comments, shares, donations, views, seed_value):
+    """Benchmark degli endpoint analytics su un database temporaneo (budget di query)."""
+    import sys
+    from src.utils.analytics_bench import failures, run_bench
+
+    volumes = {
+        name: value
+        for name, value in {
+            "users": users, "articles": articles, "likes": likes, "comments": comments,
+            "shares": shares, "donations": donations, "views": views,
+        }.items()
+        if value is not None
+    }
+
+    results = run_bench(volumes, seed_value=seed_value)
+
+    print(f"\n{'ENDPOINT':<52} {'HTTP':>4} {'QUERY':>9} {'RIGHE':>9} {'MS':>9}")
+    for result in results:
+        marker = "❌" if result in failures(results) else "✅"
+        print(
+            f"{result.endpoint:<52} {result.status:>4} "
+            f"{result.queries:>4}/{result.budget:<4} {result.rows:>9} "
+            f"{result.seconds * 1000:>9.1f} {marker}"
+        )
+
+    failed = failures(results)
+    if failed:
+        print(f"\n❌ {len(failed)} endpoint fuori budget o in errore.")
+        sys.exit(1)
+    print("\n✅ Tutti gli endpoint entro il budget di query.")
+
+
+@click.command(name="process-stripe-events")
+@click.option("--batch-size", default=100, show_default=True, help="Eventi per blocco.")
+@with_appcontext
+def process_stripe_events(batch_size):
+    """Applica alle donazioni gli eventi webhook Stripe in attesa."""
+    from src.utils.stripe_events import process_all
+
+    processed, changed = process_all(batch_size=batch_size)
+    print(f"✅ {processed} eventi applicati, {changed} donazioni aggiornate.")
+
+
+@click.command(name="stripe-simulate")
+@click.option("--count", default=20, show_default=True, help="Pagamenti completati da simulare.")
+@click.option("--amount", default=10.0, show_default=True, help="Importo di ogni pagamento (EUR).")
+@click.option("--refunds", default=0, show_default=True, help="Pagamenti da rimborsare subito dopo.")
+@click.option("--duplicates", default=1, show_default=True, help="Consegne di ogni evento (idempotenza).")
+@click.option("--process/--no-process", default=True, show_default=True, help="Applica subito gli eventi (senza worker Celery).")
+@with_appcontext
+def stripe_simulate(count, amount, refunds, duplicates, process):
+    """Invia al webhook eventi Stripe fittizi firmati con STRIPE_WEBHOOK_SECRET."""
+    import json
+    import sys
+    import time
+    from flask import current_app
+    from src.utils.stripe_events import process_all, sign_payload, simulated_event
+
+    secret = current_app.config.get("STRIPE_WEBHOOK_SECRET")
+    if not secret:
+        print("❌ STRIPE_WEBHOOK_SECRET non configurato.")
+        sys.exit(1)
+
+    events = []
+    for i in range(count):
+        completed = simulated_event(
+            amount=amount, donor_name=f"Donatore simulato {i}", donor_email=f"sim{i}@example.com"
+        )
+        events.append(completed)
+        if i < refunds:
+            events.append(simulated_event(
+                "charge.refunded", amount=amount,
+                payment_intent=completed["data"]["object"]["payment_intent"],
+            ))
+
+    client = current_app.test_client()
+    statuses = {}
+    started = time.perf_counter()
+    for event in events:
+        payload = json.dumps(event)
+        for _ in range(duplicates):
+            response = client.post(
+                "/api/stripe/webhook",
+                data=payload,
+                content_type="application/json",
+                headers={"Stripe-Signature": sign_payload(payload, secret)},
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    deliveries = len(events) * duplicates
+    print(f"✅ {deliveries} consegne in {elapsed:.2f}s ({elapsed / max(deliveries, 1) * 1000:.1f} ms ciascuna), HTTP {statuses}.")
+
+    if process:
+        processed, changed = process_all()
+        print(f"✅ {processed} eventi applicati, {changed} donazioni aggiornate.")
+
+
+@click.command(name="smtp-check")
+@click.option("--to", "to_email", required=True, help="Destinatario dei messaggi di prova.")
+@click.option("--count", default=3, show_default=True, help="Messaggi da inviare.")
+def smtp_check(to_email, count):
+    """Invia messaggi di prova tramite il pool SMTP e mostra le connessioni aperte."""
+    import sys
+    import time
+    from src.utils.email_service import EmailService
+
+    service = EmailService()
+    print(f"SMTP {service.smtp_host}:{service.smtp_port} ({service.smtp_security})")
+
+    started = time.perf_counter()
+    for i in range(count):
+        success, message = service.send_email(
+            to_email, f"Prova SMTP {i + 1}/{count}", f"<p>Messaggio di prova {i + 1}</p>", f"Messaggio di prova {i + 1}"
+        )
+        if not success:
+            print(f"❌ {message}")
+            sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    stats = service.pool.stats
+    print(f"✅ {count} messaggi in {elapsed:.2f}s: connessioni aperte {stats['opened']}, riconnessioni {stats['reconnects']}.")
+    service.pool.close_all()
+
+
+@click.command(name="send-campaign")
+@click.argument("campaign_id", type=int)
+@with_appcontext
+def send_campaign_command(campaign_id):
+    """Invia (o riprende) una campagna newsletter nel processo corrente, senza Celery."""
+    import sys
+    from src.extensions import db
+    from src.models.newsletter import NewsletterCampaign
+    from src.utils.newsletter_campaigns import queue_campaign, run_campaign
+
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    if campaign is None:
+        print("❌ Campagna non trovata.")
+        sys.exit(1)
+    if campaign.status == "draft":
+        queue_campaign(campaign, dispatch=False)
+
+    outcome = run_campaign(campaign_id)
+    if outcome is None:
+        print("❌ Campagna già in invio su un altro worker o non inviabile.")
+        sys.exit(1)
+
+    db.session.refresh(campaign)
+    stats = campaign.to_dict()
+    print(
+        f"✅ Campagna {campaign_id}: {outcome}, {stats['sent_count']}/{stats['total_recipients']} inviati, "
+        f"{stats['failed_count']} falliti, {stats['throughput'] or 0} messaggi/s."
+    )
+
+
+@click.command(name="build-digest")
+@click.option("--days", type=int, default=None, help="Giorni coperti (default NEWSLETTER_DIGEST_DAYS).")
+@click.option("--dry-run", is_flag=True, help="Mostra i gruppi di destinatari senza creare campagne.")
+@click.option("--send", is_flag=True, help="Invia nel processo corrente invece di accodare a Celery.")
+@with_appcontext
+def build_digest_command(days, dry_run, send):
+    """Crea il digest della newsletter: una campagna per combinazione di categorie."""
+    from src.utils.newsletter_digest import build_digest, plan_digest
+    from src.utils.newsletter_campaigns import run_campaign
+
+    if dry_run:
+        period_start, period_end, _, digests = plan_digest(days=days)
+        print(f"Periodo {period_start:%Y-%m-%d} - {period_end:%Y-%m-%d}: {len(digests)} digest distinti")
+        for articles, recipients, personalized in digests:
+            label = "personalizzato" if personalized else "generale"
+            print(f"  {len(articles)} articoli, {len(recipients)} destinatari ({label})")
+        return
+
+    digests = build_digest(days=days, dispatch=not send)
+    for digest in digests:
+        if send and digest["created"]:
+            run_campaign(digest["campaign_id"])
+        state = "creata" if digest["created"] else "già esistente"
+        print(
+            f"✅ Campagna {digest['campaign_id']} ({state}): "
+            f"{digest['articles']} articoli, {digest['recipients']} destinatari"
+        )
+    if not digests:
+        print("Nessun articolo pubblicato nel periodo: nessun digest.")
+
+
+@click.command(name="dispatch-emails")
+@click.option("--batch-size", default=50, show_default=True, help="Email per blocco.")
+@click.option("--watch", is_flag=True, help="Resta attivo e controlla la coda ogni --interval secondi.")
+@click.option("--interval", default=5.0, show_default=True, help="Secondi tra due controlli con --watch.")
+@with_appcontext
+def dispatch_emails(batch_size, watch, interval):
+    """Invia le email transazionali in coda (outbox), senza Celery."""
+    import time
+    from src.utils.email_outbox import dispatch_pending, outbox_stats
+
+    while True:
+        totals = dispatch_pending(batch_size=batch_size)
+        if totals["sent"] or totals["retry"] or totals["failed"] or not watch:
+            print(
+                f"✅ {totals['sent']} inviate, {totals['retry']} da ritentare, "
+                f"{totals['failed']} fallite in {totals['seconds']}s."
+            )
+        if not watch:
+            break
+        time.sleep(interval)
+
+    print(f"📬 Outbox: {outbox_stats()}")
+
 
 @click.command(name="check-security")
 @with_appcontext
@@ -0,0 +1,142 @@
+# LitInvestorBlog-backend/src/models/analytics.py
+
+from datetime import datetime
+from src.extensions import db
+
+class AnalyticsDaily(db.Model):
+    """
+    Rollup giornaliero delle metriche analytics
+    Una riga per giorno e metrica, a livello di sito (entity_id = 0), di
+    singolo articolo (dimension = 'article', entity_id = article.id) o di
+    utente (dimension = 'user', entity_id = user.id).
+    """
+    __tablename__ = "analytics_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    metric = db.Column(db.String(50), nullable=False)
+    dimension = db.Column(db.String(20), nullable=False, default="site")  # site, article, user
+    entity_id = db.Column(db.Integer, nullable=False, default=0)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "metric", "dimension", "entity_id", name="unique_analytics_daily"),
+        db.Index("idx_analytics_daily_lookup", "metric", "dimension", "entity_id", "day"),
+    )
+
+    def to_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "metric": self.metric,
+            "dimension": self.dimension,
+            "entity_id": self.entity_id,
+            "value": self.value,
+        }
+
+
+class AnalyticsRollupDay(db.Model):
+    """Giorni già aggregati in analytics_daily (closed = giorno concluso, non più ricalcolato)"""
+    __tablename__ = "analytics_rollup_day"
+
+    day = db.Column(db.Date, primary_key=True)
+    closed = db.Column(db.Boolean, nullable=False, default=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ExportJob(db.Model):
+    """
+    Export in background eseguito da Celery
+    last_id/bytes_written/parts_written sono il checkpoint dell'ultimo chunk
+    scritto: un worker che riprende il job tronca il file a bytes_written e
+    riparte dalla riga successiva a last_id.
+    """
+    __tablename__ = "export_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    export_type = db.Column(db.String(50), nullable=False)
+    format = db.Column(db.String(20), nullable=False)  # csv, ndjson, parquet
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)  # pending, running, completed, failed
+    requested_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    file_path = db.Column(db.String(500), nullable=True)
+    total_rows = db.Column(db.Integer, nullable=True)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    bytes_written = db.Column(db.BigInteger, nullable=False, default=0)
+    parts_written = db.Column(db.Integer, nullable=False, default=0)
+    last_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        progress = None
+        if self.status == "completed":
+            progress = 100.0
+        elif self.total_rows:
+            progress = round(min(self.rows_written / self.total_rows, 1) * 100, 1)
+
+        return {
+            "id": self.id,
+            "type": self.export_type,
+            "format": self.format,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "rows_written": self.rows_written,
+            "progress": progress,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+
+class PageViewEvent(db.Model):
+    """
+    Evento di traffico (visualizzazione, tempo di lettura o condivisione)
+    Scritto in blocco dal drainer del buffer eventi, mai dentro la richiesta.
+    """
+    __tablename__ = "page_view_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_key = db.Column(db.String(32), nullable=True, unique=True)  # id dell'evento nel buffer
+    event_type = db.Column(db.String(10), nullable=False)  # view, read, share
+    article_id = db.Column(db.Integer, nullable=True)
+    visitor_hash = db.Column(db.String(16), nullable=True)
+    read_seconds = db.Column(db.Integer, nullable=True)
+    occurred_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index("idx_page_view_event_article", "article_id", "occurred_at"),
+    )
+
+
+class HLLSketch(db.Model):
+    """Sketch HyperLogLog salvato nel database (fallback locale quando Redis non c'è)"""
+    __tablename__ = "hll_sketch"
+
+    key = db.Column(db.String(200), primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LeaderboardEntry(db.Model):
+    """
+    Classifiche pre-aggregate (autori, utenti attivi, donatori)
+    period = 'all' è mantenuta in modo incrementale dalle scritture; 7d/30d/90d/1y
+    sono ricostruite dai rollup giornalieri dal job periodico.
+    """
+    __tablename__ = "leaderboard_entry"
+
+    id = db.Column(db.Integer, primary_key=True)
+    board = db.Column(db.String(30), nullable=False)  # authors, active_users, donors
+    period = db.Column(db.String(10), nullable=False)  # all, 7d, 30d, 90d, 1y
+    entity_key = db.Column(db.String(255), nullable=False)  # user.id o email del donatore
+    entity_id = db.Column(db.Integer, nullable=True)
+    label = db.Column(db.String(255), nullable=True)
+    score = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("board", "period", "entity_key", name="unique_leaderboard_entry"),
+        db.Index("idx_leaderboard_rank", "board", "period", "score"),
+    )
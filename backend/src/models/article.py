@@ -7,6 +7,7 @@ from sqlalchemy import event
 
 from src.models.like import ArticleLike
 from src.utils.file_helpers import delete_article_folder
+from src.utils.image_jobs import image_manifest
 
 class Article(db.Model):
     __tablename__ = "article"
@@ -28,6 +29,8 @@ class Article(db.Model):
     featured = db.Column(db.Boolean, default=False, nullable=False)
     likes_count = db.Column(db.Integer, default=0)
     views_count = db.Column(db.Integer, default=0)
+    # Punteggio forward-decay (vedi src/utils/trending.py)
+    trending_score = db.Column(db.Float, nullable=False, default=0.0, index=True)
     show_author_contacts = db.Column(db.Boolean, nullable=False, default=False)
 
     author = db.relationship("User", back_populates="articles")
@@ -46,11 +49,15 @@ class Article(db.Model):
     def __repr__(self):
         return f"<Article {self.title}>"
 
-    def to_dict(self):
+    def to_dict(self, comments_count=None, user_has_liked=None):
+        """
+        Serializza l'articolo
+        comments_count / user_has_liked possono essere passati già calcolati
+        (es: con una query raggruppata per una lista di articoli)
+        """
         from src.models.comment import Comment
         
-        user_has_liked = False
-        if "user_id" in session:
+        if user_has_liked is None and "user_id" in session:
             user_has_liked = db.session.query(
                 ArticleLike.query.filter_by(
                     user_id=session["user_id"], article_id=self.id
@@ -58,10 +65,11 @@ class Article(db.Model):
             ).scalar()
         
         # Conta TUTTI i commenti approvati (top-level + risposte)
-        comments_count = Comment.query.filter_by(
-            article_id=self.id, 
-            status="approved"
-        ).count()
+        if comments_count is None:
+            comments_count = Comment.query.filter_by(
+                article_id=self.id, 
+                status="approved"
+            ).count()
 
         return {
             "id": self.id,
@@ -70,6 +78,7 @@ class Article(db.Model):
             "content": self.content,
             "excerpt": self.excerpt,
             "image_url": self.image_url,
+            "image_variants": image_manifest(self.image_url),
             "author_id": self.author_id,
             "author_name": (
                 self.author.to_dict().get("full_name") if self.author else None
@@ -87,7 +96,7 @@ class Article(db.Model):
             "show_author_contacts": self.show_author_contacts,
             "author_email": self.author.email if self.author else None,
             "author_linkedin_url": self.author.linkedin_url if self.author else None,
-            "user_has_liked": user_has_liked,
+            "user_has_liked": bool(user_has_liked),
         }
 
 
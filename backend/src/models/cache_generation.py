@@ -0,0 +1,20 @@
+# LitInvestorBlog-backend/src/models/cache_generation.py
+
+from datetime import datetime
+from src.extensions import db
+
+class CacheGeneration(db.Model):
+    """
+    Contatore di generazione per cache in-process condivise tra worker
+    Ogni worker confronta il valore con quello usato per costruire la propria
+    cache e la ricostruisce solo quando è cambiato. Usato come fallback
+    quando Redis non è disponibile.
+    """
+    __tablename__ = "cache_generation"
+
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheGeneration {self.name}={self.value}>"
@@ -15,11 +15,15 @@ class Donation(db.Model):
     message = Column(Text, nullable=True)
     anonymous = Column(Boolean, default=False)
     payment_method = Column(String(50), nullable=False)
-    transaction_id = Column(String(255), nullable=True)
+    transaction_id = Column(String(255), nullable=True)  # checkout session, poi payment intent
     status = Column(String(20), default="pending")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("idx_donations_transaction_id", "transaction_id"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -35,3 +39,26 @@ class Donation(db.Model):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+class StripeEvent(db.Model):
+    """
+    Evento webhook Stripe ricevuto (tabella di idempotenza)
+    La chiave primaria è l'id dell'evento: le consegne ripetute da Stripe
+    non vengono salvate due volte. Il payload grezzo è applicato alle
+    donazioni in un secondo momento dal consumer Celery.
+    """
+    __tablename__ = "stripe_event"
+
+    id = Column(String(255), primary_key=True)  # evt_...
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, processed, ignored, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("idx_stripe_event_queue", "status", "received_at"),
+    )
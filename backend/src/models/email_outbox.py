@@ -0,0 +1,49 @@
+# LitInvestorBlog-backend/src/models/email_outbox.py
+
+from datetime import datetime
+from src.extensions import db
+
+class EmailOutbox(db.Model):
+    """
+    Email transazionale da inviare, scritta nella stessa transazione della
+    modifica che la genera (iscrizione, contatto, warning, ban)
+    pending -> sending (claim con claim_token) -> sent | pending (nuovo
+    tentativo a next_attempt_at) | failed dopo l'ultimo tentativo.
+    """
+    __tablename__ = "email_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # newsletter_confirmation, contact_confirmation, ...
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    text_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("idx_email_outbox_queue", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.kind} {self.to_email} {self.status}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "to_email": self.to_email,
+            "subject": self.subject,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+        }
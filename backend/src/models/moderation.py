@@ -0,0 +1,60 @@
+# LitInvestorBlog-backend/src/models/moderation.py
+
+from datetime import datetime
+from src.extensions import db
+
+class ModerationLog(db.Model):
+    __tablename__ = "moderation_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    action_type = db.Column(db.String(50), nullable=False, index=True)  # warning, ban, unban, etc.
+    message = db.Column(db.Text, nullable=False)
+    admin_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    user = db.relationship("User", foreign_keys=[user_id])
+    admin = db.relationship("User", foreign_keys=[admin_id])
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "action_type": self.action_type,
+            "message": self.message,
+            "admin_id": self.admin_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class UserModerationStats(db.Model):
+    """
+    Statistiche di moderazione materializzate per utente
+    Sostituisce la vista moderation_stats: aggiornata in modo incrementale
+    su segnalazioni, warning e ban invece di essere ricalcolata a ogni lettura.
+    """
+    __tablename__ = "user_moderation_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    total_comments = db.Column(db.Integer, nullable=False, default=0)
+    total_reports = db.Column(db.Integer, nullable=False, default=0)
+    total_warnings = db.Column(db.Integer, nullable=False, default=0)
+    total_bans = db.Column(db.Integer, nullable=False, default=0)
+    last_moderation_action = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("idx_user_moderation_stats_reports", "total_reports"),
+    )
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "total_comments": self.total_comments,
+            "total_reports": self.total_reports,
+            "total_warnings": self.total_warnings,
+            "total_bans": self.total_bans,
+            "last_moderation_action": (
+                self.last_moderation_action.isoformat() if self.last_moderation_action else None
+            ),
+        }
@@ -24,6 +24,86 @@ class NewsletterSubscriber(db.Model):
             "preferences": self.preferences,
         }
 
+class NewsletterCampaign(db.Model):
+    """
+    Invio di un numero della newsletter a tutti gli iscritti attivi
+    I contatori sono aggiornati con UPDATE relativi dai task di invio;
+    lease_expires_at segnala un invio orfano (worker morto) da riprendere.
+    """
+    __tablename__ = "newsletter_campaign"
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    text_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="draft", index=True)  # draft, queued, sending, completed, cancelled, failed
+    rate_limit = db.Column(db.Float, nullable=True)  # messaggi al secondo (tutti i worker)
+    concurrency = db.Column(db.Integer, nullable=True)  # connessioni SMTP per task
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    total_recipients = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    # Numero del digest: destinatari scelti dal digest builder, non tutti gli iscritti
+    digest_key = db.Column(db.String(64), nullable=True, unique=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        throughput = None
+        if self.started_at and self.sent_count:
+            elapsed = ((self.completed_at or datetime.utcnow()) - self.started_at).total_seconds()
+            throughput = round(self.sent_count / elapsed, 2) if elapsed > 0 else None
+
+        processed = self.sent_count + self.failed_count
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "status": self.status,
+            "rate_limit": self.rate_limit,
+            "concurrency": self.concurrency,
+            "total_recipients": self.total_recipients,
+            "sent_count": self.sent_count,
+            "failed_count": self.failed_count,
+            "progress": (
+                round(min(processed / self.total_recipients, 1) * 100, 1)
+                if self.total_recipients else None
+            ),
+            "throughput": throughput,  # messaggi al secondo
+            "error": self.error,
+            "digest_key": self.digest_key,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+class NewsletterDelivery(db.Model):
+    """
+    Stato dell'invio di una campagna a un iscritto
+    pending -> sending (claim con claim_token) -> sent | failed.
+    Le righe rimaste in 'sending' dopo un crash diventano 'interrupted' e
+    non vengono ritentate: il messaggio potrebbe essere già partito.
+    """
+    __tablename__ = "newsletter_delivery"
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey("newsletter_campaign.id", ondelete="CASCADE"), nullable=False)
+    subscriber_id = db.Column(db.Integer, db.ForeignKey("newsletter_subscriber.id", ondelete="CASCADE"), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sending, sent, failed, interrupted
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("campaign_id", "subscriber_id", name="unique_newsletter_delivery"),
+        db.Index("idx_newsletter_delivery_queue", "campaign_id", "status", "subscriber_id"),
+    )
+
 class Donation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -0,0 +1,35 @@
+# LitInvestorBlog-backend/src/models/username_blacklist.py
+
+from datetime import datetime
+from src.extensions import db
+
+class UsernameBlacklistEntry(db.Model):
+    __tablename__ = "username_blacklist"
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(80), nullable=False)
+    match_type = db.Column(db.String(20), nullable=False, default="substring")  # exact, substring
+    source = db.Column(db.String(20), nullable=False, default="reserved")  # reserved, ban
+    reason = db.Column(db.Text, nullable=True)
+    banned_user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("term", "match_type", name="unique_blacklist_term"),
+    )
+
+    banned_user = db.relationship("User")
+
+    def __repr__(self):
+        return f"<UsernameBlacklistEntry {self.match_type}:{self.term}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "term": self.term,
+            "match_type": self.match_type,
+            "source": self.source,
+            "reason": self.reason,
+            "banned_user_id": self.banned_user_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
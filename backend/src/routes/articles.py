@@ -16,6 +16,10 @@ from src.models.user import User
 from src.extensions import db
 from src.routes.auth import login_required, author_required
 from src.utils.file_helpers import delete_image_file
+from src.utils.image_jobs import image_manifest
+from src.utils.leaderboards import record_article, record_comment
+from src.utils.response_cache import invalidate_analytics_cache
+from src.utils.trending import bump_trending, current_score, trending_articles
 
 articles_bp = Blueprint("articles", __name__)
 
@@ -145,13 +149,44 @@ def get_articles():
         print(f"Errore in get_articles: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
+@articles_bp.route("/trending", methods=["GET"])
+def get_trending_articles():
+    """Articoli di tendenza: top-K sull'indice di trending_score"""
+    try:
+        limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+        articles = trending_articles(limit=limit)
+
+        return jsonify({
+            "articles": [
+                {
+                    "id": article.id,
+                    "title": article.title,
+                    "slug": article.slug,
+                    "excerpt": article.excerpt,
+                    "image_url": article.image_url,
+                    "image_variants": image_manifest(article.image_url),
+                    "category_name": article.category.name if article.category else None,
+                    "category_color": article.category.color if article.category else None,
+                    "published_at": article.published_at.isoformat() if article.published_at else None,
+                    "created_at": article.created_at.isoformat() if article.created_at else None,
+                    "likes_count": article.likes_count,
+                    "views_count": article.views_count,
+                    "trending_score": round(current_score(article.trending_score), 3),
+                }
+                for article in articles
+            ]
+        }), 200
+
+    except Exception as e:
+        print(f"Errore in get_trending_articles: {e}")
+        return jsonify({"error": "An internal error occurred"}), 500
+
 @articles_bp.route("/<int:article_id>", methods=["GET"])
 def get_article(article_id):
     try:
         article = Article.query.get_or_404(article_id)
 
-        article.views_count += 1
-        db.session.commit()
+        # Le visualizzazioni arrivano dal beacon /api/analytics/events
 
         comments = (
             Comment.query.filter_by(article_id=article_id)
@@ -172,8 +207,7 @@ def get_article_by_slug(slug):
     try:
         article = Article.query.filter_by(slug=slug).first_or_404()
 
-        article.views_count += 1
-        db.session.commit()
+        # Le visualizzazioni arrivano dal beacon /api/analytics/events
 
         comments = (
             Comment.query.filter_by(article_id=article.id)
@@ -246,7 +280,9 @@ def create_article():
         )
 
         db.session.add(article)
+        record_article(session["user_id"])
         db.session.commit()
+        invalidate_analytics_cache()
 
         return (
             jsonify(
@@ -307,6 +343,7 @@ def update_article(article_id):
             article.updated_at = datetime.utcnow()
 
         db.session.commit()
+        invalidate_analytics_cache()
 
         return (
             jsonify(
@@ -335,8 +372,10 @@ def delete_article(article_id):
                 403,
             )
 
+        record_article(article.author_id, delta=-1)
         db.session.delete(article)
         db.session.commit()
+        invalidate_analytics_cache()
 
         return jsonify({"message": "Articolo eliminato con successo"}), 200
 
@@ -359,6 +398,7 @@ def like_article(article_id):
         Article.query.filter_by(id=article_id).update(
             {"likes_count": Article.likes_count + 1}
         )
+        bump_trending(article_id, "like")
         db.session.commit()
 
         article = Article.query.get(article_id)
@@ -376,6 +416,7 @@ def like_article(article_id):
             Article.query.filter_by(id=article_id).update(
                 {"likes_count": Article.likes_count - 1}
             )
+            bump_trending(article_id, "like", at=like_to_delete.created_at, remove=True)
             db.session.commit()
 
             article = Article.query.get(article_id)
@@ -430,6 +471,8 @@ def add_comment(article_id):
         )
 
         db.session.add(comment)
+        bump_trending(article_id, "comment")
+        record_comment(session["user_id"])
         db.session.commit()
 
         return (
@@ -1,6 +1,5 @@
-import os
 import re
-import json
+import secrets
 from flask import Blueprint, request, jsonify, session, url_for, redirect
 from src.models.user import User
 from src.extensions import db
@@ -8,6 +7,7 @@ from flask_login import login_user, logout_user, login_required, current_user #
 from functools import wraps
 from src.extensions import oauth
 from sqlalchemy import func
+from src.utils.username_blacklist import get_matcher
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -32,19 +32,6 @@ def author_required(f):
 
     return decorated_function
 
-try:
-    base_dir = os.path.dirname(__file__)
-    json_path = os.path.join(base_dir, '..', 'utils', 'forbidden_usernames.json')
-    with open(json_path, 'r') as f:
-        forbidden_data = json.load(f)
-        # Converti le liste in 'set' per ricerche molto più veloci (O(1) invece di O(n))
-        FORBIDDEN_EXACT_MATCHES = set(forbidden_data.get("exact_matches", []))
-        FORBIDDEN_SUBSTRINGS = set(forbidden_data.get("substring_matches", []))
-except (FileNotFoundError, json.JSONDecodeError):
-    print("ATTENZIONE: Impossibile caricare 'forbidden_usernames.json'. I controlli saranno limitati.")
-    FORBIDDEN_EXACT_MATCHES = set()
-    FORBIDDEN_SUBSTRINGS = set()
-
 @auth_bp.route("/register", methods=["POST"])
 def register():
     try:
@@ -200,7 +187,7 @@ def complete_oauth_registration():
             first_name=oauth_profile.get("first_name"),
             last_name=oauth_profile.get("last_name"),
         )
-        random_password = os.urandom(16).hex()
+        random_password = secrets.token_hex(16)
         new_user.set_password(random_password)
 
         db.session.add(new_user)
@@ -232,13 +219,15 @@ def check_username():
             return jsonify({"available": False, "message": "Username must be 3-20 characters long."}), 200
         return jsonify({"available": False, "message": "Can contain letters, numbers, and underscores, but not at the start or end."}), 200
 
-    # --- CONTROLLO PROFESSIONALE DELLE PAROLE PROIBITE (dal JSON) ---
+    # --- CONTROLLO PROFESSIONALE DELLE PAROLE PROIBITE (blacklist nel DB) ---
+    matcher = get_matcher()
+
     # Controllo 1: Corrispondenza esatta
-    if username_lower in FORBIDDEN_EXACT_MATCHES:
+    if matcher.is_reserved(username_lower):
         return jsonify({"available": False, "message": "This username is a reserved word."}), 200
 
     # Controllo 2: Contenuto proibito (substring)
-    if any(sub in username_lower for sub in FORBIDDEN_SUBSTRINGS):
+    if matcher.contains_restricted(username_lower):
         return jsonify({"available": False, "message": "This username contains a restricted word."}), 200
 
     # Controllo 3: Esistenza nel database (case-insensitive)
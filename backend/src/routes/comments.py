@@ -2,12 +2,18 @@
 
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import desc, or_
-from src.models.comment import Comment, CommentLike
+from sqlalchemy import delete, desc, or_, select, update
+from src.models.comment import Comment, CommentLike, CommentReport
 from src.models.article import Article
 from src.models.user import User
 from src.extensions import db
 from src.middleware.auth import admin_required
+from src.utils.analytics_rollup import reopen_days
+from src.utils.db_helpers import chunked, supports_returning
+from src.utils.moderation_stats import bump_moderation_stats, refresh_moderation_stats
+from src.utils.redis_cache import invalidate_cache
+from src.utils.leaderboards import record_comment, refresh_users
+from src.utils.trending import bump_trending
 import logging
 import re
 
@@ -16,6 +22,9 @@ comments_bp = Blueprint("comments", __name__)
 # Blacklist parole offensive (esempio base)
 BLACKLIST_WORDS = ["spam", "offensive_word_1", "offensive_word_2"]
 
+# Azioni di moderazione bulk che aggiornano lo stato (la cancellazione è gestita a parte)
+BULK_MODERATION_STATUSES = {"approve": "approved", "reject": "rejected"}
+
 def contains_blacklisted_words(text):
     """Controlla se il testo contiene parole nella blacklist"""
     text_lower = text.lower()
@@ -124,6 +133,9 @@ def create_comment():
         )
 
         db.session.add(comment)
+        bump_moderation_stats(current_user.id, comments=1)
+        bump_trending(data["article_id"], "comment")
+        record_comment(current_user.id)
         db.session.commit()
 
         # TODO: Invia notifiche agli utenti menzionati (@username)
@@ -193,9 +205,8 @@ def delete_comment(comment_id):
         if comment.user_id != current_user.id and current_user.role != "admin":
             return jsonify({"success": False, "message": "Non autorizzato"}), 403
 
-        # Elimina anche tutte le risposte (cascade)
-        db.session.delete(comment)
-        db.session.commit()
+        # Elimina anche le risposte dirette (come la moderazione bulk)
+        _delete_comments([comment.id])
 
         return jsonify({"success": True, "message": "Commento eliminato"})
 
@@ -253,8 +264,6 @@ def toggle_comment_like(comment_id):
 def report_comment(comment_id):
     """Segnala un commento"""
     try:
-        from src.models.comment import CommentReport
-        
         comment = Comment.query.get_or_404(comment_id)
         
         # Gestisci il caso in cui non ci sia body JSON
@@ -288,7 +297,8 @@ def report_comment(comment_id):
         
         # Aggiorna anche il flag reported nel commento per compatibilità
         comment.reported = True
-        
+
+        bump_moderation_stats(comment.user_id, reports=1)
         db.session.commit()
 
         return jsonify({"success": True, "message": "Comment reported successfully"})
@@ -369,8 +379,7 @@ def moderate_comment(comment_id):
         elif action == "unreport":
             comment.reported = False
         elif action == "delete":
-            db.session.delete(comment)
-            db.session.commit()
+            _delete_comments([comment.id])
             return jsonify({"success": True, "message": "Commento eliminato"})
         else:
             return jsonify({"success": False, "message": "Azione non valida"}), 400
@@ -397,7 +406,7 @@ def moderate_comment(comment_id):
 def moderate_comments_bulk():
     """Modera più commenti contemporaneamente (ADMIN)"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         comment_ids = data.get("comment_ids", [])
         action = data.get("action")
         reason = data.get("reason", "")
@@ -405,29 +414,161 @@ def moderate_comments_bulk():
         if not comment_ids or not action:
             return jsonify({"success": False, "message": "Dati mancanti"}), 400
 
-        comments = Comment.query.filter(Comment.id.in_(comment_ids)).all()
+        if action not in BULK_MODERATION_STATUSES and action != "delete":
+            return jsonify({"success": False, "message": "Azione non valida"}), 400
+
+        try:
+            comment_ids = sorted({int(comment_id) for comment_id in comment_ids})
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "ID commenti non validi"}), 400
 
-        for comment in comments:
+        if action == "delete":
+            rows = _delete_comments(comment_ids)
+        else:
+            values = {"status": BULK_MODERATION_STATUSES[action]}
             if action == "approve":
-                comment.status = "approved"
-                comment.reported = False
-            elif action == "reject":
-                comment.status = "rejected"
-            elif action == "delete":
-                db.session.delete(comment)
-                continue
-
+                values["reported"] = False
             if reason:
-                comment.moderation_reason = reason
+                values["moderation_reason"] = reason
 
-        db.session.commit()
+            # Statement set-based a chunk invece di caricare e modificare ogni
+            # commento nella sessione; un solo commit: tutto o niente
+            rows = []
+            for chunk in chunked(comment_ids):
+                rows.extend(_bulk_update_comments(chunk, values))
+            db.session.commit()
+            _after_bulk_moderation(rows)
 
-        return jsonify({
+        # Solo i commenti selezionati, non le risposte eliminate con loro
+        requested = set(comment_ids)
+        processed = sum(1 for row in rows if row.id in requested)
+
+        response = {
             "success": True,
-            "message": f"{len(comment_ids)} commenti processati",
-        })
+            "message": f"{processed} commenti processati",
+            "processed": processed,
+        }
+        if action in BULK_MODERATION_STATUSES:
+            response["status"] = BULK_MODERATION_STATUSES[action]
+
+        return jsonify(response)
 
     except Exception as e:
         db.session.rollback()
         logging.error(f"Errore nella moderazione bulk: {e}")
         return jsonify({"success": False, "message": "Errore interno del server"}), 500
+
+
+def _bulk_update_comments(ids, values):
+    """
+    Aggiorna un chunk di commenti con un solo UPDATE ... WHERE id IN (...)
+
+    Returns:
+        Lista di righe (id, article_id, user_id) dei commenti aggiornati
+    """
+    stmt = (
+        update(Comment)
+        .where(Comment.id.in_(ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+    if supports_returning("update"):
+        return db.session.execute(
+            stmt.returning(Comment.id, Comment.article_id, Comment.user_id)
+        ).all()
+
+    rows = db.session.execute(
+        select(Comment.id, Comment.article_id, Comment.user_id).where(Comment.id.in_(ids))
+    ).all()
+    db.session.execute(stmt)
+    return rows
+
+
+def _delete_comments(ids):
+    """
+    Elimina commenti e risposte dirette in una sola transazione (commit incluso)
+    Usata da tutte le eliminazioni: utente, moderazione singola e bulk.
+
+    Returns:
+        Lista di righe (id, article_id, user_id, created_at) dei commenti
+        eliminati, risposte comprese
+    """
+    rows = []
+    for chunk in chunked(ids):
+        rows.extend(_bulk_delete_comments(chunk))
+
+    # DELETE Core: il listener dell'ORM non li vede, i rollup vanno riaperti qui
+    reopen_days(row.created_at for row in rows)
+    # Conteggi di commenti e segnalazioni ricalcolati una volta per richiesta
+    author_ids = {row.user_id for row in rows}
+    refresh_moderation_stats(author_ids)
+    refresh_users(author_ids)
+    db.session.commit()
+    _after_bulk_moderation(rows)
+    return rows
+
+
+def _bulk_delete_comments(ids):
+    """
+    Elimina un chunk di commenti insieme a risposte, like e segnalazioni
+
+    Le righe figlie vengono eliminate con DELETE espliciti invece di affidarsi
+    al cascade dell'ORM, che caricherebbe ogni oggetto nella sessione.
+
+    Returns:
+        Lista di righe (id, article_id, user_id, created_at) dei commenti eliminati
+    """
+    # Un solo livello di nidificazione: le risposte dirette sono sufficienti
+    reply_ids = db.session.scalars(
+        select(Comment.id).where(Comment.parent_id.in_(ids), Comment.id.notin_(ids))
+    ).all()
+
+    deleted = []
+    # Prima le risposte, poi i commenti padre (vincolo FK su parent_id)
+    for batch in list(chunked(reply_ids)) + [ids]:
+        db.session.execute(
+            delete(CommentLike)
+            .where(CommentLike.comment_id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            delete(CommentReport)
+            .where(CommentReport.comment_id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+
+        stmt = (
+            delete(Comment)
+            .where(Comment.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        if supports_returning("delete"):
+            deleted.extend(
+                db.session.execute(
+                    stmt.returning(Comment.id, Comment.article_id, Comment.user_id, Comment.created_at)
+                ).all()
+            )
+        else:
+            deleted.extend(
+                db.session.execute(
+                    select(Comment.id, Comment.article_id, Comment.user_id, Comment.created_at).where(
+                        Comment.id.in_(batch)
+                    )
+                ).all()
+            )
+            db.session.execute(stmt)
+
+    return deleted
+
+
+def _after_bulk_moderation(rows):
+    """
+    Manutenzione eseguita una sola volta dopo il commit
+
+    Args:
+        rows: Righe (id, article_id, user_id) dei commenti toccati
+    """
+    article_ids = {row.article_id for row in rows}
+    for article_id in article_ids:
+        invalidate_cache(f"comments:article:{article_id}:*")
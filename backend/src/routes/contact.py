@@ -2,7 +2,8 @@
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from src.utils.email_service import email_service
+from src.extensions import db
+from src.utils.email_outbox import queue_message, schedule_dispatch
 
 contact_bp = Blueprint("contact", __name__)
 
@@ -33,23 +34,11 @@ def submit_contact():
 
         print(f"Nuovo messaggio di contatto: {contact_data}")
 
-        # Invia email conferma al mittente
-        success, msg = email_service.send_contact_confirmation(
-            data["email"],
-            data["name"],
-            data["message"]
-        )
-        if not success:
-            print(f"Errore invio conferma: {msg}")
-
-        # Invia notifica al team
-        success, msg = email_service.send_contact_notification(
-            data["email"],
-            data["name"],
-            data["message"]
-        )
-        if not success:
-            print(f"Errore invio notifica: {msg}")
+        # Conferma al mittente e notifica al team, inviate dal dispatcher
+        queue_message("contact_confirmation", data["email"], data["name"], data["message"])
+        queue_message("contact_notification", data["email"], data["name"], data["message"])
+        db.session.commit()
+        schedule_dispatch()
 
         return (
             jsonify(
@@ -59,4 +48,5 @@ def submit_contact():
         )
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -1,13 +1,16 @@
 # LitInvestorBlog-backend/src/routes/donations.py
 
-from flask import Blueprint, request, jsonify, make_response
-from sqlalchemy import desc, func
+from flask import Blueprint, request, jsonify
+from sqlalchemy import desc, func, or_, select
 from src.models.donation import Donation
 from src.extensions import db
 from src.middleware.auth import admin_required
+from src.utils.donation_feed import FEED_SIZE, get_feed, refresh_donation_feed
+from src.utils.exporters import EXPORT_FORMATS, stream_export
+from src.utils.leaderboards import record_donation
+from src.utils.response_cache import invalidate_analytics_cache
+from src.utils.stats import count_if, max_if, run_stats, sum_if, table_stats
 import logging
-import csv
-import io
 from datetime import datetime, timedelta
 
 donations_bp = Blueprint("donations", __name__)
@@ -44,14 +47,18 @@ def create_donation():
             status="pending",
         )
 
+        # Flusso simulato (senza Stripe): un solo commit, il flush assegna l'id
         db.session.add(donation)
-        db.session.commit()
+        db.session.flush()
 
         donation.status = "completed"
         donation.transaction_id = (
             f"TXN_{donation.id}_{int(datetime.utcnow().timestamp())}"
         )
+        record_donation(donation)
         db.session.commit()
+        invalidate_analytics_cache()
+        refresh_donation_feed()
 
         return (
             jsonify(
@@ -109,57 +116,46 @@ def get_donations():
 def get_donation_stats():
     """Ottieni statistiche donazioni"""
     try:
-        total_donations = (
-            db.session.query(func.count(Donation.id))
-            .filter_by(status="completed")
-            .scalar()
-        )
-        total_amount = (
-            db.session.query(func.sum(Donation.amount))
-            .filter_by(status="completed")
-            .scalar()
-            or 0
-        )
-
         current_month = datetime.utcnow().replace(
             day=1, hour=0, minute=0, second=0, microsecond=0
         )
-        this_month_donations = (
-            db.session.query(func.count(Donation.id))
-            .filter(Donation.status == "completed")
-            .filter(Donation.created_at >= current_month)
-            .scalar()
-        )
-        this_month_amount = (
-            db.session.query(func.sum(Donation.amount))
-            .filter(Donation.status == "completed")
-            .filter(Donation.created_at >= current_month)
-            .scalar()
-            or 0
-        )
-
-        top_donor = (
-            db.session.query(
-                Donation.donor_email,
-                Donation.donor_name,
-                func.sum(Donation.amount).label("total_amount"),
-            )
-            .filter(
-                Donation.status == "completed",
-                not Donation.anonymous,
-                Donation.donor_email.isnot(None),
-            )
-            .group_by(Donation.donor_email, Donation.donor_name)
-            .order_by(desc("total_amount"))
-            .first()
-        )
+        this_month = Donation.created_at >= current_month
+
+        # Totali e mese corrente in una sola scansione; top donor in parallelo
+        stats = run_stats({
+            "totals": table_stats(
+                Donation,
+                where=(Donation.status == "completed",),
+                total_donations=count_if(),
+                total_amount=sum_if(Donation.amount),
+                max_donation=max_if(Donation.amount),
+                this_month_donations=count_if(this_month),
+                this_month_amount=sum_if(Donation.amount, this_month),
+            ),
+            "top_donor": (
+                select(
+                    Donation.donor_email,
+                    Donation.donor_name,
+                    func.sum(Donation.amount).label("total_amount"),
+                )
+                .where(
+                    Donation.status == "completed",
+                    or_(Donation.anonymous.is_(False), Donation.anonymous.is_(None)),
+                    Donation.donor_email.isnot(None),
+                )
+                .group_by(Donation.donor_email, Donation.donor_name)
+                .order_by(desc("total_amount"))
+                .limit(1)
+            ),
+        })
+        totals = stats["totals"]
+        top_donor = stats["top_donor"]
 
-        max_donation = (
-            db.session.query(func.max(Donation.amount))
-            .filter_by(status="completed")
-            .scalar()
-            or 0
-        )
+        total_donations = totals["total_donations"]
+        total_amount = totals["total_amount"] or 0
+        this_month_donations = totals["this_month_donations"]
+        this_month_amount = totals["this_month_amount"] or 0
+        max_donation = totals["max_donation"] or 0
 
         return jsonify(
             {
@@ -175,9 +171,9 @@ def get_donation_stats():
                     "max_donation": max_donation,
                     "top_donor": (
                         {
-                            "email": top_donor.donor_email,
-                            "name": top_donor.donor_name,
-                            "total_amount": float(top_donor.total_amount),
+                            "email": top_donor["donor_email"],
+                            "name": top_donor["donor_name"],
+                            "total_amount": float(top_donor["total_amount"]),
                         }
                         if top_donor
                         else None
@@ -194,44 +190,16 @@ def get_donation_stats():
 def get_recent_donations():
     """Ottieni donazioni recenti pubbliche (per homepage)"""
     try:
-        limit = min(request.args.get("limit", 10, type=int), 50)
+        limit = min(request.args.get("limit", 10, type=int), FEED_SIZE)
 
-        # Prendi tutte le donazioni completate (sia anonime che non)
-        donations = (
-            Donation.query.filter(
-                Donation.status == "completed"
-            )
-            .order_by(desc(Donation.created_at))
-            .limit(limit)
-            .all()
-        )
-
-        # Conta il numero totale di donatori unici (completati)
-        total_donors = (
-            db.session.query(func.count(Donation.id))
-            .filter(Donation.status == "completed")
-            .scalar()
-            or 0
-        )
-
-        public_donations = []
-        for donation in donations:
-            public_donations.append(
-                {
-                    "id": donation.id,
-                    "donor_name": donation.donor_name if not donation.anonymous else None,
-                    "anonymous": donation.anonymous,
-                    "amount": donation.amount,
-                    "message": donation.message,
-                    "avatar_url": None,  # Non abbiamo avatar per ora
-                    "created_at": donation.created_at.isoformat(),
-                }
-            )
+        # Feed in memoria, ricostruito solo alle variazioni delle donazioni
+        feed = get_feed()
 
         return jsonify({
-            "success": True, 
-            "donations": public_donations,
-            "total_donors": total_donors
+            "success": True,
+            "donations": feed["donations"][:limit],
+            "total_donors": feed["total_donors"],
+            "total_amount": feed["total_amount"],
         })
 
     except Exception as e:
@@ -241,60 +209,21 @@ def get_recent_donations():
 @donations_bp.route("/export", methods=["GET"])
 @admin_required
 def export_donations():
-    """Esporta donazioni in CSV"""
+    """Esporta donazioni in CSV o NDJSON (streaming, più recenti prima)"""
     try:
         format_type = request.args.get("format", "csv")
 
-        donations = Donation.query.order_by(desc(Donation.created_at)).all()
-
-        if format_type == "csv":
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            writer.writerow(
-                [
-                    "ID",
-                    "Nome Donatore",
-                    "Email",
-                    "Importo",
-                    "Valuta",
-                    "Messaggio",
-                    "Anonimo",
-                    "Metodo Pagamento",
-                    "ID Transazione",
-                    "Stato",
-                    "Data Creazione",
-                ]
-            )
-
-            for donation in donations:
-                writer.writerow(
-                    [
-                        donation.id,
-                        donation.donor_name or "",
-                        donation.donor_email or "",
-                        donation.amount,
-                        donation.currency,
-                        donation.message or "",
-                        "Sì" if donation.anonymous else "No",
-                        donation.payment_method,
-                        donation.transaction_id or "",
-                        donation.status,
-                        donation.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    ]
-                )
-
-            output.seek(0)
+        if format_type not in EXPORT_FORMATS:
+            return jsonify({"success": False, "message": "Formato non supportato"}), 400
 
-            response = make_response(output.getvalue())
-            response.headers["Content-Type"] = "text/csv"
-            response.headers["Content-Disposition"] = (
-                f"attachment; filename=donazioni_{datetime.now().strftime('%Y%m%d')}.csv"
-            )
-
-            return response
-
-        return jsonify({"success": False, "message": "Formato non supportato"}), 400
+        return stream_export(
+            "donations",
+            format_type,
+            f"donazioni_{datetime.now().strftime('%Y%m%d')}",
+            after_id=request.args.get("after_id", type=int),
+            limit=request.args.get("limit", type=int),
+            descending=True,
+        )
 
     except Exception as e:
         logging.error(f"Errore nell'export donazioni: {e}")
@@ -319,7 +248,10 @@ def refund_donation(donation_id):
             )
 
         donation.status = "refunded"
+        record_donation(donation, refund=True)
         db.session.commit()
+        invalidate_analytics_cache()
+        refresh_donation_feed()
 
         return jsonify(
             {
@@ -3,48 +3,126 @@
 from flask import Blueprint, jsonify, request
 from flask_login import current_user, login_required
 from src.extensions import db
-from sqlalchemy import text
+from sqlalchemy import and_, func, or_, select
 from src.models.user import User
-from src.models.comment import Comment
+from src.models.article import Article
+from src.models.comment import Comment, CommentReport
+from src.models.moderation import ModerationLog, UserModerationStats
 from src.middleware.auth import admin_required
-from src.utils.email_service import email_service
-import json
+from src.utils.db_helpers import group_concat
+from src.utils.email_outbox import queue_message, schedule_dispatch
+from src.utils.moderation_stats import bump_moderation_stats, refresh_moderation_stats
+from src.utils.username_blacklist import add_banned_username, invalidate_blacklist
 from datetime import datetime
-import os
+import json
 
 moderation_bp = Blueprint('moderation', __name__)
 
+# Ordinamenti della lista utenti (User.id come spareggio per il keyset)
+# L'id cresce con la registrazione: 'created_at' usa direttamente la chiave primaria
+USER_SORTS = {
+    'created_at': User.id,
+    'username': func.lower(User.username),
+    'email': func.lower(User.email),
+    'role': func.coalesce(User.role, ''),
+    'reports': func.coalesce(UserModerationStats.total_reports, 0),
+}
+
+def _page_params(default_limit=50, max_limit=200):
+    """Legge i parametri di paginazione keyset (limit, cursor) dalla query string"""
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), max_limit)
+    cursor = request.args.get('cursor', type=int)
+    return limit, cursor
+
+
 @moderation_bp.route('/users', methods=['GET'])
 @login_required
 @admin_required
 def get_users():
-    """Get all users with report counts"""
+    """
+    Get users with report counts (keyset pagination)
+    Filtri ?role= e ?q=, ordinamento ?sort= (vedi USER_SORTS) e ?direction=asc|desc
+    (default: più recenti prima). next_cursor è opaco: va ripassato così com'è.
+    """
     try:
-        query = text("""
-            SELECT 
-                u.id,
-                u.username,
-                u.email,
-                u.first_name,
-                u.last_name,
-                u.role,
-                u.created_at,
-                u.is_active,
-                u.avatar_url,
-                COUNT(DISTINCT cr.id) as reports_count
-            FROM user u
-            LEFT JOIN comment c ON c.user_id = u.id
-            LEFT JOIN comment_report cr ON cr.comment_id = c.id
-            GROUP BY u.id, u.username, u.email, u.first_name, u.last_name, u.role, u.created_at, u.is_active, u.avatar_url
-            ORDER BY u.created_at DESC
-        """)
-        
-        result = db.session.execute(query)
-        users = [dict(row._mapping) for row in result]
-        
+        limit, _ = _page_params()
+        role = request.args.get('role')
+        search = request.args.get('q', '').strip()
+        sort = request.args.get('sort', 'created_at')
+        descending = request.args.get('direction', 'desc') != 'asc'
+        if sort not in USER_SORTS:
+            return jsonify({'error': 'Ordinamento non valido'}), 400
+        sort_column = USER_SORTS[sort]
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_value, cursor_id = json.loads(cursor)
+                cursor_id = int(cursor_id)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Cursore non valido'}), 400
+
+        query = (
+            db.session.query(
+                User.id,
+                User.username,
+                User.email,
+                User.first_name,
+                User.last_name,
+                User.role,
+                User.created_at,
+                User.is_active,
+                User.avatar_url,
+                func.coalesce(UserModerationStats.total_reports, 0).label('reports_count'),
+                func.coalesce(UserModerationStats.total_comments, 0).label('comments_count'),
+                func.coalesce(UserModerationStats.total_warnings, 0).label('warnings_count'),
+                func.coalesce(UserModerationStats.total_bans, 0).label('bans_count'),
+            )
+            .outerjoin(UserModerationStats, UserModerationStats.user_id == User.id)
+        )
+
+        if cursor:
+            # Righe dopo (valore, id) del cursore nell'ordine richiesto
+            if descending:
+                after = or_(sort_column < cursor_value, and_(sort_column == cursor_value, User.id < cursor_id))
+            else:
+                after = or_(sort_column > cursor_value, and_(sort_column == cursor_value, User.id > cursor_id))
+            query = query.filter(after)
+        if role and role != 'all':
+            query = query.filter(User.role == role)
+        if search:
+            pattern = f"%{search}%"
+            query = query.filter(or_(
+                User.username.ilike(pattern),
+                User.email.ilike(pattern),
+                User.first_name.ilike(pattern),
+                User.last_name.ilike(pattern),
+            ))
+
+        # Una riga in più per sapere se esiste una pagina successiva
+        order = [sort_column, User.id] if sort != 'created_at' else [User.id]
+        query = query.add_columns(sort_column.label('sort_value'))
+        rows = (
+            query.order_by(*[column.desc() if descending else column.asc() for column in order])
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = json.dumps([rows[-1].sort_value, rows[-1].id]) if has_more else None
+
+        users = []
+        for row in rows:
+            user = dict(row._mapping)
+            del user['sort_value']
+            user['created_at'] = user['created_at'].isoformat() if user['created_at'] else None
+            users.append(user)
+
         return jsonify({
             'users': users,
-            'total': len(users)
+            'total': len(users),
+            'has_more': has_more,
+            'next_cursor': next_cursor,
         }), 200
         
     except Exception as e:
@@ -56,31 +134,55 @@ def get_users():
 @login_required
 @admin_required
 def get_user_comments(user_id):
-    """Get user comments with reports"""
+    """Get user comments with reports (keyset pagination, most recent first)"""
     try:
-        query = text("""
-            SELECT 
-                c.id,
-                c.content,
-                c.created_at,
-                c.article_id,
-                a.title as article_title,
-                COUNT(DISTINCT cr.id) as reports_count,
-                GROUP_CONCAT(DISTINCT cr.reason) as report_reasons
-            FROM comment c
-            LEFT JOIN article a ON a.id = c.article_id
-            LEFT JOIN comment_report cr ON cr.comment_id = c.id
-            WHERE c.user_id = :user_id
-            GROUP BY c.id, c.content, c.created_at, c.article_id, a.title
-            ORDER BY c.created_at DESC
-        """)
-        
-        result = db.session.execute(query, {'user_id': user_id})
-        comments = [dict(row._mapping) for row in result]
+        limit, cursor = _page_params()
+
+        # Segnalazioni aggregate una sola volta per commento dell'utente
+        reports = (
+            select(
+                CommentReport.comment_id,
+                func.count(CommentReport.id).label('reports_count'),
+                group_concat(CommentReport.reason, distinct=True).label('report_reasons'),
+            )
+            .join(Comment, Comment.id == CommentReport.comment_id)
+            .where(Comment.user_id == user_id)
+            .group_by(CommentReport.comment_id)
+            .subquery()
+        )
+
+        query = (
+            select(
+                Comment.id,
+                Comment.content,
+                Comment.created_at,
+                Comment.article_id,
+                Article.title.label('article_title'),
+                func.coalesce(reports.c.reports_count, 0).label('reports_count'),
+                reports.c.report_reasons,
+            )
+            .outerjoin(Article, Article.id == Comment.article_id)
+            .outerjoin(reports, reports.c.comment_id == Comment.id)
+            .where(Comment.user_id == user_id)
+        )
+        if cursor:
+            query = query.where(Comment.id < cursor)
+
+        rows = db.session.execute(query.order_by(Comment.id.desc()).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        comments = []
+        for row in rows:
+            comment = dict(row._mapping)
+            comment['created_at'] = comment['created_at'].isoformat() if comment['created_at'] else None
+            comments.append(comment)
         
         return jsonify({
             'comments': comments,
-            'total': len(comments)
+            'total': len(comments),
+            'has_more': has_more,
+            'next_cursor': comments[-1]['id'] if has_more else None,
         }), 200
         
     except Exception as e:
@@ -106,31 +208,24 @@ def warn_user(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         # Log warning in database
-        log_query = text("""
-            INSERT INTO moderation_log (user_id, action_type, message, admin_id, created_at)
-            VALUES (:user_id, 'warning', :message, :admin_id, datetime('now'))
-        """)
-        db.session.execute(log_query, {
-            'user_id': user_id,
-            'message': message,
-            'admin_id': current_user.id
-        })
-        db.session.commit()
-        
-        # Send warning email
-        success, msg = email_service.send_warning_email(
-            user.email,
-            user.username,
-            user.first_name,
-            message
-        )
+        now = datetime.utcnow()
+        db.session.add(ModerationLog(
+            user_id=user_id,
+            action_type='warning',
+            message=message,
+            admin_id=current_user.id,
+            created_at=now,
+        ))
+        bump_moderation_stats(user_id, warnings=1, action_at=now)
         
-        if not success:
-            return jsonify({'error': msg}), 500
+        # Warning email: saved with the log entry, sent by the outbox dispatcher
+        queue_message("warning", user.email, user.username, user.first_name, message)
+        db.session.commit()
+        schedule_dispatch()
         
         return jsonify({
             'success': True,
-            'message': 'Warning email sent successfully'
+            'message': 'Warning email queued for delivery'
         }), 200
         
     except Exception as e:
@@ -160,54 +255,25 @@ def ban_user(user_id):
         user.is_active = False
         
         # Log ban in database
-        log_query = text("""
-            INSERT INTO moderation_log (user_id, action_type, message, admin_id, created_at)
-            VALUES (:user_id, 'ban', :message, :admin_id, datetime('now'))
-        """)
-        db.session.execute(log_query, {
-            'user_id': user_id,
-            'message': reason,
-            'admin_id': current_user.id
-        })
-        
-        # Update blacklist JSON file
-        blacklist_path = os.path.join(os.path.dirname(__file__), '../utils/forbidden_usernames.json')
-        
-        with open(blacklist_path, 'r', encoding='utf-8') as f:
-            blacklist = json.load(f)
-        
-        # Create banned user entry
-        banned_entry = {
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'banned_at': datetime.now().isoformat(),
-            'reason': reason
-        }
-        
-        # Add to blacklist
-        if 'banned_users' not in blacklist:
-            blacklist['banned_users'] = []
-        blacklist['banned_users'].append(banned_entry)
-        
-        # Also add username to substring_matches
-        if user.username.lower() not in blacklist['substring_matches']:
-            blacklist['substring_matches'].append(user.username.lower())
-        
-        # Save updated blacklist
-        with open(blacklist_path, 'w', encoding='utf-8') as f:
-            json.dump(blacklist, f, indent=2, ensure_ascii=False)
+        now = datetime.utcnow()
+        db.session.add(ModerationLog(
+            user_id=user_id,
+            action_type='ban',
+            message=reason,
+            admin_id=current_user.id,
+            created_at=now,
+        ))
+        bump_moderation_stats(user_id, bans=1, action_at=now)
         
-        db.session.commit()
+        # Blacklist username: letta dai worker tramite il matcher condiviso
+        add_banned_username(user, reason)
         
-        # Send ban notification email
-        email_service.send_ban_notification_email(
-            user.email,
-            user.username,
-            user.first_name,
-            reason
-        )
+        # Ban notification email: saved with the ban, sent by the outbox dispatcher
+        queue_message("ban_notification", user.email, user.username, user.first_name, reason)
+        
+        db.session.commit()
+        invalidate_blacklist()
+        schedule_dispatch()
         
         return jsonify({
             'success': True,
@@ -226,8 +292,12 @@ def ban_user(user_id):
 def dismiss_reports(comment_id):
     """Dismiss all reports for a comment"""
     try:
-        delete_query = text("DELETE FROM comment_report WHERE comment_id = :comment_id")
-        db.session.execute(delete_query, {'comment_id': comment_id})
+        comment = Comment.query.get(comment_id)
+        if not comment:
+            return jsonify({'error': 'Comment not found'}), 404
+
+        CommentReport.query.filter_by(comment_id=comment_id).delete(synchronize_session=False)
+        refresh_moderation_stats([comment.user_id])
         db.session.commit()
         
         return jsonify({
@@ -1,10 +1,15 @@
 # LitInvestorBlog-backend/src/routes/newsletter.py
 
 from flask import Blueprint, request, jsonify, session
-from src.models.newsletter import NewsletterSubscriber, Donation, NotificationPreference
+from flask_login import current_user
+from src.models.newsletter import NewsletterCampaign, NewsletterSubscriber, Donation, NotificationPreference
 from src.extensions import db
 from src.routes.auth import login_required, admin_required
-from src.utils.email_service import email_service
+from src.utils.email_outbox import queue_message, schedule_dispatch
+from src.utils.exporters import EXPORT_FORMATS, stream_export
+from src.utils.newsletter_campaigns import queue_campaign
+from src.utils.subscriber_import import import_subscribers
+from datetime import datetime
 import re
 
 newsletter_bp = Blueprint("newsletter", __name__)
@@ -45,12 +50,10 @@ def subscribe_newsletter():
         )
 
         db.session.add(subscriber)
+        # Email conferma nella stessa transazione, inviata dal dispatcher
+        queue_message("newsletter_confirmation", email)
         db.session.commit()
-
-        # Invia email conferma
-        success, message = email_service.send_newsletter_confirmation(email)
-        if not success:
-            print(f"Errore invio email: {message}")
+        schedule_dispatch()
 
         return (
             jsonify({"message": "Iscrizione alla newsletter completata con successo"}),
@@ -120,6 +123,126 @@ def get_subscribers():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@newsletter_bp.route("/newsletter/subscribers/import", methods=["POST"])
+@admin_required
+def import_subscribers_csv():
+    """
+    Importa iscritti da CSV (file multipart 'file' o body text/csv), in
+    streaming: colonna 'email' o prima colonna. Nessuna email di conferma.
+    """
+    try:
+        upload = request.files.get("file")
+        stream = upload.stream if upload else request.stream
+
+        report = import_subscribers(stream)
+        return jsonify({"import": report.to_dict()}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@newsletter_bp.route("/newsletter/subscribers/export", methods=["GET"])
+@admin_required
+def export_subscribers():
+    """Esporta gli iscritti in CSV o NDJSON (streaming, keyset con after_id)"""
+    try:
+        format_type = request.args.get("format", "csv")
+
+        if format_type not in EXPORT_FORMATS:
+            return jsonify({"error": "Formato non supportato"}), 400
+
+        return stream_export(
+            "subscribers",
+            format_type,
+            f"iscritti_newsletter_{datetime.now().strftime('%Y%m%d')}",
+            after_id=request.args.get("after_id", type=int),
+            limit=request.args.get("limit", type=int),
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@newsletter_bp.route("/newsletter/campaigns", methods=["POST"])
+@admin_required
+def create_campaign():
+    """Crea una campagna in bozza"""
+    try:
+        data = request.get_json() or {}
+
+        if not data.get("subject") or not data.get("html_body"):
+            return jsonify({"error": "Oggetto e contenuto HTML sono obbligatori"}), 400
+
+        campaign = NewsletterCampaign(
+            subject=data["subject"].strip(),
+            html_body=data["html_body"],
+            text_body=data.get("text_body"),
+            rate_limit=data.get("rate_limit"),
+            concurrency=data.get("concurrency"),
+            created_by=current_user.id,
+        )
+        db.session.add(campaign)
+        db.session.commit()
+
+        return jsonify({"campaign": campaign.to_dict()}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@newsletter_bp.route("/newsletter/campaigns", methods=["GET"])
+@admin_required
+def get_campaigns():
+    """Ultime campagne con avanzamento e throughput"""
+    campaigns = NewsletterCampaign.query.order_by(NewsletterCampaign.id.desc()).limit(50).all()
+    return jsonify({"campaigns": [campaign.to_dict() for campaign in campaigns]}), 200
+
+@newsletter_bp.route("/newsletter/campaigns/<int:campaign_id>", methods=["GET"])
+@admin_required
+def get_campaign(campaign_id):
+    """Stato di una campagna"""
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    if not campaign:
+        return jsonify({"error": "Campagna non trovata"}), 404
+    return jsonify({"campaign": campaign.to_dict()}), 200
+
+@newsletter_bp.route("/newsletter/campaigns/<int:campaign_id>/send", methods=["POST"])
+@admin_required
+def send_campaign(campaign_id):
+    """Avvia l'invio di una campagna in bozza (in background)"""
+    try:
+        campaign = db.session.get(NewsletterCampaign, campaign_id)
+        if not campaign:
+            return jsonify({"error": "Campagna non trovata"}), 404
+        if campaign.status != "draft":
+            return jsonify({"error": "La campagna è già stata inviata"}), 400
+
+        queue_campaign(campaign)
+        return jsonify({"campaign": campaign.to_dict()}), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@newsletter_bp.route("/newsletter/campaigns/<int:campaign_id>/cancel", methods=["POST"])
+@admin_required
+def cancel_campaign(campaign_id):
+    """Interrompe una campagna: i task di invio si fermano al blocco successivo"""
+    try:
+        campaign = db.session.get(NewsletterCampaign, campaign_id)
+        if not campaign:
+            return jsonify({"error": "Campagna non trovata"}), 404
+        if campaign.status not in ("draft", "queued", "sending"):
+            return jsonify({"error": "La campagna non è in corso"}), 400
+
+        campaign.status = "cancelled"
+        campaign.lease_expires_at = None
+        db.session.commit()
+        return jsonify({"campaign": campaign.to_dict()}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @newsletter_bp.route("/donations", methods=["POST"])
 def create_donation():
     try:
@@ -1,8 +1,12 @@
 # LitInvestorBlog-backend/src/routes/stripe.py
 
+import logging
 import os
 import stripe
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from src.extensions import db
+from src.models.donation import Donation
+from src.utils.stripe_events import schedule_processing, store_event
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
@@ -26,26 +30,84 @@ def create_checkout_session():
         if payment_method == "paypal":
             payment_method_types = ["paypal"]
 
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=payment_method_types,
-            line_items=[
-                {
-                    "price_data": {
-                        "currency": "eur",
-                        "product_data": {
-                            "name": "Donazione a RioCapital",
-                            "description": "Sostegno per contenuti di qualità e senza pubblicità.",
-                        },
-                        "unit_amount": amount_in_cents,
-                    },
-                    "quantity": 1,
-                }
-            ],
-            mode="payment",
-            success_url=YOUR_DOMAIN + "/dona/successo",
-            cancel_url=YOUR_DOMAIN + "/dona/annullato",
+        # Donazione pending: il webhook la completa (metadata donation_id)
+        donation = Donation(
+            amount=amount_in_cents / 100,
+            currency="EUR",
+            payment_method=payment_method or "card",
+            status="pending",
         )
+        db.session.add(donation)
+        db.session.flush()
+        donation_id = str(donation.id)
+        # Commit prima della chiamata a Stripe: nessuna transazione aperta
+        # durante la richiesta HTTP e il webhook trova sempre la donazione
+        db.session.commit()
+
+        try:
+            checkout_session = stripe.checkout.Session.create(
+                payment_method_types=payment_method_types,
+                line_items=[
+                    {
+                        "price_data": {
+                            "currency": "eur",
+                            "product_data": {
+                                "name": "Donazione a RioCapital",
+                                "description": "Sostegno per contenuti di qualità e senza pubblicità.",
+                            },
+                            "unit_amount": amount_in_cents,
+                        },
+                        "quantity": 1,
+                    }
+                ],
+                mode="payment",
+                success_url=YOUR_DOMAIN + "/dona/successo",
+                cancel_url=YOUR_DOMAIN + "/dona/annullato",
+                client_reference_id=donation_id,
+                metadata={"donation_id": donation_id},
+            )
+        except Exception:
+            # Sessione non creata: la donazione non verrà mai pagata
+            donation.status = "failed"
+            db.session.commit()
+            raise
+        donation.transaction_id = checkout_session.id
+        db.session.commit()
         return jsonify({"url": checkout_session.url})
     except Exception as e:
+        db.session.rollback()
         print(e)
         return jsonify(error=str(e)), 500
+
+
+@stripe_bp.route("/webhook", methods=["POST"])
+def stripe_webhook():
+    """
+    Riceve gli eventi Stripe: verifica la firma, salva l'evento grezzo
+    (idempotente sull'id) e risponde subito. Le donazioni sono aggiornate
+    dal consumer Celery (tasks.process_stripe_events).
+    """
+    secret = current_app.config.get("STRIPE_WEBHOOK_SECRET")
+    if not secret:
+        return jsonify(error={"message": "Webhook non configurato."}), 503
+
+    payload = request.get_data()
+    try:
+        event = stripe.Webhook.construct_event(
+            payload, request.headers.get("Stripe-Signature", ""), secret
+        )
+    except ValueError:
+        return jsonify(error={"message": "Payload non valido."}), 400
+    except stripe.SignatureVerificationError:
+        return jsonify(error={"message": "Firma non valida."}), 400
+
+    try:
+        if store_event(event["id"], event["type"], payload.decode("utf-8")):
+            schedule_processing()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Errore nel salvataggio evento Stripe: {e}")
+        # Risposta non 2xx: Stripe ripete la consegna
+        return jsonify(error={"message": "Errore interno del server"}), 500
+
+    return jsonify({"received": True})
@@ -1,12 +1,14 @@
 # src/routes/upload.py
 
 import os
-from flask import Blueprint, request, jsonify, current_app, session
+
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
 from src.routes.auth import login_required
-from src.utils.convert_img import convert_and_save_image  # Assicurati che l'import sia corretto
+from src.utils.convert_img import destination_for, job_status, public_url
+from src.utils.image_jobs import TOKEN_PATTERN, InvalidImageError, stage_upload, uploads_folder
 
-# Importa i modelli e le estensioni necessarie
-from src.models.user import User
+# Importa le estensioni necessarie
 from src.extensions import db
 
 upload_bp = Blueprint("upload", __name__)
@@ -46,22 +48,20 @@ def upload_image():
         return jsonify({"error": "Tipo di file non consentito"}), 400
 
     try:
-        # Definisce la cartella base per tutti gli upload
-        base_upload_folder = os.path.join(current_app.root_path, "static", "uploads")
-
-        # Chiama la nuova funzione di conversione passando tutti i parametri
-        file_url = convert_and_save_image(
-            file=file,
-            base_upload_folder=base_upload_folder,
-            subfolder='articles',
+        # Salva l'originale; la conversione in WebP avviene in background
+        staged = stage_upload(
+            file,
+            'articles',
             slug=slug,
             image_type=image_type,
             index=index
         )
 
-        # Restituisce l'URL dell'immagine salvata
-        return jsonify({"url": file_url}), 200
+        # URL finale + anteprima dell'originale + token per lo stato
+        return jsonify(staged), 202
 
+    except InvalidImageError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Errore in upload_image: {str(e)}")
         return jsonify({"error": f"Impossibile elaborare il file: {str(e)}"}), 500
@@ -81,25 +81,54 @@ def upload_avatar():
         return jsonify({"error": "Tipo di file non consentito"}), 400
 
     try:
-        user = User.query.get(session['user_id'])
-        if not user:
-            return jsonify({"error": "Utente non trovato"}), 404
-
-        base_upload_folder = os.path.join(current_app.root_path, "static", "uploads")
-
-        # Chiama la funzione aggiornata con i parametri per l'avatar
-        file_url = convert_and_save_image(
-            file=file,
-            base_upload_folder=base_upload_folder,
-            subfolder='avatars',
-            username=user.username  # Passiamo lo username per il nome del file
-        )
+        # Lo username determina il nome del file; conversione in background.
+        # avatar_url cambia solo a conversione completata (vedi confirm_avatar)
+        staged = stage_upload(file, 'avatars', username=current_user.username)
+
+        return jsonify({
+            "message": "Avatar caricato, elaborazione in corso",
+            "preview_url": staged["preview_url"],
+            "token": staged["token"],
+        }), 202
+
+    except InvalidImageError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Errore durante l'upload dell'avatar: {str(e)}")
+        return jsonify({"error": f"Impossibile elaborare il file: {str(e)}"}), 500
 
-        user.avatar_url = file_url
-        db.session.commit()
 
-        return jsonify({"message": "Avatar aggiornato con successo", "avatar_url": file_url}), 200
+@upload_bp.route('/avatar/<token>', methods=['PUT'])
+@login_required
+def confirm_avatar(token):
+    """Imposta l'avatar elaborato; in caso di errore resta quello precedente"""
+    if not TOKEN_PATTERN.match(token):
+        return jsonify({"error": "Token non valido"}), 400
 
-    except Exception as e:
-        print(f"Errore durante l'upload dell'avatar: {str(e)}")
-        return jsonify({"error": f"Impossibile elaborare il file: {str(e)}"}), 500
\ No newline at end of file
+    status = job_status(uploads_folder(), token)
+    if status["status"] == "processing":
+        return jsonify(status), 409
+    if status["status"] == "failed":
+        return jsonify({"error": status["error"] or "Elaborazione dell'avatar non riuscita"}), 422
+
+    relative_dir, filename = destination_for('avatars', username=current_user.username)
+    if not os.path.exists(os.path.join(uploads_folder(), relative_dir, filename)):
+        return jsonify({"error": "Avatar elaborato non trovato"}), 404
+
+    current_user.avatar_url = public_url(relative_dir, filename)
+    db.session.commit()
+
+    return jsonify({
+        "message": "Avatar aggiornato con successo",
+        "avatar_url": current_user.avatar_url,
+    }), 200
+
+
+@upload_bp.route('/status/<token>', methods=['GET'])
+@login_required
+def upload_status(token):
+    """Stato della conversione: processing, ready o failed"""
+    if not TOKEN_PATTERN.match(token):
+        return jsonify({"error": "Token non valido"}), 400
+
+    return jsonify(job_status(uploads_folder(), token)), 200
@@ -0,0 +1,292 @@
+"""
+Analytics benchmark for Rio Capital Blog
+Popola un database SQLite temporaneo con volumi configurabili, chiama gli
+endpoint di analytics ed export e registra per ognuno query SQL, righe lette
+e tempo. Fallisce se un endpoint supera il proprio budget di query.
+
+Usato da 'flask analytics-bench'; non tocca mai il database configurato.
+"""
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+
+DEFAULT_VOLUMES = {
+    "users": 200,
+    "articles": 300,
+    "likes": 3000,
+    "comments": 2000,
+    "shares": 1000,
+    "donations": 500,
+    "views": 20000,
+}
+
+# Giorni di storico su cui distribuire i dati generati
+HISTORY_DAYS = 400
+
+# Budget di query SQL per endpoint: non deve crescere con i volumi
+ENDPOINT_BUDGETS = {
+    "/api/analytics/dashboard?range=7d": 30,
+    "/api/analytics/dashboard?range=30d": 30,
+    "/api/analytics/dashboard?range=90d": 30,
+    "/api/analytics/dashboard?range=1y": 30,
+    "/api/analytics/article/{article_id}": 25,
+    "/api/analytics/overview": 20,
+    "/api/analytics/details": 15,
+    "/api/analytics/export?type=articles&format=csv": 10,
+    "/api/analytics/export?type=users&format=ndjson": 10,
+    "/api/analytics/export?type=donations&format=csv": 10,
+    "/api/donations/stats": 10,
+    "/api/donations/export?format=csv": 10,
+    "/api/articles/trending?limit=20": 10,
+}
+
+BenchResult = namedtuple("BenchResult", ["endpoint", "status", "queries", "rows", "seconds", "budget"])
+
+
+class _CountingCursor(sqlite3.Cursor):
+    """Cursore che conta le righe restituite al driver"""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.connection.rows_fetched += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.connection.rows_fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self.connection.rows_fetched += len(rows)
+        return rows
+
+
+class _CountingConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rows_fetched = 0
+
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+
+# Connessioni aperte dal benchmark (per sommare le righe lette)
+_connections = []
+
+
+def _rows_fetched():
+    return sum(connection.rows_fetched for connection in _connections)
+
+
+def _track_connection(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, _CountingConnection):
+        _connections.append(dbapi_connection)
+
+
+def seed(volumes, rng, now=None):
+    """Genera i dati con INSERT executemany (un blocco per tabella)"""
+    from src.extensions import db
+    from src.models.analytics import PageViewEvent
+    from src.models.article import Article
+    from src.models.category import Category
+    from src.models.comment import Comment
+    from src.models.donation import Donation
+    from src.models.like import ArticleLike
+    from src.models.share import Share
+    from src.models.user import User
+
+    now = now or datetime.utcnow()
+
+    def moment():
+        return now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))
+
+    users = [
+        {
+            "username": f"bench{i}",
+            "email": f"bench{i}@example.com",
+            "password_hash": "x",
+            "role": "admin" if i == 0 else ("author" if i % 10 == 1 else "reader"),
+            "created_at": moment(),
+        }
+        for i in range(max(volumes["users"], 2))
+    ]
+    db.session.execute(insert(User), users)
+    user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+    authors = user_ids[: max(len(user_ids) // 10, 1)]
+
+    db.session.execute(insert(Category), [
+        {"name": f"Categoria {i}", "slug": f"categoria-{i}", "created_by": user_ids[0]} for i in range(8)
+    ])
+    category_ids = [category_id for (category_id,) in db.session.query(Category.id)]
+
+    db.session.execute(insert(Article), [
+        {
+            "title": f"Articolo {i}",
+            "slug": f"articolo-{i}",
+            "content": "Lorem ipsum " * 50,
+            "author_id": rng.choice(authors),
+            "category_id": rng.choice(category_ids),
+            "published": rng.random() < 0.9,
+            "created_at": moment(),
+            "views_count": 0,
+            "likes_count": 0,
+        }
+        for i in range(max(volumes["articles"], 1))
+    ])
+    article_ids = [article_id for (article_id,) in db.session.query(Article.id)]
+
+    pairs = {(rng.choice(article_ids), rng.choice(user_ids)) for _ in range(volumes["likes"])}
+    if pairs:
+        db.session.execute(insert(ArticleLike), [
+            {"article_id": article_id, "user_id": user_id, "created_at": moment()}
+            for article_id, user_id in pairs
+        ])
+
+    if volumes["comments"]:
+        db.session.execute(insert(Comment), [
+            {
+                "content": "Commento di prova",
+                "article_id": rng.choice(article_ids),
+                "user_id": rng.choice(user_ids),
+                "status": rng.choice(["approved", "approved", "pending"]),
+                "created_at": moment(),
+            }
+            for _ in range(volumes["comments"])
+        ])
+
+    if volumes["shares"]:
+        db.session.execute(insert(Share), [
+            {
+                "article_id": rng.choice(article_ids),
+                "platform": rng.choice(["x", "linkedin", "mail", "link"]),
+                "created_at": moment(),
+            }
+            for _ in range(volumes["shares"])
+        ])
+
+    if volumes["donations"]:
+        db.session.execute(insert(Donation), [
+            {
+                "donor_name": f"Donatore {i % 50}",
+                "donor_email": f"donor{i % 50}@example.com",
+                "amount": round(rng.uniform(2, 200), 2),
+                "payment_method": "card",
+                "status": rng.choice(["completed", "completed", "completed", "pending"]),
+                "anonymous": rng.random() < 0.2,
+                "created_at": moment(),
+            }
+            for i in range(volumes["donations"])
+        ])
+
+    if volumes["views"]:
+        db.session.execute(insert(PageViewEvent), [
+            {
+                "event_type": "view",
+                "article_id": rng.choice(article_ids),
+                "visitor_hash": f"{rng.getrandbits(64):016x}",
+                "occurred_at": moment(),
+            }
+            for _ in range(volumes["views"])
+        ])
+
+    db.session.commit()
+    return user_ids[0], article_ids
+
+
+def run_bench(volumes=None, budgets=None, seed_value=42, echo=print):
+    """
+    Esegue il benchmark in un'app isolata (SQLite temporaneo, niente Redis)
+
+    Returns:
+        Lista di BenchResult (una per endpoint)
+    """
+    from src.extensions import db
+    from src.main import create_app
+    from src.utils.analytics_rollup import backfill, rollup_pending
+    from src.utils.leaderboards import refresh_all_time, refresh_periods
+    from src.utils.trending import rebuild_trending
+
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    budgets = budgets or ENDPOINT_BUDGETS
+    workdir = tempfile.mkdtemp(prefix="analytics-bench-")
+
+    app = create_app("testing", config_overrides={
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"factory": _CountingConnection}},
+        "REDIS_URL": None,
+        "CACHE_REDIS_URL": None,
+        "EXPORT_FOLDER": os.path.join(workdir, "exports"),
+        "ANALYTICS_EVENT_DIR": os.path.join(workdir, "events"),
+    })
+
+    results = []
+    try:
+        with app.app_context():
+            engine = db.engine
+            event.listen(engine, "connect", _track_connection)
+            db.create_all()
+
+            started = time.perf_counter()
+            admin_id, article_ids = seed(volumes, random.Random(seed_value))
+            backfill((datetime.utcnow() - timedelta(days=HISTORY_DAYS)).date())
+            rollup_pending()
+            rebuild_trending()
+            refresh_all_time()
+            refresh_periods()
+            db.session.commit()
+            echo(f"Seed e rollup completati in {time.perf_counter() - started:.1f}s")
+
+            statements = [0]
+
+            def count_statement(*args):
+                statements[0] += 1
+
+            event.listen(engine, "before_cursor_execute", count_statement)
+
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(admin_id)
+                session["_fresh"] = True
+                session["user_id"] = admin_id
+
+            for endpoint, budget in budgets.items():
+                url = endpoint.format(article_id=article_ids[0])
+                statements[0] = 0
+                rows_before = _rows_fetched()
+                started = time.perf_counter()
+
+                response = client.get(url)
+                response.get_data()
+
+                results.append(BenchResult(
+                    endpoint=endpoint,
+                    status=response.status_code,
+                    queries=statements[0],
+                    rows=_rows_fetched() - rows_before,
+                    seconds=time.perf_counter() - started,
+                    budget=budget,
+                ))
+
+            event.remove(engine, "before_cursor_execute", count_statement)
+            db.session.remove()
+            engine.dispose()
+    finally:
+        _connections.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def failures(results):
+    """Endpoint falliti o oltre il budget di query"""
+    return [result for result in results if result.status != 200 or result.queries > result.budget]
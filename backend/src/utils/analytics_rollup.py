@@ -0,0 +1,292 @@
+"""
+Analytics rollup for Rio Capital Blog
+Aggrega le metriche giornaliere in analytics_daily e le rilegge unendo i
+giorni chiusi (rollup) al giorno corrente (query live)
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from src.extensions import db
+from src.models.analytics import AnalyticsDaily, AnalyticsRollupDay, PageViewEvent
+from src.models.article import Article
+from src.models.comment import Comment
+from src.models.donation import Donation
+from src.models.like import ArticleLike
+from src.models.share import Share
+from src.models.user import User
+from src.utils.timeseries import DATE_FORMAT, daily_totals, day_keys, day_start
+
+
+RollupMetric = namedtuple(
+    "RollupMetric",
+    ["date_column", "value", "filters", "article_column", "user_column"],
+    defaults=(None, (), None, None),
+)
+
+# Registro delle metriche aggregate: nome -> come calcolarla
+METRICS = {
+    "articles": RollupMetric(Article.created_at, user_column=Article.author_id),
+    "users": RollupMetric(User.created_at),
+    "comments": RollupMetric(
+        Comment.created_at, article_column=Comment.article_id, user_column=Comment.user_id
+    ),
+    "likes": RollupMetric(ArticleLike.created_at, article_column=ArticleLike.article_id),
+    "shares": RollupMetric(Share.created_at, article_column=Share.article_id),
+    "donations": RollupMetric(Donation.created_at, filters=(Donation.status == "completed",)),
+    "revenue": RollupMetric(
+        Donation.created_at, value=Donation.amount, filters=(Donation.status == "completed",)
+    ),
+    "views": RollupMetric(
+        PageViewEvent.occurred_at,
+        filters=(PageViewEvent.event_type == "view",),
+        article_column=PageViewEvent.article_id,
+    ),
+    "read_seconds": RollupMetric(
+        PageViewEvent.occurred_at,
+        value=PageViewEvent.read_seconds,
+        filters=(PageViewEvent.event_type == "read",),
+        article_column=PageViewEvent.article_id,
+    ),
+}
+
+ROLLUP_COLUMNS = ["day", "metric", "dimension", "entity_id", "value"]
+
+# Giorni chiusi ricalcolati comunque a ogni esecuzione del job: copre le
+# modifiche che non passano dall'ORM né da reopen_days (ON DELETE CASCADE)
+REROLL_DAYS = 7
+
+
+def _tracked_models():
+    """Modello -> (colonna data, colonne che cambiano le metriche se modificate)"""
+    tracked = {}
+    for metric in METRICS.values():
+        _, columns = tracked.setdefault(metric.date_column.class_, (metric.date_column.key, set()))
+        columns.update(criterion.left.key for criterion in metric.filters)
+        if metric.value is not None:
+            columns.add(metric.value.key)
+    return tracked
+
+
+_TRACKED = _tracked_models()
+
+
+def _aggregate(metric):
+    return func.count() if metric.value is None else func.coalesce(func.sum(metric.value), 0)
+
+
+def rollup_day(day, closed=True):
+    """
+    Ricalcola tutte le metriche di un giorno con INSERT ... SELECT
+    Le righe del giorno vengono sostituite, quindi è idempotente. Non esegue il commit.
+
+    Args:
+        day: Giorno da aggregare (date)
+        closed: Se True il giorno non verrà più ricalcolato dal job periodico
+    """
+    start = day_start(day)
+    end = start + timedelta(days=1)
+
+    db.session.execute(delete(AnalyticsDaily).where(AnalyticsDaily.day == day))
+
+    for name, metric in METRICS.items():
+        in_day = (metric.date_column >= start, metric.date_column < end, *metric.filters)
+
+        site = select(
+            literal(day), literal(name), literal("site"), literal(0), _aggregate(metric)
+        ).where(*in_day)
+        db.session.execute(insert(AnalyticsDaily).from_select(ROLLUP_COLUMNS, site))
+
+        for dimension, column in (("article", metric.article_column), ("user", metric.user_column)):
+            if column is None:
+                continue
+            per_entity = (
+                select(literal(day), literal(name), literal(dimension), column, _aggregate(metric))
+                .where(*in_day, column.isnot(None))
+                .group_by(column)
+            )
+            db.session.execute(insert(AnalyticsDaily).from_select(ROLLUP_COLUMNS, per_entity))
+
+    rollup = db.session.get(AnalyticsRollupDay, day)
+    if rollup is None:
+        rollup = AnalyticsRollupDay(day=day)
+        db.session.add(rollup)
+    rollup.closed = closed
+    rollup.computed_at = datetime.utcnow()
+
+
+def reopen_days(moments, session=None):
+    """
+    Riapre i giorni chiusi che contengono i momenti dati (datetime o date):
+    rollup_pending li ricalcola all'esecuzione successiva. Da chiamare dopo
+    le scritture set-based (DELETE/UPDATE Core), invisibili al listener
+    before_flush. Non esegue il commit.
+    """
+    days = sorted({
+        moment.date() if isinstance(moment, datetime) else moment
+        for moment in moments if moment is not None
+    })
+    if not days:
+        return
+
+    table = AnalyticsRollupDay.__table__
+    (session or db.session).execute(
+        update(table)
+        .where(table.c.day.in_(days), table.c.closed.is_(True))
+        .values(closed=False)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _reopen_changed_days(session, flush_context, instances):
+    """
+    Riapre i giorni chiusi toccati da cancellazioni o modifiche rilevanti
+    (es: donazione rimborsata o completata giorni dopo la creazione, commento
+    o like eliminato) tramite l'ORM; le scritture Core usano reopen_days
+    """
+    moments = []
+    for instance in list(session.deleted) + list(session.dirty):
+        tracked = _TRACKED.get(type(instance))
+        if tracked is None:
+            continue
+        date_key, columns = tracked
+        if instance not in session.deleted:
+            state = inspect(instance)
+            if not any(state.attrs[key].history.has_changes() for key in columns):
+                continue
+        moments.append(getattr(instance, date_key))
+
+    reopen_days(moments, session)
+
+
+def rollup_pending(now=None):
+    """
+    Job periodico: chiude i giorni conclusi non ancora chiusi e ricalcola oggi
+    Ricalcola anche i giorni riaperti da modifiche successive e gli ultimi
+    REROLL_DAYS giorni chiusi. Alla prima esecuzione chiude solo ieri; lo
+    storico si importa con 'flask backfill-analytics'. Esegue un commit per giorno.
+
+    Returns:
+        Lista dei giorni ricalcolati
+    """
+    today = (now or datetime.utcnow()).date()
+    yesterday = today - timedelta(days=1)
+
+    last_closed = (
+        db.session.query(func.max(AnalyticsRollupDay.day))
+        .filter(AnalyticsRollupDay.closed.is_(True))
+        .scalar()
+    )
+    day = last_closed + timedelta(days=1) if last_closed else yesterday
+
+    # Giorni già aggregati da ricalcolare: riaperti o nella finestra recente
+    window_start = yesterday - timedelta(days=REROLL_DAYS - 1)
+    rerolled = db.session.scalars(
+        select(AnalyticsRollupDay.day).where(
+            AnalyticsRollupDay.day < day,
+            or_(AnalyticsRollupDay.closed.is_(False), AnalyticsRollupDay.day >= window_start),
+        )
+    ).all()
+    pending = [day + timedelta(days=offset) for offset in range((yesterday - day).days + 1)]
+
+    processed = []
+    for closed_day in sorted(set(rerolled) | set(pending)):
+        rollup_day(closed_day, closed=True)
+        db.session.commit()
+        processed.append(closed_day)
+
+    rollup_day(today, closed=False)
+    db.session.commit()
+    processed.append(today)
+    return processed
+
+
+def backfill(start, end=None):
+    """Ricalcola e chiude tutti i giorni tra start ed end (default: ieri)"""
+    end = end or (datetime.utcnow().date() - timedelta(days=1))
+    day = start
+    processed = 0
+    while day <= end:
+        rollup_day(day, closed=True)
+        db.session.commit()
+        processed += 1
+        day += timedelta(days=1)
+    return processed
+
+
+def metric_series(metrics, start, end, article_id=None):
+    """
+    Serie giornaliere di più metriche tra start ed end (inclusi)
+    I giorni chiusi si leggono da analytics_daily con una sola query; i giorni
+    non ancora chiusi (di norma solo oggi) con una query live per metrica.
+
+    Args:
+        metrics: Nomi delle metriche (chiavi di METRICS)
+        start/end: Intervallo (date o datetime)
+        article_id: Se indicato, serie del singolo articolo
+
+    Returns:
+        Dizionario {metrica: {YYYY-MM-DD: valore}}
+    """
+    start_day = day_start(start).date()
+    end_day = day_start(end).date()
+    dimension, entity_id = ("article", article_id) if article_id is not None else ("site", 0)
+
+    closed = {
+        day.strftime(DATE_FORMAT)
+        for (day,) in db.session.query(AnalyticsRollupDay.day).filter(
+            AnalyticsRollupDay.closed.is_(True),
+            AnalyticsRollupDay.day.between(start_day, end_day),
+        )
+    }
+
+    series = {name: {} for name in metrics}
+    if closed:
+        rows = db.session.query(AnalyticsDaily.metric, AnalyticsDaily.day, AnalyticsDaily.value).filter(
+            AnalyticsDaily.metric.in_(list(metrics)),
+            AnalyticsDaily.dimension == dimension,
+            AnalyticsDaily.entity_id == entity_id,
+            AnalyticsDaily.day.between(start_day, end_day),
+        )
+        for name, day, value in rows:
+            key = day.strftime(DATE_FORMAT)
+            if key in closed:
+                series[name][key] = value
+
+    open_days = [key for key in day_keys(start_day, end_day) if key not in closed]
+    if open_days:
+        live_start = datetime.strptime(open_days[0], DATE_FORMAT)
+        live_end = datetime.strptime(open_days[-1], DATE_FORMAT)
+        wanted = set(open_days)
+        for name in metrics:
+            metric = METRICS[name]
+            filters = list(metric.filters)
+            if article_id is not None:
+                filters.append(metric.article_column == article_id)
+            live = daily_totals(
+                metric.date_column, live_start, live_end, value=metric.value, filters=filters
+            )
+            series[name].update({key: value for key, value in live.items() if key in wanted})
+
+    return series
+
+
+def metric_window_totals(metrics, previous_start, start, end):
+    """
+    Totali della finestra corrente [start, end] e della precedente
+    [previous_start, start) con una sola lettura dei rollup
+
+    Returns:
+        Tupla (totali correnti, totali precedenti)
+    """
+    series = metric_series(metrics, previous_start, end)
+    current_keys = set(day_keys(start, end))
+    current = {name: 0 for name in metrics}
+    previous = {name: 0 for name in metrics}
+    for name, values in series.items():
+        for key, value in values.items():
+            target = current if key in current_keys else previous
+            target[name] += value or 0
+    return current, previous
@@ -1,9 +1,219 @@
 # src/utils/convert_img.py
 
+import json
 import os
+from functools import lru_cache
 from PIL import Image
 from werkzeug.datastructures import FileStorage
 
+# Dimensioni e qualità delle immagini generate
+ARTICLE_MAX_WIDTH = 1200
+AVATAR_SIZE = (256, 256)
+WEBP_QUALITY = 85
+AVIF_QUALITY = 60
+
+# Varianti responsive delle copertine (configurabili con IMAGE_WIDTHS / IMAGE_FORMATS)
+DEFAULT_WIDTHS = (320, 640, 960, 1200, 1920)
+VARIANT_FORMATS = {
+    # formato: (formato Pillow, MIME type, opzioni di salvataggio)
+    "webp": ("WEBP", "image/webp", {"quality": WEBP_QUALITY}),
+    "avif": ("AVIF", "image/avif", {"quality": AVIF_QUALITY, "speed": 6}),
+}
+
+# Cartella (dentro uploads) degli originali in attesa di elaborazione
+INCOMING_FOLDER = "_incoming"
+
+
+def destination_for(
+        subfolder: str,
+        *,
+        slug: str = None,
+        username: str = None,
+        image_type: str = 'content',
+        index: int = 0
+) -> tuple:
+    """
+    Percorso relativo (cartella, nome file) dell'immagine elaborata
+    Stessa struttura di cartelle per upload sincroni e in background.
+    """
+    if subfolder == 'articles':
+        if not slug:
+            raise ValueError("Lo 'slug' è richiesto per le immagini degli articoli.")
+
+        # Es: articles/il-mio-primo-articolo
+        if image_type == 'cover':
+            return os.path.join(subfolder, slug), f"img_{slug}_copertina.webp"
+        return os.path.join(subfolder, slug), f"img_{slug}_{index}.webp"
+
+    if subfolder == 'avatars':
+        if not username:
+            raise ValueError("Lo 'username' è richiesto per gli avatar.")
+        return subfolder, f"profile_img_{username}.webp"
+
+    raise ValueError(f"Sottocartella '{subfolder}' non supportata.")
+
+
+def public_url(relative_dir: str, filename: str) -> str:
+    """URL pubblico di un file nella cartella uploads"""
+    return "/static/uploads/" + "/".join(relative_dir.split(os.sep) + [filename])
+
+
+def _prepare(img, subfolder):
+    """Conversione in RGB e ridimensionamento specifico per tipo"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    if subfolder == 'avatars':
+        # Avatar sono quadrati e più piccoli
+        return img.resize(AVATAR_SIZE, Image.Resampling.LANCZOS)
+
+    # Immagini articoli più grandi
+    if img.width > ARTICLE_MAX_WIDTH:
+        height = int((ARTICLE_MAX_WIDTH / img.width) * img.height)
+        img = img.resize((ARTICLE_MAX_WIDTH, height), Image.Resampling.LANCZOS)
+    return img
+
+
+def render_webp(source, save_path: str, subfolder: str) -> None:
+    """
+    Converte `source` (percorso o file-like) in WebP e lo sostituisce
+    atomicamente a `save_path`: chi legge vede il file vecchio o il nuovo,
+    mai uno scritto a metà
+    """
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    tmp_path = f"{save_path}.{os.getpid()}.tmp"
+    try:
+        with Image.open(source) as img:
+            _prepare(img, subfolder).save(tmp_path, "webp", quality=WEBP_QUALITY)
+        os.replace(tmp_path, save_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@lru_cache(maxsize=None)
+def avif_available():
+    """AVIF nativo (Pillow >= 11.2) o tramite il plugin pillow-avif-plugin"""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+
+def ladder_widths(source_width: int, widths) -> list:
+    """Larghezze da generare, senza ingrandire: la più grande è al massimo l'originale"""
+    top = min(source_width, max(widths))
+    return sorted({w for w in widths if w < top} | {top})
+
+
+def variant_path(save_path: str, width: int, fmt: str) -> str:
+    # Es: img_slug_copertina.webp -> img_slug_copertina-640w.avif
+    stem = os.path.splitext(save_path)[0]
+    return f"{stem}-{width}w.{fmt}"
+
+
+def manifest_path(save_path: str) -> str:
+    return os.path.splitext(save_path)[0] + ".json"
+
+
+def _save_atomic(img, path, fmt):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pil_format, _, options = VARIANT_FORMATS[fmt]
+    try:
+        img.save(tmp_path, pil_format, **options)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(path)
+
+
+def render_variants(source, save_path: str, base_upload_folder: str, widths=DEFAULT_WIDTHS, formats=("webp",)) -> dict:
+    """
+    Genera la scala di larghezze (srcset) di un'immagine e il suo manifest
+
+    L'immagine principale (`save_path`, larga al più ARTICLE_MAX_WIDTH) resta
+    quella usata da image_url ed è anche la variante WebP di quella larghezza.
+    Ogni variante è ridimensionata dalla precedente più grande. Il manifest
+    (`<nome>.json`) è scritto per ultimo: chi lo legge trova tutti i file.
+
+    Returns:
+        Il manifest: {"src", "width", "height", "variants": [{"url", "type",
+        "width", "height", "bytes"}, ...]}
+    """
+    formats = [f for f in formats if f in VARIANT_FORMATS and (f != "avif" or avif_available())]
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    relative = os.path.relpath(save_path, base_upload_folder)
+
+    def url_of(path):
+        rel_dir, name = os.path.split(os.path.relpath(path, base_upload_folder))
+        return public_url(rel_dir, name)
+
+    with Image.open(source) as img:
+        main_width = min(img.width, ARTICLE_MAX_WIDTH)
+        ladder = ladder_widths(img.width, list(widths) + [main_width])
+        # JPEG: decodifica direttamente a una scala ridotta (>= variante più grande)
+        img.draft("RGB", (ladder[-1], max(1, ladder[-1] * img.height // img.width)))
+        current = img.convert("RGB") if img.mode != "RGB" else img
+
+        variants = []
+        main = None
+        for width in reversed(ladder):
+            height = max(1, round(current.height * width / current.width))
+            if current.width != width:
+                current = current.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                if fmt == "webp" and width == main_width:
+                    path = save_path
+                else:
+                    path = variant_path(save_path, width, fmt)
+                size = _save_atomic(current, path, fmt)
+                variants.append({
+                    "url": url_of(path),
+                    "type": VARIANT_FORMATS[fmt][1],
+                    "width": width,
+                    "height": height,
+                    "bytes": size,
+                })
+            if width == main_width:
+                main = (width, height)
+                if "webp" not in formats:
+                    _save_atomic(current, save_path, "webp")
+
+    variants.sort(key=lambda v: (v["type"], v["width"]))
+    manifest = {
+        "src": public_url(*os.path.split(relative)),
+        "width": main[0],
+        "height": main[1],
+        "variants": variants,
+    }
+
+    # Le varianti di un caricamento precedente non più generate vanno rimosse
+    previous = read_manifest(save_path)
+    write_json_atomic(manifest_path(save_path), manifest)
+    if previous:
+        current_urls = {v["url"] for v in variants} | {manifest["src"]}
+        for variant in previous.get("variants", []):
+            if variant["url"] not in current_urls:
+                stale = os.path.join(base_upload_folder, *variant["url"][len("/static/uploads/"):].split("/"))
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+    return manifest
+
+
+def read_manifest(save_path: str):
+    """Manifest delle varianti di un'immagine, o None se non esiste"""
+    try:
+        with open(manifest_path(save_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
 def convert_and_save_image(
         file: FileStorage,
         base_upload_folder: str,
@@ -17,6 +227,7 @@ def convert_and_save_image(
     """
     Converte un'immagine in WebP e la salva in una struttura di cartelle logica.
     Gestisce sia le immagini degli articoli che gli avatar degli utenti.
+    (Elaborazione sincrona: gli upload usano image_jobs, in background.)
 
     Args:
         file: L'oggetto file.
@@ -31,59 +242,92 @@ def convert_and_save_image(
         L'URL pubblico del file salvato.
     """
     try:
-        if subfolder == 'articles':
-            if not slug:
-                raise ValueError("Lo 'slug' è richiesto per le immagini degli articoli.")
+        relative_dir, new_filename = destination_for(
+            subfolder, slug=slug, username=username, image_type=image_type, index=index
+        )
+        save_path = os.path.join(base_upload_folder, relative_dir, new_filename)
+        render_webp(file.stream, save_path, subfolder)
 
-            # Es: .../static/uploads/articles/il-mio-primo-articolo
-            destination_folder = os.path.join(base_upload_folder, subfolder, slug)
+        # Costruisce l'URL pubblico corretto
+        return public_url(relative_dir, new_filename)
 
-            if image_type == 'cover':
-                new_filename = f"img_{slug}_copertina.webp"
-            else:
-                new_filename = f"img_{slug}_{index}.webp"
+    except Exception as e:
+        print(f"Errore in convert_and_save_image: {e}")
+        raise e
 
-        elif subfolder == 'avatars':
-            if not username:
-                raise ValueError("Lo 'username' è richiesto per gli avatar.")
 
-            # Es: .../static/uploads/avatars
-            destination_folder = os.path.join(base_upload_folder, subfolder)
+# ====================================================================
+# Elaborazione in background (processo separato o worker Celery)
+# Nessuna dipendenza da Flask: la funzione gira anche in un process pool.
+# Per ogni job in uploads/_incoming:
+#   <job_id>.json   specifica (originale, destinazione, tipo,
+#                   larghezze e formati delle varianti)       -> in corso
+#   <job_id>.error  errore dell'ultima elaborazione             -> fallito
+#   nessuno dei due                                             -> pronto
+# ====================================================================
+def job_paths(base_upload_folder: str, job_id: str) -> dict:
+    incoming = os.path.join(base_upload_folder, INCOMING_FOLDER)
+    return {
+        "spec": os.path.join(incoming, f"{job_id}.json"),
+        "error": os.path.join(incoming, f"{job_id}.error"),
+    }
 
-            new_filename = f"profile_img_{username}.webp"
 
-        else:
-            raise ValueError(f"Sottocartella '{subfolder}' non supportata.")
+def write_json_atomic(path: str, data: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
 
-        os.makedirs(destination_folder, exist_ok=True)
-        save_path = os.path.join(destination_folder, new_filename)
 
-        with Image.open(file.stream) as img:
-            if img.mode != "RGB":
-                img = img.convert("RGB")
+def process_job(base_upload_folder: str, job_id: str) -> str:
+    """
+    Elabora un upload in attesa e sostituisce atomicamente l'immagine finale
 
-            # Ridimensionamento specifico per tipo
-            if subfolder == 'avatars':
-                # Avatar sono quadrati e più piccoli
-                size = (256, 256)
-                img = img.resize(size, Image.Resampling.LANCZOS)
-            else:
-                # Immagini articoli più grandi
-                max_width = 1200
-                if img.width > max_width:
-                    height = int((max_width / img.width) * img.height)
-                    img = img.resize((max_width, height), Image.Resampling.LANCZOS)
+    Returns:
+        'ready', 'failed' o 'missing' (job già elaborato da un altro processo)
+    """
+    paths = job_paths(base_upload_folder, job_id)
+    try:
+        with open(paths["spec"], encoding="utf-8") as f:
+            spec = json.load(f)
+    except FileNotFoundError:
+        return "missing"
 
-            img.save(save_path, "webp", quality=85)
+    source = os.path.join(base_upload_folder, spec["source"])
+    destination = os.path.join(base_upload_folder, spec["destination"])
+    try:
+        if spec.get("widths"):
+            render_variants(source, destination, base_upload_folder, spec["widths"], spec.get("formats") or ("webp",))
+        else:
+            render_webp(source, destination, spec["subfolder"])
+    except FileNotFoundError:
+        # Originale già consumato da un'elaborazione concorrente
+        return "missing"
+    except Exception as e:
+        write_json_atomic(paths["error"], {"error": str(e)})
+        status = "failed"
+    else:
+        status = "ready"
 
-        # Costruisce l'URL pubblico corretto
-        if subfolder == 'articles':
-            public_url = f"/static/uploads/{subfolder}/{slug}/{new_filename}"
-        else:  # per 'avatars'
-            public_url = f"/static/uploads/{subfolder}/{new_filename}"
+    for path in (paths["spec"], source):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return status
 
-        return public_url
 
-    except Exception as e:
-        print(f"Errore in convert_and_save_image: {e}")
-        raise e
\ No newline at end of file
+def job_status(base_upload_folder: str, job_id: str) -> dict:
+    """Stato di un job dai file in _incoming"""
+    paths = job_paths(base_upload_folder, job_id)
+    if os.path.exists(paths["error"]):
+        try:
+            with open(paths["error"], encoding="utf-8") as f:
+                error = json.load(f).get("error")
+        except (OSError, ValueError):
+            error = None
+        return {"status": "failed", "error": error}
+    if os.path.exists(paths["spec"]):
+        return {"status": "processing"}
+    return {"status": "ready"}
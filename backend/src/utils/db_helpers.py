@@ -0,0 +1,119 @@
+"""
+Database helpers for Rio Capital Blog
+Utility per operazioni set-based e differenze tra dialetti SQL
+"""
+from itertools import islice
+
+from sqlalchemy import String, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from src.extensions import db
+
+
+# Dimensione di default dei chunk per statement IN (...)
+# Resta ben sotto i limiti dei parametri di SQLite (999 nelle build più vecchie)
+DEFAULT_CHUNK_SIZE = 500
+
+
+def chunked(iterable, size=DEFAULT_CHUNK_SIZE):
+    """
+    Divide un iterabile in liste di al massimo `size` elementi
+
+    Args:
+        iterable: Sequenza o generatore di valori
+        size: Numero massimo di elementi per chunk
+
+    Yields:
+        Liste di elementi consecutivi
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def dialect_name():
+    """Nome del dialetto del database corrente (es: 'sqlite', 'postgresql')"""
+    return db.engine.dialect.name
+
+
+def insert_ignore(table):
+    """
+    INSERT che salta le righe in conflitto con un vincolo unico
+
+    ON CONFLICT DO NOTHING su PostgreSQL/SQLite, INSERT IGNORE su MySQL.
+    Da eseguire con una lista di dizionari (executemany).
+    """
+    dialect = dialect_name()
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+
+    from sqlalchemy import insert
+    return insert(table).prefix_with("IGNORE", dialect="mysql")
+
+
+def supports_returning(statement_type="delete"):
+    """
+    Verifica se il dialetto supporta RETURNING per il tipo di statement
+
+    Args:
+        statement_type: 'insert', 'update' o 'delete'
+
+    Returns:
+        True se il driver può restituire righe dallo statement
+    """
+    dialect = db.engine.dialect
+    return bool(getattr(dialect, f"{statement_type}_returning", False))
+
+
+class group_concat(FunctionElement):
+    """
+    Concatenazione di stringhe aggregata, portabile tra dialetti
+
+    Compila in GROUP_CONCAT su SQLite/MySQL e in string_agg su PostgreSQL.
+
+    Usage:
+        select(Comment.id, group_concat(CommentReport.reason, distinct=True))
+    """
+    name = "group_concat"
+    type = String()
+    # Il separatore e DISTINCT cambiano l'SQL generato: niente cache degli statement
+    inherit_cache = False
+
+    def __init__(self, expr, separator=",", distinct=False):
+        self.separator = separator
+        self.distinct = distinct
+        super().__init__(expr)
+
+
+@compiles(group_concat)
+def _compile_group_concat(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    if element.distinct:
+        # SQLite non accetta un separatore insieme a DISTINCT (usa sempre ',')
+        return f"GROUP_CONCAT(DISTINCT {expr})"
+    separator = compiler.process(literal(element.separator), **{**kw, "literal_binds": True})
+    return f"GROUP_CONCAT({expr}, {separator})"
+
+
+@compiles(group_concat, "mysql")
+def _compile_group_concat_mysql(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    separator = compiler.process(literal(element.separator), **{**kw, "literal_binds": True})
+    distinct = "DISTINCT " if element.distinct else ""
+    return f"GROUP_CONCAT({distinct}{expr} SEPARATOR {separator})"
+
+
+@compiles(group_concat, "postgresql")
+def _compile_group_concat_postgresql(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    separator = compiler.process(literal(element.separator), **{**kw, "literal_binds": True})
+    distinct = "DISTINCT " if element.distinct else ""
+    return f"string_agg({distinct}CAST({expr} AS TEXT), {separator})"
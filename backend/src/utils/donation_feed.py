@@ -0,0 +1,124 @@
+"""
+Donation feed for Rio Capital Blog
+Payload pubblico delle donazioni recenti (widget della homepage) con i
+totali dei donatori, tenuto in memoria in ogni worker e copiato su Redis.
+
+Il feed viene ricostruito solo quando una donazione viene creata, completata
+o rimborsata (refresh_donation_feed dopo il commit); le letture costano un
+GET della generazione e nessuna query sulle donazioni.
+"""
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import desc
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.extensions import db
+from src.models.donation import Donation
+from src.utils.redis_cache import bump_generation, cache, get_generation
+from src.utils.stats import count_if, run_stats, sum_if, table_stats
+
+
+GENERATION_NAME = "donation_feed"
+
+# Donazioni tenute nel feed (limite massimo di /api/donations/recent)
+FEED_SIZE = 50
+
+# Le copie su Redis sono per generazione: quelle superate scadono da sole
+REDIS_TTL = 7 * 24 * 3600
+
+_feed = None
+_feed_generation = None
+_lock = threading.Lock()
+
+
+def _redis_key(generation):
+    return f"donations:feed:{generation}"
+
+
+def _public(donation):
+    return {
+        "id": donation.id,
+        "donor_name": donation.donor_name if not donation.anonymous else None,
+        "anonymous": donation.anonymous,
+        "amount": donation.amount,
+        "message": donation.message,
+        "avatar_url": None,  # Non abbiamo avatar per ora
+        "created_at": donation.created_at.isoformat(),
+    }
+
+
+def build_feed():
+    """Legge dal database le ultime donazioni completate e i totali"""
+    completed = Donation.status == "completed"
+    donations = (
+        Donation.query.filter(completed)
+        .order_by(desc(Donation.created_at))
+        .limit(FEED_SIZE)
+        .all()
+    )
+    totals = run_stats({
+        "totals": table_stats(
+            Donation,
+            where=(completed,),
+            donors=count_if(),
+            amount=sum_if(Donation.amount),
+        )
+    })["totals"]
+
+    return {
+        "donations": [_public(donation) for donation in donations],
+        "total_donors": totals["donors"] or 0,
+        "total_amount": round(totals["amount"] or 0, 2),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def get_feed():
+    """
+    Restituisce il feed del worker: lo ricarica (da Redis o, se manca, dal
+    database) solo se la generazione è cambiata dall'ultima lettura
+    """
+    global _feed, _feed_generation
+
+    try:
+        generation = get_generation(GENERATION_NAME)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Donation feed generation unavailable: {e}")
+        if _feed is not None:
+            return _feed
+        generation = None
+
+    if _feed is not None and generation == _feed_generation:
+        return _feed
+
+    with _lock:
+        if _feed is None or generation != _feed_generation:
+            feed = cache.get(_redis_key(generation)) if generation is not None else None
+            if feed is None:
+                feed = build_feed()
+                if generation is not None:
+                    cache.set(_redis_key(generation), feed, REDIS_TTL)
+            _feed, _feed_generation = feed, generation
+
+    return _feed
+
+
+def refresh_donation_feed():
+    """
+    Ricostruisce il feed dopo il commit di una donazione creata, completata
+    o rimborsata e lo rende visibile a tutti i worker
+    """
+    global _feed, _feed_generation
+
+    try:
+        generation = bump_generation(GENERATION_NAME)
+        feed = build_feed()
+        cache.set(_redis_key(generation), feed, REDIS_TTL)
+        with _lock:
+            _feed, _feed_generation = feed, generation
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Donation feed refresh error: {e}")
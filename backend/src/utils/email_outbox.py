@@ -0,0 +1,266 @@
+"""
+Email outbox for Rio Capital Blog
+Le email transazionali (iscrizione, contatti, warning, ban) non sono più
+inviate dentro la richiesta HTTP: la route scrive una riga email_outbox
+nella stessa transazione della modifica e risponde subito; il dispatcher
+(task Celery o 'flask dispatch-emails --watch') svuota la coda a blocchi
+sulle connessioni del pool SMTP, con nuovi tentativi a backoff esponenziale.
+
+Consegna almeno una volta: una riga rimasta in 'sending' oltre
+SENDING_TIMEOUT (worker morto durante l'invio) torna in coda.
+"""
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, select, update
+
+from src.extensions import db
+from src.models.email_outbox import EmailOutbox
+from src.utils.db_helpers import dialect_name
+from src.utils.redis_cache import cache
+
+
+DEFAULT_BATCH_SIZE = 50
+
+# Tentativi prima di marcare un'email come 'failed' e attesa tra i tentativi
+# (60s, 2m, 4m, ... fino a RETRY_MAX_SECONDS)
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+# Oltre questo tempo in 'sending' la riga è considerata orfana
+SENDING_TIMEOUT = 600
+
+# Tempo massimo di un giro del dispatcher (sotto il soft time limit Celery)
+TIME_BUDGET_SECONDS = 200
+
+# Giorni di conservazione delle email inviate
+RETENTION_DAYS = 30
+
+DISPATCH_COUNTDOWN = 1
+SCHEDULE_LOCK_KEY = "email:outbox:scheduled"
+
+
+def queue_email(kind, to_email, subject, html_body, text_body=None):
+    """
+    Aggiunge un'email alla sessione corrente, senza commit: viene salvata
+    (o scartata) insieme alla modifica che la genera
+    """
+    message = EmailOutbox(
+        kind=kind,
+        to_email=to_email,
+        subject=subject,
+        html_body=html_body,
+        text_body=text_body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(message)
+    return message
+
+
+def queue_message(kind, *args):
+    """
+    Accoda un messaggio composto da EmailService.compose_<kind>
+
+    Usage:
+        queue_message("newsletter_confirmation", email)
+        db.session.commit()
+        schedule_dispatch()
+    """
+    from src.utils.email_service import email_service
+
+    return queue_email(kind, **getattr(email_service, f"compose_{kind}")(*args))
+
+
+def schedule_dispatch():
+    """
+    Accoda il dispatcher dopo il commit, al più un task per finestra di
+    DISPATCH_COUNTDOWN secondi (SET NX su Redis). Senza Redis il broker non
+    è disponibile: le email restano in coda per il task periodico o per
+    'flask dispatch-emails'.
+    """
+    from src.celery_app import dispatch_email_outbox_task
+
+    if cache.redis_client is None:
+        return
+
+    try:
+        if not cache.redis_client.set(SCHEDULE_LOCK_KEY, b"1", nx=True, ex=DISPATCH_COUNTDOWN):
+            return
+        dispatch_email_outbox_task.apply_async(countdown=DISPATCH_COUNTDOWN, retry=False)
+    except Exception as e:
+        current_app.logger.warning(f"Email dispatcher not scheduled, left to beat: {e}")
+
+
+def retry_delay(attempts):
+    """Attesa prima del tentativo successivo (con un po' di jitter)"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def _release_stale(now):
+    """Rimette in coda le righe rimaste in 'sending' da un dispatcher morto"""
+    db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.status == "sending",
+            EmailOutbox.claimed_at < now - timedelta(seconds=SENDING_TIMEOUT),
+        )
+        .values(status="pending", claim_token=None, next_attempt_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _claim_batch(batch_size):
+    """Prenota un blocco di email pronte (claim_token), con commit"""
+    now = datetime.utcnow()
+    query = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(batch_size)
+    )
+    if dialect_name() == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    ids = db.session.execute(query).scalars().all()
+    if not ids:
+        db.session.commit()
+        return []
+
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), EmailOutbox.status == "pending")
+        .values(status="sending", claim_token=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return db.session.execute(
+        select(
+            EmailOutbox.id,
+            EmailOutbox.to_email,
+            EmailOutbox.subject,
+            EmailOutbox.html_body,
+            EmailOutbox.text_body,
+            EmailOutbox.attempts,
+        ).where(EmailOutbox.claim_token == token, EmailOutbox.status == "sending")
+    ).all()
+
+
+def _record_results(results):
+    """
+    Esito di un blocco: UPDATE executemany, un commit
+
+    Returns:
+        Dizionario {sent, retry, failed}
+    """
+    now = datetime.utcnow()
+    sent, retry = [], []
+    totals = {"sent": 0, "retry": 0, "failed": 0}
+
+    for outbox_id, attempts, ok, message in results:
+        attempts += 1
+        if ok:
+            sent.append({"outbox_id": outbox_id, "attempts": attempts})
+            totals["sent"] += 1
+            continue
+        exhausted = attempts >= MAX_ATTEMPTS
+        retry.append({
+            "outbox_id": outbox_id,
+            "attempts": attempts,
+            "new_status": "failed" if exhausted else "pending",
+            "retry_at": now + timedelta(seconds=retry_delay(attempts)),
+            "message": message,
+        })
+        totals["failed" if exhausted else "retry"] += 1
+
+    table = EmailOutbox.__table__
+    if sent:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("outbox_id"))
+            .values(status="sent", sent_at=now, attempts=bindparam("attempts"), last_error=None, claim_token=None),
+            sent,
+        )
+    if retry:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("outbox_id"))
+            .values(
+                status=bindparam("new_status"),
+                attempts=bindparam("attempts"),
+                next_attempt_at=bindparam("retry_at"),
+                last_error=bindparam("message"),
+                claim_token=None,
+            ),
+            retry,
+        )
+    db.session.commit()
+    return totals
+
+
+def dispatch_pending(batch_size=DEFAULT_BATCH_SIZE, time_budget=TIME_BUDGET_SECONDS):
+    """
+    Invia le email pronte a blocchi di batch_size, in parallelo sulle
+    connessioni del pool SMTP, fino a coda vuota o al time budget
+
+    Returns:
+        Dizionario {sent, retry, failed, seconds}
+    """
+    from src.utils.email_service import EmailService
+
+    service = EmailService()
+    started = time.monotonic()
+    totals = {"sent": 0, "retry": 0, "failed": 0}
+
+    _release_stale(datetime.utcnow())
+
+    def deliver(row):
+        ok, message = service.send_email(row.to_email, row.subject, row.html_body, row.text_body)
+        return row.id, row.attempts, ok, None if ok else message
+
+    with ThreadPoolExecutor(max_workers=service.pool.max_size) as executor:
+        while time.monotonic() - started < time_budget:
+            rows = _claim_batch(batch_size)
+            if not rows:
+                break
+
+            for key, value in _record_results(list(executor.map(deliver, rows))).items():
+                totals[key] += value
+
+            if len(rows) < batch_size:
+                break
+
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    return totals
+
+
+def outbox_stats():
+    """Numero di email per stato (per il comando CLI)"""
+    return dict(
+        db.session.execute(
+            select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        ).all()
+    )
+
+
+def purge_sent(retention_days=RETENTION_DAYS):
+    """Elimina le email inviate più vecchie di retention_days"""
+    result = db.session.execute(
+        delete(EmailOutbox)
+        .where(
+            EmailOutbox.status == "sent",
+            EmailOutbox.sent_at < datetime.utcnow() - timedelta(days=retention_days),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,218 @@
+"""
+Email templates for Rio Capital Blog
+Template Jinja2 in src/templates/email, compilati una volta per processo.
+
+- il CSS di styles.css (e dei blocchi <style data-inline>) viene copiato
+  negli attributi style="" al caricamento del sorgente, una volta prima
+  della compilazione: i client email ignorano gran parte dei <style>
+- per gli invii massivi render_skeleton renderizza il template una sola
+  volta con dei segnaposto per i campi del destinatario; per ogni
+  destinatario resta solo la sostituzione dei segnaposto (Skeleton.fill)
+"""
+import os
+import re
+import threading
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup, escape
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+STYLESHEET = "styles.css"
+
+_STYLE_BLOCK = re.compile(r"<style[^>]*\bdata-inline\b[^>]*>(.*?)</style>\s*", re.S | re.I)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_RULE = re.compile(r"([^{}]+)\{([^}]*)\}")
+_SIMPLE_SELECTOR = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9]*|\.[a-zA-Z0-9_-]+)$")
+_OPEN_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*?)(\s*/?)>")
+_CLASS_ATTR = re.compile(r'\sclass="([^"]*)"')
+_STYLE_ATTR = re.compile(r'\sstyle="([^"]*)"')
+
+# Segnaposto dei campi del destinatario nel testo renderizzato
+_PLACEHOLDER = re.compile(r"\x00([a-zA-Z_][a-zA-Z0-9_]*)\x00")
+
+
+def _parse_css(css):
+    """
+    Regole {selettore: [dichiarazioni]} per selettori di tag (p) o di
+    classe (.header), anche separati da virgole. Selettori composti non
+    sono supportati: errore al caricamento invece di stili persi.
+    """
+    rules = {}
+    for selectors, body in _CSS_RULE.findall(_CSS_COMMENT.sub("", css)):
+        declarations = [d.strip() for d in body.split(";") if d.strip()]
+        for selector in (s.strip() for s in selectors.split(",")):
+            if not _SIMPLE_SELECTOR.match(selector):
+                raise ValueError(f"Selettore CSS non supportato nei template email: {selector!r}")
+            rules.setdefault(selector.lower() if selector[0] != "." else selector, []).extend(declarations)
+    return rules
+
+
+def inline_css(source, stylesheet=""):
+    """
+    Sposta negli attributi style dei tag il CSS del foglio di stile condiviso
+    e dei blocchi <style data-inline> del sorgente
+    """
+    blocks = [stylesheet] + _STYLE_BLOCK.findall(source)
+    rules = {}
+    for block in blocks:
+        for selector, declarations in _parse_css(block).items():
+            rules.setdefault(selector, []).extend(declarations)
+    if not rules:
+        return source
+    source = _STYLE_BLOCK.sub("", source)
+
+    def apply(match):
+        tag, attrs, closing = match.groups()
+        declarations = list(rules.get(tag.lower(), []))
+        classes = _CLASS_ATTR.search(attrs)
+        if classes:
+            for name in classes.group(1).split():
+                declarations.extend(rules.get(f".{name}", []))
+        if not declarations:
+            return match.group(0)
+
+        # Lo style già presente sul tag ha la precedenza (viene dopo)
+        existing = _STYLE_ATTR.search(attrs)
+        if existing:
+            declarations.append(existing.group(1).strip().rstrip(";"))
+            attrs = _STYLE_ATTR.sub("", attrs, count=1)
+        attrs = _CLASS_ATTR.sub("", attrs, count=1)
+        return f'<{tag}{attrs} style="{"; ".join(declarations)}"{closing}>'
+
+    return _OPEN_TAG.sub(apply, source)
+
+
+class InlineCSSLoader(FileSystemLoader):
+    """
+    FileSystemLoader che applica inline_css ai template HTML prima della
+    compilazione (il foglio di stile vale anche per i template estesi)
+    """
+
+    def __init__(self, searchpath, stylesheet=STYLESHEET):
+        super().__init__(searchpath)
+        path = os.path.join(searchpath, stylesheet)
+        self.stylesheet = ""
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.stylesheet = f.read()
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith(".html"):
+            source = inline_css(source, self.stylesheet)
+        return source, filename, uptodate
+
+
+# auto_reload=False: i template compilati restano in cache senza stat dei file
+environment = Environment(
+    loader=InlineCSSLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    keep_trailing_newline=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+def render(template, /, **context):
+    """Renderizza un template (compilato alla prima richiesta, poi in cache)"""
+    return environment.get_template(template).render(**context)
+
+
+def render_email(template, /, **context):
+    """
+    Corpo HTML e testo di un'email: '<template>.html' e, se esiste,
+    '<template>.txt'
+
+    Returns:
+        (html_body, text_body o None)
+    """
+    html_body = render(f"{template}.html", **context)
+    text_body = render(f"{template}.txt", **context) if _exists(f"{template}.txt") else None
+    return html_body, text_body
+
+
+_existing = {}
+
+
+def _exists(name):
+    if name not in _existing:
+        _existing[name] = os.path.exists(os.path.join(TEMPLATE_DIR, name))
+    return _existing[name]
+
+
+class _RecipientPlaceholders:
+    """`recipient.<campo>` nel template diventa un segnaposto da sostituire dopo"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Markup(f"\x00{name}\x00")
+
+
+class Skeleton:
+    """
+    Template già renderizzato con i segnaposto dei campi del destinatario
+    fill() concatena le parti fisse con i valori (con escape HTML se il
+    template è HTML): nessun rendering Jinja per destinatario.
+    """
+
+    def __init__(self, rendered, autoescape):
+        self.parts = _PLACEHOLDER.split(rendered)
+        self.autoescape = autoescape
+        self.fields = frozenset(self.parts[1::2])
+
+    def fill(self, **values):
+        output = []
+        for index, part in enumerate(self.parts):
+            if index % 2 == 0:
+                output.append(part)
+            else:
+                value = values.get(part, "")
+                output.append(str(escape(value)) if self.autoescape else str(value))
+        return "".join(output)
+
+
+def render_skeleton(template, /, **context):
+    """
+    Renderizza una volta un template di invio massivo. I campi per
+    destinatario vanno scritti come {{ recipient.email }} (senza filtri):
+    restano segnaposto fino a Skeleton.fill(email=...).
+    """
+    rendered = render(template, recipient=_RecipientPlaceholders(), **context)
+    return Skeleton(rendered, autoescape=template.endswith(".html"))
+
+
+# Skeleton delle campagne, per versione della campagna
+CAMPAIGN_CACHE_SIZE = 32
+
+_campaign_skeletons = {}
+_campaign_lock = threading.Lock()
+
+
+def campaign_skeletons(campaign):
+    """
+    Skeleton HTML e testo di una campagna newsletter, renderizzati una volta
+    per processo e versione (updated_at) della campagna
+
+    Returns:
+        (Skeleton html, Skeleton testo o None)
+    """
+    key = (campaign.id, campaign.updated_at)
+    skeletons = _campaign_skeletons.get(key)
+    if skeletons is not None:
+        return skeletons
+
+    context = {"subject": campaign.subject}
+    html = render_skeleton("campaign.html", content=Markup(campaign.html_body), **context)
+    text = (
+        render_skeleton("campaign.txt", content=campaign.text_body, **context)
+        if campaign.text_body else None
+    )
+
+    with _campaign_lock:
+        if len(_campaign_skeletons) >= CAMPAIGN_CACHE_SIZE:
+            _campaign_skeletons.clear()
+        _campaign_skeletons[key] = (html, text)
+    return html, text
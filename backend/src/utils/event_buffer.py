@@ -0,0 +1,142 @@
+"""
+Analytics event buffer for Rio Capital Blog
+Il beacon accoda gli eventi senza toccare il database: lista Redis in
+produzione, file append-only in locale. Il drainer Celery li svuota a blocchi.
+"""
+import glob
+import json
+import os
+import time
+
+from flask import current_app
+
+from src.utils.redis_cache import cache
+
+
+REDIS_KEY = "analytics:events"
+REDIS_PROCESSING_KEY = "analytics:events:processing"
+
+# Un segmento ruotato non riceve più scritture dopo pochi millisecondi;
+# il drainer lo legge solo dopo questo margine
+SEGMENT_GRACE_SECONDS = 2
+
+
+def _use_redis():
+    return cache.redis_client is not None
+
+
+def _buffer_dir():
+    folder = current_app.config["ANALYTICS_EVENT_DIR"]
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def append_events(events):
+    """
+    Accoda eventi già validati (lista di dict serializzabili in JSON)
+    Un solo RPUSH, oppure una sola write O_APPEND (atomica tra processi per
+    righe piccole).
+    """
+    lines = [json.dumps(event, separators=(",", ":")) for event in events]
+    if not lines:
+        return
+
+    if _use_redis():
+        try:
+            cache.redis_client.rpush(REDIS_KEY, *lines)
+            return
+        except Exception as e:
+            current_app.logger.warning(f"Event buffer Redis error, using file: {e}")
+
+    path = os.path.join(_buffer_dir(), "events.log")
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _decode(lines):
+    events = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events
+
+
+def drain_redis(handler, batch_size):
+    """
+    Svuota la lista Redis: RENAME atomico nella lista 'processing', poi blocchi
+    LRANGE -> handler -> LTRIM. Se il drainer muore, la lista 'processing'
+    viene ripresa al giro successivo (al più un blocco riprocessato).
+    """
+    client = cache.redis_client
+    if not client.exists(REDIS_PROCESSING_KEY):
+        if not client.exists(REDIS_KEY):
+            return 0
+        client.renamenx(REDIS_KEY, REDIS_PROCESSING_KEY)
+
+    processed = 0
+    while True:
+        lines = client.lrange(REDIS_PROCESSING_KEY, 0, batch_size - 1)
+        if not lines:
+            break
+        handler(_decode(lines))
+        client.ltrim(REDIS_PROCESSING_KEY, len(lines), -1)
+        processed += len(lines)
+    return processed
+
+
+def drain_files(handler, batch_size):
+    """
+    Svuota i segmenti su file: elabora i segmenti ruotati al giro precedente,
+    poi ruota il file attivo in un nuovo segmento (os.replace atomico)
+    """
+    folder = _buffer_dir()
+    processed = 0
+    now = time.time()
+
+    for segment in sorted(glob.glob(os.path.join(folder, "segment-*.log"))):
+        if now - os.path.getmtime(segment) < SEGMENT_GRACE_SECONDS:
+            continue
+        with open(segment, "rb") as f:
+            batch = []
+            for line in f:
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    handler(_decode(batch))
+                    processed += len(batch)
+                    batch = []
+            if batch:
+                handler(_decode(batch))
+                processed += len(batch)
+        os.remove(segment)
+
+    active = os.path.join(folder, "events.log")
+    if os.path.exists(active) and os.path.getsize(active) > 0:
+        os.replace(active, os.path.join(folder, f"segment-{time.time_ns()}.log"))
+
+    return processed
+
+
+def drain_events(handler, batch_size=1000):
+    """
+    Passa al handler gli eventi bufferizzati in blocchi di batch_size
+
+    Returns:
+        Numero di eventi letti
+    """
+    processed = 0
+    if _use_redis():
+        processed += drain_redis(handler, batch_size)
+    # Anche con Redis attivo: eventi scritti su file durante un'interruzione di Redis
+    processed += drain_files(handler, batch_size)
+    return processed
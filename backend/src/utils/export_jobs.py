@@ -0,0 +1,227 @@
+"""
+Background export jobs for Rio Capital Blog
+Scrive gli export in chunk con checkpoint su export_job, così un job
+interrotto (crash del worker, time limit) riprende dall'ultimo chunk
+"""
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_, update
+
+from src.extensions import db
+from src.models.analytics import ExportJob
+from src.utils.exporters import arrow_schema, count_rows, iter_rows, serialize, EXPORTS
+
+
+JOB_FORMATS = ("csv", "ndjson", "parquet")
+
+# Righe lette e scritte per ogni checkpoint
+EXPORT_CHUNK_SIZE = 5000
+
+# Durata del lease: oltre questo tempo senza checkpoint il job è considerato orfano
+LEASE_SECONDS = 300
+
+# Tempo massimo per esecuzione del task, sotto task_soft_time_limit di Celery;
+# superato il budget il task salva il checkpoint e si riaccoda
+TIME_BUDGET_SECONDS = 200
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def job_file_path(job):
+    folder = current_app.config["EXPORT_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"export_{job.id}_{job.export_type}.{job.format}")
+
+
+def download_name(job):
+    stamp = (job.created_at or datetime.utcnow()).strftime("%Y%m%d")
+    return f"analytics_{job.export_type}_{stamp}.{job.format}"
+
+
+def claim_job(job_id):
+    """
+    Acquisisce il job per questo worker (UPDATE condizionale sul lease)
+    Due consegne dello stesso task non possono scrivere lo stesso file insieme.
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(ExportJob)
+        .where(
+            ExportJob.id == job_id,
+            ExportJob.status.in_(["pending", "running"]),
+            or_(ExportJob.lease_expires_at.is_(None), ExportJob.lease_expires_at < now),
+        )
+        .values(status="running", lease_expires_at=now + timedelta(seconds=LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+class _TextWriter:
+    """CSV/NDJSON: file unico, troncato a bytes_written alla ripresa"""
+
+    def __init__(self, job, path):
+        self.job = job
+        self.file = open(path, "r+b" if os.path.exists(path) else "wb")
+        self.file.truncate(job.bytes_written)
+        self.file.seek(job.bytes_written)
+
+    def write_chunk(self, rows):
+        include_header = self.job.bytes_written == 0
+        for block in serialize(self.job.export_type, self.job.format, rows, include_header=include_header):
+            self.file.write(block.encode("utf-8"))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.job.bytes_written = self.file.tell()
+
+    def finalize(self):
+        if self.job.bytes_written == 0 and self.job.format == "csv":
+            # Export vuoto: solo l'intestazione
+            self.write_chunk([])
+        self.file.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class _ParquetWriter:
+    """Parquet: un file part per chunk, uniti in un solo file alla fine"""
+
+    def __init__(self, job, path):
+        self.job = job
+        self.path = path
+        self.parts_dir = f"{path}.parts"
+        self.schema = arrow_schema(job.export_type)
+        os.makedirs(self.parts_dir, exist_ok=True)
+
+        # Part scritti dopo l'ultimo checkpoint non sono validi
+        for name in os.listdir(self.parts_dir):
+            index = int(name.split("-")[1].split(".")[0]) if name.startswith("part-") else None
+            if index is None or index > job.parts_written:
+                os.remove(os.path.join(self.parts_dir, name))
+
+    def _part_path(self, index):
+        return os.path.join(self.parts_dir, f"part-{index:05d}.parquet")
+
+    def write_chunk(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields = EXPORTS[self.job.export_type]["fields"]
+        table = pa.table(
+            {field: [row[i] for row in rows] for i, field in enumerate(fields)},
+            schema=self.schema,
+        )
+        index = self.job.parts_written + 1
+        tmp_path = f"{self._part_path(index)}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self._part_path(index))
+
+        self.job.parts_written = index
+        self.job.bytes_written += os.path.getsize(self._part_path(index))
+
+    def finalize(self):
+        import pyarrow.parquet as pq
+
+        tmp_path = f"{self.path}.tmp"
+        with pq.ParquetWriter(tmp_path, self.schema) as writer:
+            if self.job.parts_written == 0:
+                writer.write_table(self.schema.empty_table())
+            for index in range(1, self.job.parts_written + 1):
+                writer.write_table(pq.read_table(self._part_path(index), schema=self.schema))
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+    def close(self):
+        pass
+
+
+def run_export_job(job_id, time_budget=TIME_BUDGET_SECONDS):
+    """
+    Esegue (o riprende) un export job fino al completamento o al time budget
+
+    Returns:
+        'completed', 'requeue' (budget esaurito, checkpoint salvato) o
+        'skipped' (job già completato o in esecuzione su un altro worker)
+    """
+    if not claim_job(job_id):
+        return "skipped"
+
+    job = db.session.get(ExportJob, job_id)
+    deadline = time.monotonic() + time_budget
+    writer = None
+
+    try:
+        if job.total_rows is None:
+            job.total_rows = count_rows(job.export_type)
+            db.session.commit()
+
+        path = job_file_path(job)
+        writer = _ParquetWriter(job, path) if job.format == "parquet" else _TextWriter(job, path)
+
+        while True:
+            rows = list(iter_rows(job.export_type, after_id=job.last_id, limit=EXPORT_CHUNK_SIZE))
+            if not rows:
+                break
+
+            writer.write_chunk(rows)
+            job.last_id = rows[-1][0]
+            job.rows_written += len(rows)
+            job.lease_expires_at = datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)
+            db.session.commit()
+
+            if time.monotonic() > deadline:
+                job.lease_expires_at = None
+                db.session.commit()
+                return "requeue"
+
+        writer.finalize()
+        job.status = "completed"
+        job.file_path = path
+        job.completed_at = datetime.utcnow()
+        job.lease_expires_at = None
+        db.session.commit()
+        return "completed"
+
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ExportJob, job_id)
+        job.status = "failed"
+        job.error = str(e)
+        job.lease_expires_at = None
+        db.session.commit()
+        current_app.logger.error(f"Export job {job_id} failed: {e}")
+        raise
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def stale_job_ids(now=None):
+    """Job non completati il cui lease è scaduto (worker morto o task perso)"""
+    now = now or datetime.utcnow()
+    return [
+        job_id
+        for (job_id,) in db.session.query(ExportJob.id).filter(
+            ExportJob.status.in_(["pending", "running"]),
+            or_(
+                ExportJob.lease_expires_at < now,
+                (ExportJob.lease_expires_at.is_(None))
+                & (ExportJob.updated_at < now - timedelta(seconds=LEASE_SECONDS)),
+            ),
+        )
+    ]
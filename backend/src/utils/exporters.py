@@ -0,0 +1,333 @@
+"""
+Data exporters for Rio Capital Blog
+Export CSV/NDJSON in streaming: cursori lato server (yield_per) e conteggi
+per entità pre-aggregati con subquery, quindi memoria costante e numero di
+query indipendente dalla dimensione delle tabelle
+"""
+import csv
+import json
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from sqlalchemy import String, cast, func, select
+
+from src.extensions import db
+from src.models.article import Article
+from src.models.category import Category
+from src.models.comment import Comment
+from src.models.donation import Donation
+from src.models.like import ArticleLike
+from src.models.newsletter import NewsletterSubscriber
+from src.models.share import Share
+from src.models.user import User
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Formato disponibile solo per gli export in background
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+# Righe lette dal cursore per ogni fetch
+YIELD_PER = 1000
+
+# Righe serializzate accumulate prima di emettere un chunk della risposta
+FLUSH_EVERY = 500
+
+
+def _count_by(column, key_column):
+    """Subquery (key, n) con il conteggio di `column` raggruppato per `key_column`"""
+    return select(key_column.label("key"), func.count(column).label("n")).group_by(key_column).subquery()
+
+
+def _articles_query():
+    likes = _count_by(ArticleLike.id, ArticleLike.article_id)
+    comments = _count_by(Comment.id, Comment.article_id)
+    shares = _count_by(Share.id, Share.article_id)
+    return (
+        select(
+            Article.id,
+            Article.title,
+            User.username,
+            Category.name,
+            Article.published,
+            Article.created_at,
+            func.coalesce(likes.c.n, 0),
+            func.coalesce(comments.c.n, 0),
+            func.coalesce(shares.c.n, 0),
+        )
+        .select_from(Article)
+        .outerjoin(User, User.id == Article.author_id)
+        .outerjoin(Category, Category.id == Article.category_id)
+        .outerjoin(likes, likes.c.key == Article.id)
+        .outerjoin(comments, comments.c.key == Article.id)
+        .outerjoin(shares, shares.c.key == Article.id)
+    ), Article.id
+
+
+def _users_query():
+    articles = _count_by(Article.id, Article.author_id)
+    comments = _count_by(Comment.id, Comment.user_id)
+    likes = _count_by(ArticleLike.id, ArticleLike.user_id)
+    return (
+        select(
+            User.id,
+            User.username,
+            User.email,
+            User.role,
+            User.created_at,
+            func.coalesce(articles.c.n, 0),
+            func.coalesce(comments.c.n, 0),
+            func.coalesce(likes.c.n, 0),
+        )
+        .select_from(User)
+        .outerjoin(articles, articles.c.key == User.id)
+        .outerjoin(comments, comments.c.key == User.id)
+        .outerjoin(likes, likes.c.key == User.id)
+    ), User.id
+
+
+def _donations_query():
+    return (
+        select(
+            Donation.id,
+            Donation.donor_name,
+            Donation.donor_email,
+            Donation.amount,
+            Donation.currency,
+            Donation.message,
+            Donation.anonymous,
+            Donation.payment_method,
+            Donation.transaction_id,
+            Donation.status,
+            Donation.created_at,
+        )
+    ), Donation.id
+
+
+def _donation_summary_query():
+    return (
+        select(
+            Donation.id,
+            Donation.donor_name,
+            Donation.donor_email,
+            Donation.amount,
+            Donation.message,
+            Donation.anonymous,
+            Donation.status,
+            Donation.created_at,
+        )
+    ), Donation.id
+
+
+def _subscribers_query():
+    return (
+        select(
+            NewsletterSubscriber.id,
+            NewsletterSubscriber.email,
+            NewsletterSubscriber.subscribed_at,
+            NewsletterSubscriber.is_active,
+            # JSON come testo: stessa serializzazione per CSV, NDJSON e Parquet
+            cast(NewsletterSubscriber.preferences, String),
+        )
+    ), NewsletterSubscriber.id
+
+
+# Per ogni export: query, intestazioni CSV e chiavi NDJSON (stesso ordine delle colonne)
+EXPORTS = {
+    "articles": {
+        "query": _articles_query,
+        "header": [
+            "ID", "Titolo", "Autore", "Categoria", "Pubblicato",
+            "Data Creazione", "Likes", "Commenti", "Condivisioni",
+        ],
+        "fields": [
+            "id", "title", "author", "category", "published",
+            "created_at", "likes", "comments", "shares",
+        ],
+    },
+    "users": {
+        "query": _users_query,
+        "header": [
+            "ID", "Username", "Email", "Ruolo", "Data Registrazione",
+            "Articoli Pubblicati", "Commenti", "Likes Dati",
+        ],
+        "fields": [
+            "id", "username", "email", "role", "created_at",
+            "articles", "comments", "likes",
+        ],
+    },
+    "donations": {
+        "query": _donations_query,
+        "header": [
+            "ID", "Nome Donatore", "Email", "Importo", "Valuta", "Messaggio", "Anonimo",
+            "Metodo Pagamento", "ID Transazione", "Stato", "Data Creazione",
+        ],
+        "fields": [
+            "id", "donor_name", "donor_email", "amount", "currency", "message", "anonymous",
+            "payment_method", "transaction_id", "status", "created_at",
+        ],
+    },
+    # Export donazioni della dashboard analytics (colonne storiche)
+    "donation_summary": {
+        "query": _donation_summary_query,
+        "header": [
+            "ID", "Nome Donatore", "Email", "Importo", "Messaggio", "Anonimo", "Stato", "Data",
+        ],
+        "fields": [
+            "id", "donor_name", "donor_email", "amount", "message", "anonymous", "status", "created_at",
+        ],
+    },
+    "subscribers": {
+        "query": _subscribers_query,
+        "header": ["ID", "Email", "Data Iscrizione", "Attivo", "Preferenze"],
+        "fields": ["id", "email", "subscribed_at", "is_active", "preferences"],
+    },
+}
+
+
+def count_rows(export_type):
+    """Numero totale di righe di un export (per la percentuale di avanzamento)"""
+    query, _ = EXPORTS[export_type]["query"]()
+    return db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+
+def iter_rows(export_type, after_id=None, limit=None, descending=False):
+    """
+    Itera le righe di un export in ordine di id con un cursore in streaming
+
+    Args:
+        export_type: Chiave di EXPORTS
+        after_id: Riprende dopo questo id (paginazione keyset)
+        limit: Numero massimo di righe
+        descending: Ordine per id decrescente (after_id = righe con id minore)
+
+    Yields:
+        Tuple di valori nell'ordine di EXPORTS[export_type]["fields"]
+    """
+    query, id_column = EXPORTS[export_type]["query"]()
+
+    if after_id is not None:
+        query = query.where(id_column < after_id if descending else id_column > after_id)
+    query = query.order_by(id_column.desc() if descending else id_column.asc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield tuple(row)
+
+
+def arrow_schema(export_type):
+    """
+    Schema pyarrow dell'export, derivato dai tipi delle colonne SQL
+    Richiede pyarrow (dipendenza opzionale, usata solo per il formato Parquet).
+    """
+    import pyarrow as pa
+
+    arrow_types = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        datetime: pa.timestamp("us"),
+    }
+    query, _ = EXPORTS[export_type]["query"]()
+    fields = EXPORTS[export_type]["fields"]
+    return pa.schema([
+        (field, arrow_types.get(column.type.python_type, pa.string()))
+        for field, column in zip(fields, query.selected_columns)
+    ])
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Sì" if value else "No"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _LineBuffer:
+    """File-like minimale: csv.writer scrive qui e le righe vengono raccolte"""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+    def drain(self):
+        data = "".join(self.lines)
+        self.lines = []
+        return data
+
+
+def csv_lines(export_type, rows, include_header=True):
+    """Serializza le righe in CSV, emettendo blocchi di FLUSH_EVERY righe"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(EXPORTS[export_type]["header"])
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % FLUSH_EVERY == 0:
+            yield buffer.drain()
+
+    remaining = buffer.drain()
+    if remaining:
+        yield remaining
+
+
+def ndjson_lines(export_type, rows):
+    """Serializza le righe in NDJSON (un oggetto JSON per riga)"""
+    fields = EXPORTS[export_type]["fields"]
+    chunk = []
+    for row in rows:
+        record = {field: _json_value(value) for field, value in zip(fields, row)}
+        chunk.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if len(chunk) >= FLUSH_EVERY:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def serialize(export_type, format_type, rows, include_header=True):
+    """Generatore di testo per il formato richiesto ('csv' o 'ndjson')"""
+    if format_type == "ndjson":
+        return ndjson_lines(export_type, rows)
+    return csv_lines(export_type, rows, include_header=include_header)
+
+
+def stream_export(export_type, format_type, filename, after_id=None, limit=None, descending=False):
+    """
+    Risposta HTTP in streaming per un export
+
+    Args:
+        export_type: Chiave di EXPORTS
+        format_type: 'csv' o 'ndjson'
+        filename: Nome file senza estensione (Content-Disposition)
+        after_id/limit/descending: Vedi iter_rows
+    """
+    rows = iter_rows(export_type, after_id=after_id, limit=limit, descending=descending)
+    response = Response(
+        stream_with_context(serialize(export_type, format_type, rows)),
+        mimetype=EXPORT_FORMATS[format_type],
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}.{format_type}"
+    # Niente buffering nei proxy (nginx) e niente compressione dell'intero body
+    response.headers["X-Accel-Buffering"] = "no"
+    response.direct_passthrough = True
+    return response
@@ -4,6 +4,8 @@ import os
 import shutil
 from flask import current_app
 
+from src.utils.convert_img import manifest_path, read_manifest
+
 
 def delete_article_folder(slug: str):
     """
@@ -47,6 +49,15 @@ def delete_image_file(public_url: str):
         # Costruisci il percorso assoluto del file sul server
         file_path = os.path.join(current_app.root_path, 'static', relative_path)
 
+        # Varianti responsive e manifest (vedi convert_img.render_variants)
+        manifest = read_manifest(file_path)
+        if manifest:
+            for variant in manifest.get("variants", []):
+                variant_file = os.path.join(current_app.root_path, variant["url"].lstrip('/'))
+                if variant_file != file_path and os.path.isfile(variant_file):
+                    os.remove(variant_file)
+            os.remove(manifest_path(file_path))
+
         # Controlla se il file esiste prima di tentare di cancellarlo
         if os.path.isfile(file_path):
             os.remove(file_path)
@@ -0,0 +1,167 @@
+"""
+HyperLogLog distinct counting for Rio Capital Blog
+Stima dei visitatori unici con sketch di dimensione fissa (16 KB, errore
+standard ~0.8%). In produzione usa PFADD/PFCOUNT/PFMERGE di Redis; senza
+Redis un'implementazione Python con la stessa API salva gli sketch nel DB.
+"""
+import hashlib
+import math
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.analytics import HLLSketch
+from src.utils.redis_cache import cache
+from src.utils.timeseries import day_keys
+
+
+# 2^14 registri, come Redis
+PRECISION = 14
+
+# Gli sketch giornalieri restano disponibili poco più di un anno
+SKETCH_TTL = timedelta(days=400)
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog denso con hash a 64 bit"""
+
+    def __init__(self, registers=None, precision=PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("Numero di registri non valido per la precisione richiesta")
+
+    @staticmethod
+    def _hash(value):
+        if not isinstance(value, bytes):
+            value = str(value).encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+
+    def add(self, *values):
+        """Aggiunge valori; True se almeno un registro è cambiato (come PFADD)"""
+        changed = False
+        tail_bits = 64 - self.precision
+        tail_mask = (1 << tail_bits) - 1
+        for value in values:
+            hashed = self._hash(value)
+            index = hashed >> tail_bits
+            tail = hashed & tail_mask
+            rank = tail_bits - tail.bit_length() + 1
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+                changed = True
+        return changed
+
+    def merge(self, *others):
+        """Unione in place con altri sketch (massimo registro per registro)"""
+        for other in others:
+            if other.precision != self.precision:
+                raise ValueError("Impossibile unire sketch con precisione diversa")
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Cardinalità stimata (con correzione linear counting per valori piccoli)"""
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=PRECISION):
+        return cls(registers=data, precision=precision)
+
+
+class RedisHLLStore:
+    """Sketch su Redis (PFADD/PFCOUNT/PFMERGE nativi)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def pfadd(self, key, *values):
+        pipe = self.client.pipeline()
+        pipe.pfadd(key, *values)
+        pipe.expire(key, SKETCH_TTL)
+        return pipe.execute()[0]
+
+    def pfcount(self, *keys):
+        return self.client.pfcount(*keys) if keys else 0
+
+    def pfmerge(self, dest, *sources):
+        self.client.pfmerge(dest, *sources)
+        self.client.expire(dest, SKETCH_TTL)
+        return True
+
+
+class LocalHLLStore:
+    """Stessa API di RedisHLLStore con sketch Python salvati in hll_sketch (non esegue il commit)"""
+
+    def _load(self, keys):
+        rows = db.session.execute(
+            select(HLLSketch.key, HLLSketch.registers).where(HLLSketch.key.in_(list(keys)))
+        )
+        return {key: HyperLogLog.from_bytes(registers) for key, registers in rows}
+
+    def _save(self, key, sketch):
+        row = db.session.get(HLLSketch, key)
+        if row is None:
+            db.session.add(HLLSketch(key=key, registers=sketch.to_bytes()))
+        else:
+            row.registers = sketch.to_bytes()
+
+    def pfadd(self, key, *values):
+        sketch = self._load([key]).get(key) or HyperLogLog()
+        changed = sketch.add(*values)
+        if changed:
+            self._save(key, sketch)
+        return int(changed)
+
+    def pfcount(self, *keys):
+        sketches = list(self._load(keys).values())
+        if not sketches:
+            return 0
+        return sketches[0].merge(*sketches[1:]).count()
+
+    def pfmerge(self, dest, *sources):
+        sketches = self._load((dest, *sources))
+        merged = HyperLogLog().merge(*sketches.values())
+        self._save(dest, merged)
+        return True
+
+
+def get_hll_store():
+    """Store Redis se disponibile, altrimenti quello locale su database"""
+    if cache.redis_client is not None:
+        return RedisHLLStore(cache.redis_client)
+    return LocalHLLStore()
+
+
+def unique_visitors_key(day, article_id=None):
+    """Chiave dello sketch giornaliero (sito o singolo articolo)"""
+    scope = f"article:{article_id}" if article_id is not None else "site"
+    return f"hll:uv:{scope}:{day}"
+
+
+def unique_visitors(start, end, article_id=None):
+    """
+    Visitatori unici stimati tra start ed end (inclusi)
+    Unione degli sketch giornalieri: vale per settimana, mese o qualsiasi
+    intervallo senza contare due volte chi torna più giorni.
+    """
+    keys = [unique_visitors_key(day, article_id) for day in day_keys(start, end)]
+    return get_hll_store().pfcount(*keys)
+
+
+def merge_unique_visitors(dest_key, start, end, article_id=None):
+    """Materializza l'unione di un periodo (es: mese chiuso) in un unico sketch"""
+    keys = [unique_visitors_key(day, article_id) for day in day_keys(start, end)]
+    return get_hll_store().pfmerge(dest_key, *keys)
@@ -0,0 +1,195 @@
+"""
+Background image processing for Rio Capital Blog
+L'upload salva l'originale in uploads/_incoming e risponde subito con l'URL
+finale e un token; la conversione in WebP avviene in un worker Celery (o,
+senza Redis, in un process pool locale) e sostituisce il file finale con
+os.replace. Lo stato del job è nei file di _incoming (vedi convert_img).
+"""
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from PIL import Image, UnidentifiedImageError
+
+from src.utils.redis_cache import cache
+from src.utils.convert_img import (
+    INCOMING_FOLDER,
+    destination_for,
+    job_paths,
+    process_job,
+    public_url,
+    read_manifest,
+    write_json_atomic,
+)
+
+
+# Job ancora in _incoming dopo questo tempo: worker perso, da rielaborare
+STALE_AFTER_SECONDS = 600
+
+# Marker di errore conservati per la consultazione dello stato
+ERROR_RETENTION_SECONDS = 86400
+
+TOKEN_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class InvalidImageError(ValueError):
+    """File caricato che non è un'immagine leggibile"""
+
+
+def uploads_folder():
+    return os.path.join(current_app.root_path, "static", "uploads")
+
+
+def incoming_folder():
+    folder = os.path.join(uploads_folder(), INCOMING_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+# ====================================================================
+# Process pool locale (usato quando Celery/Redis non è disponibile)
+# ====================================================================
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Pool per processo; 'spawn' evita di duplicare app e connessioni"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config["IMAGE_PROCESS_WORKERS"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+@atexit.register
+def _shutdown_executor():
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=False, cancel_futures=False)
+
+
+def dispatch(job_id):
+    """Accoda l'elaborazione su Celery; senza Redis usa il process pool"""
+    from src.celery_app import process_uploaded_image_task
+
+    if cache.redis_client is not None:
+        try:
+            process_uploaded_image_task.apply_async(args=[job_id], retry=False)
+            return
+        except Exception as e:
+            current_app.logger.warning(f"Image job {job_id} not queued on Celery, using local pool: {e}")
+
+    _get_executor().submit(process_job, uploads_folder(), job_id)
+
+
+def stage_upload(file, subfolder, **naming):
+    """
+    Salva l'originale e accoda la conversione
+
+    Args:
+        file: FileStorage caricato
+        subfolder: 'articles' o 'avatars'
+        naming: slug / username / image_type / index (vedi destination_for)
+
+    Returns:
+        {"url", "preview_url", "token"}: url è l'immagine finale (disponibile
+        a elaborazione completata), preview_url l'originale caricato
+    """
+    relative_dir, filename = destination_for(subfolder, **naming)
+
+    # Solo verifica dell'header: la decodifica completa avviene nel worker
+    try:
+        with Image.open(file.stream) as img:
+            img_format = (img.format or "").lower()
+    except (UnidentifiedImageError, OSError) as e:
+        raise InvalidImageError("Il file non è un'immagine valida") from e
+    file.stream.seek(0)
+
+    job_id = uuid.uuid4().hex
+    extension = {"jpeg": "jpg"}.get(img_format, img_format) or "bin"
+    source = os.path.join(INCOMING_FOLDER, f"{job_id}.{extension}")
+    file.save(os.path.join(incoming_folder(), f"{job_id}.{extension}"))
+
+    spec = {
+        "source": source,
+        "destination": os.path.join(relative_dir, filename),
+        "subfolder": subfolder,
+    }
+    if subfolder == 'articles' and naming.get("image_type") == 'cover':
+        # Copertine: scala di larghezze per srcset (vedi image_manifest)
+        spec["widths"] = current_app.config["IMAGE_WIDTHS"]
+        spec["formats"] = current_app.config["IMAGE_FORMATS"]
+    write_json_atomic(job_paths(uploads_folder(), job_id)["spec"], spec)
+    dispatch(job_id)
+
+    return {
+        "url": public_url(relative_dir, filename),
+        "preview_url": public_url(INCOMING_FOLDER, f"{job_id}.{extension}"),
+        "token": job_id,
+    }
+
+
+def stale_job_ids(older_than=STALE_AFTER_SECONDS):
+    """Job con specifica più vecchia di older_than secondi (worker perso)"""
+    folder = incoming_folder()
+    limit = time.time() - older_than
+    job_ids = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.stat().st_mtime < limit:
+                job_ids.append(entry.name[:-len(".json")])
+    return job_ids
+
+
+def purge_errors(older_than=ERROR_RETENTION_SECONDS):
+    """Elimina i marker di errore vecchi; restituisce quanti ne ha rimossi"""
+    folder = incoming_folder()
+    limit = time.time() - older_than
+    removed = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(".error") and entry.stat().st_mtime < limit:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+# Manifest letti, per percorso: (mtime, manifest)
+_manifests = {}
+
+
+def image_manifest(url):
+    """
+    Varianti responsive di un'immagine caricata (per srcset/sizes), o None
+    Un solo stat per immagine: il file viene riletto solo se cambiato.
+    """
+    if not url or not url.startswith("/static/uploads/"):
+        return None
+
+    save_path = os.path.join(uploads_folder(), *url[len("/static/uploads/"):].split("/"))
+    path = os.path.splitext(save_path)[0] + ".json"
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        _manifests.pop(path, None)
+        return None
+
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, read_manifest(save_path))
+        _manifests[path] = cached
+    return cached[1]
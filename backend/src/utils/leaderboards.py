@@ -0,0 +1,246 @@
+"""
+Leaderboards for Rio Capital Blog
+Classifiche pre-aggregate in leaderboard_entry: la lettura è un top-K
+sull'indice (board, period, score) invece di JOIN e conteggi per richiesta.
+
+- period 'all': incrementata dalle scritture (articoli, commenti, donazioni)
+- period 7d/30d/90d/1y: ricostruite dal job dei rollup (analytics_daily per
+  autori e utenti attivi; tabella donations per i donatori, che non hanno un id)
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, and_, cast, delete, func, insert, literal, null, or_, select, update
+
+from src.extensions import db
+from src.models.analytics import AnalyticsDaily, LeaderboardEntry
+from src.models.article import Article
+from src.models.comment import Comment
+from src.models.donation import Donation
+from src.models.user import User
+from src.utils.db_helpers import chunked
+
+
+BOARDS = ("authors", "active_users", "donors")
+ALL_TIME = "all"
+PERIODS = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
+
+# Metriche dei rollup (dimension 'user') che compongono ogni classifica utenti
+USER_BOARD_METRICS = {
+    "authors": ("articles",),
+    "active_users": ("articles", "comments"),
+}
+
+ENTRY_COLUMNS = ["board", "period", "entity_key", "entity_id", "label", "score", "updated_at"]
+
+
+def _donor_condition():
+    return and_(
+        Donation.status == "completed",
+        or_(Donation.anonymous.is_(False), Donation.anonymous.is_(None)),
+        Donation.donor_email.isnot(None),
+        Donation.donor_email != "",
+    )
+
+
+def _donor_key(email):
+    return (email or "").strip().lower()
+
+
+def _user_counts(column, user_ids=None):
+    query = select(column.label("user_id"), func.count().label("total")).group_by(column)
+    if user_ids is not None:
+        query = query.where(column.in_(user_ids))
+    return query.subquery()
+
+
+def _all_time_select(board, keys=None):
+    """SELECT con il punteggio all-time dalle tabelle sorgente (per refresh e backfill)"""
+    now = literal(datetime.utcnow())
+
+    if board == "donors":
+        email = func.lower(Donation.donor_email)
+        query = (
+            select(
+                literal(board), literal(ALL_TIME), email, null(),
+                func.max(Donation.donor_name), func.sum(Donation.amount), now,
+            )
+            .where(_donor_condition())
+            .group_by(email)
+        )
+        if keys is not None:
+            query = query.where(email.in_(keys))
+        return query
+
+    user_ids = [int(key) for key in keys] if keys is not None else None
+    articles = _user_counts(Article.author_id, user_ids)
+    score = func.coalesce(articles.c.total, 0)
+    query = select(User.id).select_from(User).outerjoin(articles, articles.c.user_id == User.id)
+
+    if board == "active_users":
+        comments = _user_counts(Comment.user_id, user_ids)
+        query = query.outerjoin(comments, comments.c.user_id == User.id)
+        score = score + func.coalesce(comments.c.total, 0)
+
+    query = query.with_only_columns(
+        literal(board), literal(ALL_TIME), cast(User.id, String), User.id, null(), score, now,
+    ).where(score > 0)
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+    return query
+
+
+def refresh_all_time(board=None, keys=None):
+    """
+    Ricalcola da zero la classifica all-time (tutte o solo alcune chiavi)
+    Da usare dopo cancellazioni o per il backfill. Non esegue il commit.
+    """
+    for name in ([board] if board else BOARDS):
+        if keys is None:
+            db.session.execute(
+                delete(LeaderboardEntry).where(
+                    LeaderboardEntry.board == name, LeaderboardEntry.period == ALL_TIME
+                )
+            )
+            db.session.execute(insert(LeaderboardEntry).from_select(ENTRY_COLUMNS, _all_time_select(name)))
+            continue
+
+        for chunk in chunked(sorted({str(key) for key in keys})):
+            db.session.execute(
+                delete(LeaderboardEntry).where(
+                    LeaderboardEntry.board == name,
+                    LeaderboardEntry.period == ALL_TIME,
+                    LeaderboardEntry.entity_key.in_(chunk),
+                )
+            )
+            db.session.execute(
+                insert(LeaderboardEntry).from_select(ENTRY_COLUMNS, _all_time_select(name, chunk))
+            )
+
+
+def refresh_users(user_ids):
+    """Ricalcola le classifiche utenti all-time dopo cancellazioni di articoli/commenti"""
+    if user_ids:
+        for board in USER_BOARD_METRICS:
+            refresh_all_time(board, keys=user_ids)
+
+
+def bump_leaderboard(board, entity_key, delta, entity_id=None, label=None):
+    """
+    Incremento all-time di una voce: un solo UPDATE relativo; se la voce non
+    esiste viene ricalcolata dalle tabelle sorgente. Non esegue il commit.
+    """
+    entity_key = str(entity_key)
+    values = {"score": LeaderboardEntry.score + delta, "updated_at": datetime.utcnow()}
+    if label:
+        values["label"] = label
+
+    result = db.session.execute(
+        update(LeaderboardEntry)
+        .where(
+            LeaderboardEntry.board == board,
+            LeaderboardEntry.period == ALL_TIME,
+            LeaderboardEntry.entity_key == entity_key,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # Il flush rende visibile la riga appena aggiunta alla sessione
+        db.session.flush()
+        refresh_all_time(board, keys=[entity_key])
+
+
+def record_article(author_id, delta=1):
+    """Articolo creato (delta=1) o eliminato (delta=-1)"""
+    bump_leaderboard("authors", author_id, delta, entity_id=author_id)
+    bump_leaderboard("active_users", author_id, delta, entity_id=author_id)
+
+
+def record_comment(user_id, delta=1):
+    """Commento creato"""
+    bump_leaderboard("active_users", user_id, delta, entity_id=user_id)
+
+
+def record_donation(donation, refund=False):
+    """Donazione completata (o rimborsata) di un donatore non anonimo"""
+    key = _donor_key(donation.donor_email)
+    if donation.anonymous or not key:
+        return
+    amount = -donation.amount if refund else donation.amount
+    bump_leaderboard("donors", key, amount, label=donation.donor_name)
+
+
+def refresh_periods(now=None):
+    """
+    Ricostruisce le classifiche a finestra (job periodico, dopo i rollup)
+    Autori e utenti attivi sommano le righe 'user' di analytics_daily;
+    i donatori aggregano le donazioni della finestra. Non esegue il commit.
+    """
+    today = (now or datetime.utcnow()).date()
+    timestamp = literal(datetime.utcnow())
+
+    db.session.execute(delete(LeaderboardEntry).where(LeaderboardEntry.period.in_(list(PERIODS))))
+
+    for period, days in PERIODS.items():
+        start = today - timedelta(days=days - 1)
+
+        for board, metrics in USER_BOARD_METRICS.items():
+            score = func.sum(AnalyticsDaily.value)
+            query = (
+                select(
+                    literal(board), literal(period), cast(AnalyticsDaily.entity_id, String),
+                    AnalyticsDaily.entity_id, null(), score, timestamp,
+                )
+                .where(
+                    AnalyticsDaily.metric.in_(metrics),
+                    AnalyticsDaily.dimension == "user",
+                    AnalyticsDaily.day >= start,
+                )
+                .group_by(AnalyticsDaily.entity_id)
+                .having(score > 0)
+            )
+            db.session.execute(insert(LeaderboardEntry).from_select(ENTRY_COLUMNS, query))
+
+        email = func.lower(Donation.donor_email)
+        donors = (
+            select(
+                literal("donors"), literal(period), email, null(),
+                func.max(Donation.donor_name), func.sum(Donation.amount), timestamp,
+            )
+            .where(_donor_condition(), Donation.created_at >= datetime.combine(start, datetime.min.time()))
+            .group_by(email)
+        )
+        db.session.execute(insert(LeaderboardEntry).from_select(ENTRY_COLUMNS, donors))
+
+
+def top_entries(board, period=ALL_TIME, limit=10):
+    """
+    Top-K di una classifica: una query sull'indice, con lo username
+    degli utenti in JOIN (solo K righe)
+
+    Returns:
+        Lista di dizionari {rank, key, user_id, username, label, score}
+    """
+    rows = (
+        db.session.query(LeaderboardEntry, User.username)
+        .outerjoin(User, User.id == LeaderboardEntry.entity_id)
+        .filter(
+            LeaderboardEntry.board == board,
+            LeaderboardEntry.period == period,
+            LeaderboardEntry.score > 0,
+        )
+        .order_by(LeaderboardEntry.score.desc(), LeaderboardEntry.entity_key)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "rank": rank,
+            "key": entry.entity_key,
+            "user_id": entry.entity_id,
+            "username": username,
+            "label": entry.label or username,
+            "score": entry.score,
+        }
+        for rank, (entry, username) in enumerate(rows, start=1)
+    ]
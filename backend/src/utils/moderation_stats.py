@@ -0,0 +1,139 @@
+"""
+Moderation stats maintenance for Rio Capital Blog
+Mantiene la tabella user_moderation_stats (conteggi materializzati per utente)
+"""
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, literal, select, update
+
+from src.extensions import db
+from src.models.comment import Comment, CommentReport
+from src.models.moderation import ModerationLog, UserModerationStats
+from src.models.user import User
+from src.utils.db_helpers import chunked
+
+
+STATS_COLUMNS = [
+    "user_id",
+    "total_comments",
+    "total_reports",
+    "total_warnings",
+    "total_bans",
+    "last_moderation_action",
+    "updated_at",
+]
+
+
+def _stats_select(user_ids=None):
+    """
+    SELECT che calcola le statistiche complete per gli utenti indicati
+    Ogni tabella viene aggregata una sola volta per user_id e poi unita
+    agli utenti, evitando il prodotto cartesiano dei LEFT JOIN multipli.
+    """
+    comments = (
+        select(Comment.user_id, func.count(Comment.id).label("total"))
+        .group_by(Comment.user_id)
+    )
+    reports = (
+        select(Comment.user_id, func.count(CommentReport.id).label("total"))
+        .select_from(CommentReport)
+        .join(Comment, Comment.id == CommentReport.comment_id)
+        .group_by(Comment.user_id)
+    )
+    actions = (
+        select(
+            ModerationLog.user_id,
+            func.sum(case((ModerationLog.action_type == "warning", 1), else_=0)).label("warnings"),
+            func.sum(case((ModerationLog.action_type == "ban", 1), else_=0)).label("bans"),
+            func.max(ModerationLog.created_at).label("last_action"),
+        )
+        .group_by(ModerationLog.user_id)
+    )
+
+    if user_ids is not None:
+        comments = comments.where(Comment.user_id.in_(user_ids))
+        reports = reports.where(Comment.user_id.in_(user_ids))
+        actions = actions.where(ModerationLog.user_id.in_(user_ids))
+
+    comments = comments.subquery()
+    reports = reports.subquery()
+    actions = actions.subquery()
+
+    query = (
+        select(
+            User.id,
+            func.coalesce(comments.c.total, 0),
+            func.coalesce(reports.c.total, 0),
+            func.coalesce(actions.c.warnings, 0),
+            func.coalesce(actions.c.bans, 0),
+            actions.c.last_action,
+            literal(datetime.utcnow()),
+        )
+        .select_from(User)
+        .outerjoin(comments, comments.c.user_id == User.id)
+        .outerjoin(reports, reports.c.user_id == User.id)
+        .outerjoin(actions, actions.c.user_id == User.id)
+    )
+
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+
+    return query
+
+
+def refresh_moderation_stats(user_ids=None):
+    """
+    Ricalcola da zero le statistiche con INSERT ... SELECT set-based
+    Da usare dopo operazioni che rimuovono righe (cancellazioni, report
+    archiviati) o per il backfill iniziale. Non esegue il commit.
+
+    Args:
+        user_ids: Utenti da ricalcolare (None = tutti)
+    """
+    if user_ids is None:
+        db.session.execute(delete(UserModerationStats))
+        db.session.execute(
+            insert(UserModerationStats).from_select(STATS_COLUMNS, _stats_select())
+        )
+        return
+
+    for chunk in chunked(sorted(set(user_ids))):
+        db.session.execute(
+            delete(UserModerationStats).where(UserModerationStats.user_id.in_(chunk))
+        )
+        db.session.execute(
+            insert(UserModerationStats).from_select(STATS_COLUMNS, _stats_select(chunk))
+        )
+
+
+def bump_moderation_stats(user_id, comments=0, reports=0, warnings=0, bans=0, action_at=None):
+    """
+    Aggiornamento incrementale delle statistiche di un utente
+    Un solo UPDATE con incrementi relativi; se la riga non esiste ancora
+    viene creata con un ricalcolo completo. Non esegue il commit.
+
+    Args:
+        user_id: Utente da aggiornare
+        comments/reports/warnings/bans: Incrementi (anche negativi)
+        action_at: Timestamp dell'ultima azione di moderazione (warning/ban)
+    """
+    values = {
+        "total_comments": UserModerationStats.total_comments + comments,
+        "total_reports": UserModerationStats.total_reports + reports,
+        "total_warnings": UserModerationStats.total_warnings + warnings,
+        "total_bans": UserModerationStats.total_bans + bans,
+    }
+    if action_at is not None:
+        values["last_moderation_action"] = action_at
+
+    result = db.session.execute(
+        update(UserModerationStats)
+        .where(UserModerationStats.user_id == user_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount == 0:
+        # Il flush rende visibili le righe appena aggiunte alla sessione
+        db.session.flush()
+        refresh_moderation_stats([user_id])
@@ -0,0 +1,375 @@
+"""
+Newsletter campaigns for Rio Capital Blog
+Invio di una campagna a tutti gli iscritti attivi:
+
+1. prepare_campaign crea le righe newsletter_delivery (INSERT ... SELECT a
+   chunk keyset sugli id degli iscritti) e divide i destinatari in chunk
+2. un chord Celery esegue send_chunk per ogni chunk: claim a blocchi,
+   invio in parallelo sul pool SMTP con tetto di messaggi al secondo
+3. finish_campaign ricalcola i contatori; se restano destinatari (time
+   budget esaurito, worker morto) la campagna riparte da quelli in attesa
+
+Ogni destinatario è inviato al più una volta: i messaggi rimasti in
+'sending' dopo un crash diventano 'interrupted' invece di essere ritentati.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, func, insert, literal, or_, select, update
+
+from src.extensions import db
+from src.models.newsletter import NewsletterCampaign, NewsletterDelivery, NewsletterSubscriber
+from src.utils.db_helpers import dialect_name
+from src.utils.redis_cache import cache
+
+
+# Destinatari per claim e commit (il checkpoint di send_chunk)
+SEND_BATCH_SIZE = 50
+
+# Oltre questo tempo senza checkpoint la campagna è considerata orfana
+LEASE_SECONDS = 600
+
+# Tempo massimo di un task di invio, sotto task_soft_time_limit di Celery
+TIME_BUDGET_SECONDS = 200
+
+
+class _RateLimiter:
+    """
+    Al più `rate` invii al secondo per campagna: contatore per secondo su
+    Redis (condiviso tra i worker), altrimenti intervallo fisso nel processo
+    """
+
+    def __init__(self, campaign_id, rate):
+        self.campaign_id = campaign_id
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_at = time.monotonic()
+
+    def wait(self):
+        if not self.rate:
+            return
+
+        if cache.redis_client is not None:
+            try:
+                while True:
+                    second = int(time.time())
+                    key = f"newsletter:rate:{self.campaign_id}:{second}"
+                    count = cache.redis_client.incr(key)
+                    if count == 1:
+                        cache.redis_client.expire(key, 5)
+                    if count <= self.rate:
+                        return
+                    time.sleep(max(second + 1 - time.time(), 0))
+            except Exception as e:
+                # Chiamato dai thread di invio, fuori dall'app context
+                logging.warning(f"Newsletter rate limiter Redis error: {e}")
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + 1 / self.rate
+        time.sleep(max(start - now, 0))
+
+
+def queue_campaign(campaign, dispatch=True):
+    """
+    Mette in coda una campagna in bozza ed esegue il commit
+    dispatch=False per l'invio nel processo corrente (run_campaign)
+    """
+    campaign.status = "queued"
+    campaign.rate_limit = campaign.rate_limit or current_app.config["NEWSLETTER_RATE_LIMIT"]
+    campaign.concurrency = campaign.concurrency or current_app.config["NEWSLETTER_CONCURRENCY"]
+    db.session.commit()
+    if not dispatch:
+        return
+
+    from src.celery_app import start_newsletter_campaign_task
+    try:
+        start_newsletter_campaign_task.delay(campaign.id)
+    except Exception as e:
+        # Broker non raggiungibile: la campagna viene ripresa da tasks.resume_stale_campaigns
+        current_app.logger.error(f"Impossibile accodare la campagna {campaign.id}: {e}")
+
+
+def _claim_campaign(campaign_id):
+    """Acquisisce la campagna (UPDATE condizionale sul lease, come gli export job)"""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(NewsletterCampaign)
+        .where(
+            NewsletterCampaign.id == campaign_id,
+            NewsletterCampaign.status.in_(["queued", "sending"]),
+            or_(NewsletterCampaign.lease_expires_at.is_(None), NewsletterCampaign.lease_expires_at < now),
+        )
+        .values(status="sending", lease_expires_at=now + timedelta(seconds=LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _keyset_ranges(query, column, chunk_size):
+    """Intervalli [primo, ultimo] di `column` a chunk di chunk_size (scansione keyset)"""
+    ranges, last = [], None
+    while True:
+        page = query.order_by(column).limit(chunk_size)
+        if last is not None:
+            page = page.where(column > last)
+        ids = db.session.execute(page).scalars().all()
+        if not ids:
+            return ranges
+        ranges.append((ids[0], ids[-1]))
+        last = ids[-1]
+
+
+def _materialize(campaign, chunk_size):
+    """Una riga newsletter_delivery per iscritto attivo (idempotente)"""
+    subscribers = select(NewsletterSubscriber.id).where(NewsletterSubscriber.is_active.is_(True))
+    existing = select(NewsletterDelivery.id).where(
+        NewsletterDelivery.campaign_id == campaign.id,
+        NewsletterDelivery.subscriber_id == NewsletterSubscriber.id,
+    )
+
+    for first_id, last_id in _keyset_ranges(subscribers, NewsletterSubscriber.id, chunk_size):
+        db.session.execute(
+            insert(NewsletterDelivery).from_select(
+                ["campaign_id", "subscriber_id", "email", "status"],
+                select(literal(campaign.id), NewsletterSubscriber.id, NewsletterSubscriber.email, literal("pending"))
+                .where(
+                    NewsletterSubscriber.is_active.is_(True),
+                    NewsletterSubscriber.id.between(first_id, last_id),
+                    ~existing.exists(),
+                ),
+            )
+        )
+        db.session.commit()
+
+    campaign.total_recipients = db.session.execute(
+        select(func.count()).where(NewsletterDelivery.campaign_id == campaign.id)
+    ).scalar()
+
+
+def prepare_campaign(campaign_id):
+    """
+    Prepara (o riprende) l'invio di una campagna
+
+    Returns:
+        Lista di intervalli (primo, ultimo subscriber_id) da inviare, o None
+        se la campagna è già in invio su un altro worker o non è inviabile
+    """
+    if not _claim_campaign(campaign_id):
+        return None
+
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    chunk_size = current_app.config["NEWSLETTER_CHUNK_SIZE"]
+
+    if campaign.started_at is None:
+        # started_at solo a righe create: un crash a metà ripete l'INSERT (idempotente)
+        # (i digest hanno già le righe dei soli destinatari del gruppo)
+        if campaign.digest_key is None:
+            _materialize(campaign, chunk_size)
+        campaign.started_at = datetime.utcnow()
+
+    # Invii di un'esecuzione precedente mai confermati: potrebbero essere partiti
+    db.session.execute(
+        update(NewsletterDelivery)
+        .where(NewsletterDelivery.campaign_id == campaign_id, NewsletterDelivery.status == "sending")
+        .values(status="interrupted", error="Invio interrotto: non ripetuto per evitare doppi invii")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    pending = select(NewsletterDelivery.subscriber_id).where(
+        NewsletterDelivery.campaign_id == campaign_id, NewsletterDelivery.status == "pending"
+    )
+    return _keyset_ranges(pending, NewsletterDelivery.subscriber_id, chunk_size)
+
+
+def _claim_deliveries(campaign_id, first_id, last_id, limit):
+    """Prenota un blocco di destinatari in attesa (claim_token), con commit"""
+    query = (
+        select(NewsletterDelivery.id)
+        .where(
+            NewsletterDelivery.campaign_id == campaign_id,
+            NewsletterDelivery.status == "pending",
+            NewsletterDelivery.subscriber_id.between(first_id, last_id),
+        )
+        .order_by(NewsletterDelivery.subscriber_id)
+        .limit(limit)
+    )
+    if dialect_name() == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    ids = db.session.execute(query).scalars().all()
+    if not ids:
+        db.session.commit()
+        return []
+
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(NewsletterDelivery)
+        .where(NewsletterDelivery.id.in_(ids), NewsletterDelivery.status == "pending")
+        .values(status="sending", claim_token=token, claimed_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return db.session.execute(
+        select(NewsletterDelivery.id, NewsletterDelivery.email).where(
+            NewsletterDelivery.claim_token == token, NewsletterDelivery.status == "sending"
+        )
+    ).all()
+
+
+def _record_results(campaign_id, results):
+    """Esito di un blocco: UPDATE executemany + contatori relativi, un commit"""
+    now = datetime.utcnow()
+    sent = [{"delivery_id": delivery_id} for delivery_id, ok, _ in results if ok]
+    failed = [{"delivery_id": delivery_id, "message": message} for delivery_id, ok, message in results if not ok]
+
+    table = NewsletterDelivery.__table__
+    if sent:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("delivery_id")).values(status="sent", sent_at=now),
+            sent,
+        )
+    if failed:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("delivery_id")).values(status="failed", error=bindparam("message")),
+            failed,
+        )
+
+    db.session.execute(
+        update(NewsletterCampaign)
+        .where(NewsletterCampaign.id == campaign_id)
+        .values(
+            sent_count=NewsletterCampaign.sent_count + len(sent),
+            failed_count=NewsletterCampaign.failed_count + len(failed),
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return len(sent), len(failed)
+
+
+def send_chunk(campaign_id, first_id, last_id, time_budget=TIME_BUDGET_SECONDS):
+    """
+    Invia ai destinatari in attesa con subscriber_id in [first_id, last_id]
+    fino al termine o al time budget
+
+    Returns:
+        Dizionario {sent, failed, seconds}
+    """
+    from src.utils.email_service import EmailService
+    from src.utils.email_templates import campaign_skeletons
+
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    subject = campaign.subject
+    # Template renderizzato una volta: per destinatario solo i segnaposto
+    html_skeleton, text_skeleton = campaign_skeletons(campaign)
+    service = EmailService()
+    limiter = _RateLimiter(campaign_id, campaign.rate_limit)
+    concurrency = max(1, min(campaign.concurrency or 1, service.pool.max_size))
+
+    def deliver(row):
+        delivery_id, email = row
+        limiter.wait()
+        html_body = html_skeleton.fill(email=email)
+        text_body = text_skeleton.fill(email=email) if text_skeleton else None
+        ok, message = service.send_email(email, subject, html_body, text_body)
+        return delivery_id, ok, None if ok else message
+
+    started = time.monotonic()
+    totals = {"sent": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while time.monotonic() - started < time_budget:
+            status = db.session.execute(
+                select(NewsletterCampaign.status).where(NewsletterCampaign.id == campaign_id)
+            ).scalar()
+            if status != "sending":
+                break
+
+            rows = _claim_deliveries(campaign_id, first_id, last_id, SEND_BATCH_SIZE)
+            if not rows:
+                break
+
+            sent, failed = _record_results(campaign_id, list(executor.map(deliver, rows)))
+            totals["sent"] += sent
+            totals["failed"] += failed
+
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    return totals
+
+
+def finish_campaign(campaign_id, results=()):
+    """
+    Chiude un giro di invio: contatori esatti dalle righe delivery
+
+    Returns:
+        'completed', 'continue' (restano destinatari: rilanciare
+        prepare_campaign) o lo stato della campagna se non è in invio
+    """
+    counts = dict(
+        db.session.execute(
+            select(NewsletterDelivery.status, func.count())
+            .where(NewsletterDelivery.campaign_id == campaign_id)
+            .group_by(NewsletterDelivery.status)
+        ).all()
+    )
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    campaign.sent_count = counts.get("sent", 0)
+    campaign.failed_count = counts.get("failed", 0) + counts.get("interrupted", 0)
+    campaign.lease_expires_at = None
+
+    sent = sum(result.get("sent", 0) for result in results if result)
+    current_app.logger.info(
+        f"Newsletter campaign {campaign_id}: {sent} messaggi in questo giro, "
+        f"{campaign.sent_count}/{campaign.total_recipients} totali ({campaign.to_dict()['throughput'] or 0}/s)"
+    )
+
+    if campaign.status != "sending":
+        db.session.commit()
+        return campaign.status
+
+    if counts.get("pending") or counts.get("sending"):
+        db.session.commit()
+        return "continue"
+
+    campaign.status = "completed"
+    campaign.completed_at = datetime.utcnow()
+    db.session.commit()
+    return "completed"
+
+
+def run_campaign(campaign_id):
+    """Invio completo nel processo corrente, senza Celery ('flask send-campaign')"""
+    while True:
+        chunks = prepare_campaign(campaign_id)
+        if chunks is None:
+            return None
+        results = [send_chunk(campaign_id, first_id, last_id) for first_id, last_id in chunks]
+        outcome = finish_campaign(campaign_id, results)
+        if outcome != "continue":
+            return outcome
+
+
+def stale_campaign_ids(now=None):
+    """Campagne in coda o in invio il cui lease è scaduto (worker morto o task perso)"""
+    now = now or datetime.utcnow()
+    return [
+        campaign_id
+        for (campaign_id,) in db.session.query(NewsletterCampaign.id).filter(
+            NewsletterCampaign.status.in_(["queued", "sending"]),
+            or_(
+                NewsletterCampaign.lease_expires_at < now,
+                (NewsletterCampaign.lease_expires_at.is_(None))
+                & (NewsletterCampaign.updated_at < now - timedelta(seconds=LEASE_SECONDS)),
+            ),
+        )
+    ]
@@ -0,0 +1,250 @@
+"""
+Newsletter digest for Rio Capital Blog
+Digest periodico degli articoli pubblicati, personalizzato per categorie.
+
+Le preferenze di ogni iscritto diventano una bitmask sulle categorie:
+- NewsletterSubscriber.preferences = {"categories": [id o slug, ...]}
+- NotificationPreference(notification_type="category", target_id=id
+  categoria) dell'utente con la stessa email
+Nessuna preferenza = tutte le categorie. Gli iscritti vengono raggruppati
+per la lista di articoli che ne risulta: ogni digest distinto è composto
+e renderizzato una volta sola e diventa una campagna newsletter con i soli
+destinatari del gruppo. Il costo cresce con le combinazioni di preferenze
+distinte, non con gli iscritti.
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, select
+
+from src.extensions import db
+from src.models.article import Article
+from src.models.category import Category
+from src.models.newsletter import (
+    NewsletterCampaign,
+    NewsletterDelivery,
+    NewsletterSubscriber,
+    NotificationPreference,
+)
+from src.models.user import User
+from src.utils.email_templates import render_email
+
+
+CATEGORY_PREFERENCE = "category"
+
+
+class CategoryBits:
+    """Posizione di ogni categoria attiva nella bitmask (per id e per slug)"""
+
+    def __init__(self, categories):
+        self.by_id, self.by_slug, self.names = {}, {}, {}
+        for position, category in enumerate(categories):
+            bit = 1 << position
+            self.by_id[category.id] = bit
+            self.by_slug[category.slug] = bit
+            self.names[category.id] = category.name
+
+    def mask(self, values):
+        """Bitmask di una lista di id o slug (valori sconosciuti ignorati)"""
+        mask = 0
+        for value in values or ():
+            if isinstance(value, str) and not value.isdigit():
+                mask |= self.by_slug.get(value, 0)
+            else:
+                try:
+                    mask |= self.by_id.get(int(value), 0)
+                except (TypeError, ValueError):
+                    continue
+        return mask
+
+
+def _period(period_end=None, days=None):
+    days = days or current_app.config["NEWSLETTER_DIGEST_DAYS"]
+    period_end = period_end or datetime.utcnow()
+    return period_end - timedelta(days=days), period_end
+
+
+def _period_articles(period_start, period_end):
+    """Articoli pubblicati nel periodo, più recenti prima (una query)"""
+    published_at = func.coalesce(Article.published_at, Article.created_at)
+    return db.session.execute(
+        select(Article.id, Article.title, Article.slug, Article.excerpt, Article.category_id)
+        .where(
+            Article.published.is_(True),
+            published_at >= period_start,
+            published_at < period_end,
+        )
+        .order_by(published_at.desc(), Article.id.desc())
+    ).all()
+
+
+def _user_masks(bits):
+    """Bitmask delle categorie seguite dagli utenti, per email (una query)"""
+    masks = {}
+    rows = db.session.execute(
+        select(User.email, NotificationPreference.target_id)
+        .join(User, User.id == NotificationPreference.user_id)
+        .where(
+            NotificationPreference.notification_type == CATEGORY_PREFERENCE,
+            NotificationPreference.is_active.is_(True),
+            NotificationPreference.target_id.isnot(None),
+        )
+    )
+    for email, category_id in rows:
+        key = (email or "").lower()
+        masks[key] = masks.get(key, 0) | bits.by_id.get(category_id, 0)
+    return masks
+
+
+def group_subscribers(bits):
+    """
+    Iscritti attivi raggruppati per bitmask (0 = tutte le categorie)
+
+    Returns:
+        {mask: [(subscriber_id, email), ...]}
+    """
+    user_masks = _user_masks(bits)
+    groups = {}
+    rows = db.session.execute(
+        select(NewsletterSubscriber.id, NewsletterSubscriber.email, NewsletterSubscriber.preferences)
+        .where(NewsletterSubscriber.is_active.is_(True))
+        .order_by(NewsletterSubscriber.id)
+        .execution_options(yield_per=1000)
+    )
+    for subscriber_id, email, preferences in rows:
+        categories = preferences.get("categories") if isinstance(preferences, dict) else None
+        mask = bits.mask(categories) | user_masks.get(email.lower(), 0)
+        groups.setdefault(mask, []).append((subscriber_id, email))
+    return groups
+
+
+def _select_articles(articles, bits, mask, limit):
+    if not mask:
+        return articles[:limit]
+    return [a for a in articles if bits.by_id.get(a.category_id, 0) & mask][:limit]
+
+
+def _render_digest(articles, bits, period_start, period_end, personalized):
+    """Corpo HTML e testo di un digest, sezioni per categoria"""
+    site_url = current_app.config["SITE_URL"].rstrip("/")
+    sections = {}
+    for article in articles:
+        section = sections.setdefault(
+            article.category_id,
+            {"category": bits.names.get(article.category_id, ""), "articles": []},
+        )
+        section["articles"].append({
+            "title": article.title,
+            "excerpt": article.excerpt,
+            "url": f"{site_url}/article/{article.slug}",
+        })
+    return render_email(
+        "digest",
+        sections=list(sections.values()),
+        period_start=period_start,
+        period_end=period_end,
+        personalized=personalized,
+    )
+
+
+def plan_digest(period_end=None, days=None):
+    """
+    Raggruppa gli iscritti per digest distinto, senza renderizzare
+
+    Returns:
+        (period_start, period_end, bits, [(articoli, [(subscriber_id, email), ...], personalizzato)])
+    """
+    period_start, period_end = _period(period_end, days)
+    limit = current_app.config["NEWSLETTER_DIGEST_MAX_ARTICLES"]
+    bits = CategoryBits(
+        Category.query.filter(Category.is_active.is_(True)).order_by(Category.id).all()
+    )
+    articles = _period_articles(period_start, period_end)
+    if not articles:
+        return period_start, period_end, bits, []
+
+    # Maschere diverse con la stessa lista di articoli ricevono lo stesso digest
+    digests = {}
+    for mask, recipients in group_subscribers(bits).items():
+        selected = _select_articles(articles, bits, mask, limit)
+        if not selected:
+            continue
+        key = tuple(article.id for article in selected)
+        digest = digests.setdefault(key, [selected, [], True])
+        digest[1].extend(recipients)
+        # Il testo "categorie che segui" solo se nessun destinatario le segue tutte
+        digest[2] = digest[2] and mask != 0
+
+    return period_start, period_end, bits, [tuple(digest) for digest in digests.values()]
+
+
+def _digest_key(period_end, article_ids):
+    digest = hashlib.sha1(",".join(map(str, article_ids)).encode("utf-8")).hexdigest()[:16]
+    return f"digest:{period_end:%Y-%m-%d}:{digest}"
+
+
+def _insert_deliveries(campaign_id, recipients, chunk_size):
+    for start in range(0, len(recipients), chunk_size):
+        db.session.execute(
+            insert(NewsletterDelivery),
+            [
+                {"campaign_id": campaign_id, "subscriber_id": subscriber_id, "email": email, "status": "pending"}
+                for subscriber_id, email in recipients[start:start + chunk_size]
+            ],
+        )
+
+
+def build_digest(period_end=None, days=None, created_by=None, dispatch=True):
+    """
+    Crea e mette in coda una campagna per ogni digest distinto del periodo
+    Idempotente per periodo: i digest con digest_key già esistente vengono
+    saltati (es: comando rilanciato dopo un errore).
+
+    Returns:
+        Lista di dizionari {campaign_id, recipients, articles, created}
+    """
+    from src.utils.newsletter_campaigns import queue_campaign
+
+    period_start, period_end, bits, digests = plan_digest(period_end, days)
+    chunk_size = current_app.config["NEWSLETTER_CHUNK_SIZE"]
+    subject = (
+        f"Il meglio della settimana su Lit Investor Blog "
+        f"({period_start:%d/%m} - {period_end:%d/%m})"
+    )
+
+    results = []
+    for articles, recipients, personalized in digests:
+        digest_key = _digest_key(period_end, [article.id for article in articles])
+        existing = NewsletterCampaign.query.filter_by(digest_key=digest_key).first()
+        if existing is not None:
+            results.append({
+                "campaign_id": existing.id,
+                "recipients": existing.total_recipients,
+                "articles": len(articles),
+                "created": False,
+            })
+            continue
+
+        html_body, text_body = _render_digest(articles, bits, period_start, period_end, personalized)
+        campaign = NewsletterCampaign(
+            subject=subject,
+            html_body=html_body,
+            text_body=text_body,
+            digest_key=digest_key,
+            created_by=created_by,
+            total_recipients=len(recipients),
+        )
+        db.session.add(campaign)
+        db.session.flush()
+        _insert_deliveries(campaign.id, recipients, chunk_size)
+        queue_campaign(campaign, dispatch=dispatch)
+
+        results.append({
+            "campaign_id": campaign.id,
+            "recipients": len(recipients),
+            "articles": len(articles),
+            "created": True,
+        })
+
+    return results
@@ -0,0 +1,186 @@
+"""
+Page-view ingestion for Rio Capital Blog
+Normalizza gli eventi del beacon e li scrive in blocco (eventi, condivisioni,
+views_count e trending_score degli articoli, rollup dei giorni già chiusi)
+"""
+import calendar
+import hashlib
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, func, insert, update
+
+from src.extensions import db
+from src.models.analytics import AnalyticsRollupDay, PageViewEvent
+from src.models.article import Article
+from src.models.share import Share
+from src.utils.db_helpers import chunked, insert_ignore
+from src.utils.hyperloglog import get_hll_store, unique_visitors_key
+from src.utils.trending import bump_trending_many
+
+
+EVENT_TYPES = ("view", "read", "share")
+
+# Piattaforme di condivisione accettate dal beacon
+SHARE_PLATFORMS = ("x", "linkedin", "facebook", "whatsapp", "telegram", "mail", "link", "native")
+
+# Limiti contro payload anomali o malevoli
+MAX_EVENTS_PER_REQUEST = 20
+MAX_READ_SECONDS = 4 * 3600
+
+
+def visitor_hash(visitor_id=None, remote_addr=None, user_agent=None):
+    """
+    Identificativo anonimo del visitatore (16 caratteri esadecimali)
+    Usa l'id generato dal browser se presente, altrimenti IP + user agent;
+    il valore originale non viene mai salvato.
+    """
+    source = visitor_id or f"{remote_addr}|{user_agent}"
+    salt = current_app.config.get("SECRET_KEY") or ""
+    return hashlib.sha256(f"{salt}:{source}".encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_event(raw, visitor, now=None):
+    """
+    Valida un evento del beacon
+
+    Returns:
+        Dizionario pronto per il buffer, o None se l'evento non è valido
+    """
+    if not isinstance(raw, dict) or raw.get("type") not in EVENT_TYPES:
+        return None
+
+    try:
+        article_id = int(raw["article_id"]) if raw.get("article_id") is not None else None
+        seconds = int(raw.get("seconds") or 0)
+    except (TypeError, ValueError):
+        return None
+
+    if raw["type"] == "read" and (article_id is None or seconds <= 0):
+        return None
+
+    if raw["type"] == "share" and (article_id is None or raw.get("platform") not in SHARE_PLATFORMS):
+        return None
+
+    event = {
+        "id": uuid.uuid4().hex,  # chiave di deduplica (vedi ingest_events)
+        "t": raw["type"],
+        "a": article_id,
+        "v": visitor,
+        "s": min(seconds, MAX_READ_SECONDS) if raw["type"] == "read" else None,
+        "ts": calendar.timegm((now or datetime.utcnow()).utctimetuple()),
+    }
+    if raw["type"] == "share":
+        event["p"] = raw["platform"]
+    return event
+
+
+def ingest_events(events):
+    """
+    Handler del drainer: scrive un blocco di eventi con statement set-based
+    - un INSERT executemany in page_view_event (e in shares per le condivisioni)
+      dei soli eventi non ancora scritti: un blocco rielaborato dopo un crash
+      del drainer non viene contato due volte
+    - un UPDATE executemany di article.views_count e uno di article.trending_score
+    - un PFADD per sketch (giorno x articolo e giorno x sito) dei visitatori unici
+    - ricalcolo dei rollup solo per i giorni già chiusi (eventi in ritardo)
+    """
+    from src.utils.analytics_rollup import rollup_day
+
+    # Eventi già scritti da un'elaborazione precedente dello stesso blocco
+    seen = set()
+    for keys in chunked({event.get("id") for event in events if isinstance(event, dict) and event.get("id")}):
+        seen.update(
+            key for (key,) in db.session.query(PageViewEvent.event_key).filter(PageViewEvent.event_key.in_(keys))
+        )
+
+    rows = []
+    shares = []
+    for event in events:
+        try:
+            key = event.get("id")
+            if key in seen:
+                continue
+            occurred_at = datetime.utcfromtimestamp(event["ts"])
+            if event["t"] == "share":
+                shares.append({
+                    "article_id": event["a"],
+                    "platform": event["p"],
+                    "created_at": occurred_at,
+                })
+            # Anche le condivisioni: la riga in page_view_event ne registra la chiave
+            rows.append({
+                "event_key": key,
+                "event_type": event["t"],
+                "article_id": event.get("a"),
+                "visitor_hash": event.get("v"),
+                "read_seconds": event.get("s"),
+                "occurred_at": occurred_at,
+            })
+            if key:
+                seen.add(key)
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError):
+            continue
+
+    if shares:
+        # shares.article_id ha una foreign key: scarta gli articoli inesistenti
+        existing = {
+            article_id for (article_id,) in db.session.query(Article.id).filter(
+                Article.id.in_({share["article_id"] for share in shares})
+            )
+        }
+        shares = [share for share in shares if share["article_id"] in existing]
+
+    if not rows:
+        return 0
+
+    db.session.execute(insert_ignore(PageViewEvent.__table__), rows)
+    if shares:
+        db.session.execute(insert(Share), shares)
+
+    views = Counter(
+        row["article_id"] for row in rows
+        if row["event_type"] == "view" and row["article_id"] is not None
+    )
+    if views:
+        article = Article.__table__
+        db.session.execute(
+            update(article)
+            .where(article.c.id == bindparam("article_id"))
+            .values(views_count=func.coalesce(article.c.views_count, 0) + bindparam("views")),
+            [{"article_id": article_id, "views": count} for article_id, count in views.items()],
+        )
+
+    bump_trending_many(
+        [(row["article_id"], "view", row["occurred_at"]) for row in rows if row["event_type"] == "view"]
+        + [(share["article_id"], "share", share["created_at"]) for share in shares]
+    )
+
+    # PFADD è idempotente: rielaborare un blocco dopo un crash non gonfia i conteggi
+    visitors = defaultdict(set)
+    for row in rows:
+        if row["event_type"] != "view" or not row["visitor_hash"]:
+            continue
+        day = row["occurred_at"].date().isoformat()
+        visitors[unique_visitors_key(day)].add(row["visitor_hash"])
+        if row["article_id"] is not None:
+            visitors[unique_visitors_key(day, row["article_id"])].add(row["visitor_hash"])
+
+    store = get_hll_store()
+    for key, values in visitors.items():
+        store.pfadd(key, *values)
+
+    days = {row["occurred_at"].date() for row in rows}
+    closed_days = [
+        day for (day,) in db.session.query(AnalyticsRollupDay.day).filter(
+            AnalyticsRollupDay.day.in_(days), AnalyticsRollupDay.closed.is_(True)
+        )
+    ]
+    db.session.flush()
+    for day in closed_days:
+        rollup_day(day, closed=True)
+
+    db.session.commit()
+    return len(rows)
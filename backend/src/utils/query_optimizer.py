@@ -128,27 +128,34 @@ class OptimizedQueries:
     def get_dashboard_stats():
         """
         Ottiene statistiche per dashboard admin
-        Una query efficiente invece di multiple queries
+        Una scansione per tabella (niente join cartesiano che gonfia i conteggi),
+        eseguite in parallelo dove il driver lo consente
         """
         from src.models.article import Article
         from src.models.user import User
         from src.models.comment import Comment
-        from sqlalchemy import func, case
+        from src.utils.stats import count_if, run_stats, table_stats
         
-        stats = db.session.query(
-            func.count(Article.id).label('total_articles'),
-            func.sum(case((Article.published == True, 1), else_=0)).label('published_articles'),
-            func.count(func.distinct(User.id)).label('total_users'),
-            func.count(Comment.id).label('total_comments'),
-            func.sum(case((Comment.status == 'pending', 1), else_=0)).label('pending_comments')
-        ).select_from(Article).outerjoin(User).outerjoin(Comment).first()
+        stats = run_stats({
+            'articles': table_stats(
+                Article,
+                total=count_if(),
+                published=count_if(Article.published.is_(True)),
+            ),
+            'users': table_stats(User, total=count_if()),
+            'comments': table_stats(
+                Comment,
+                total=count_if(),
+                pending=count_if(Comment.status == 'pending'),
+            ),
+        })
         
         return {
-            'total_articles': stats.total_articles or 0,
-            'published_articles': stats.published_articles or 0,
-            'total_users': stats.total_users or 0,
-            'total_comments': stats.total_comments or 0,
-            'pending_comments': stats.pending_comments or 0
+            'total_articles': stats['articles']['total'] or 0,
+            'published_articles': stats['articles']['published'] or 0,
+            'total_users': stats['users']['total'] or 0,
+            'total_comments': stats['comments']['total'] or 0,
+            'pending_comments': stats['comments']['pending'] or 0
         }
     
     @staticmethod
@@ -2,7 +2,6 @@
 Rate Limiting Configuration for Rio Capital Blog
 Protegge l'applicazione da abuso e brute force attacks
 """
-from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask import request
 import os
@@ -43,14 +42,13 @@ def init_limiter(app):
             # Production deve usare Redis
             storage_uri = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
     
-    limiter = Limiter(
-        app=app,
-        key_func=get_rate_limit_key,
-        default_limits=["1000 per day", "200 per hour"],
-        storage_uri=storage_uri,
-        strategy="fixed-window",  # o "moving-window" per più accuracy
-        headers_enabled=True,  # Aggiunge header X-RateLimit-*
-    )
+    from src.extensions import limiter
+
+    app.config.setdefault('RATELIMIT_STORAGE_URI', storage_uri)
+    # Redis non raggiungibile: limiti in memoria invece di errori 500
+    app.config.setdefault('RATELIMIT_SWALLOW_ERRORS', True)
+    app.config.setdefault('RATELIMIT_IN_MEMORY_FALLBACK_ENABLED', True)
+    limiter.init_app(app)
     
     # Custom error handler
     @app.errorhandler(429)
@@ -75,6 +73,7 @@ class RateLimits:
     
     # Public endpoints
     API_READ = "100 per minute"  # Lettura articoli, etc.
+    ANALYTICS_EVENTS = "60 per minute"  # Beacon analytics (fino a 20 eventi per richiesta)
     API_WRITE = "30 per minute"  # Creazione contenuti
     
     # User-generated content
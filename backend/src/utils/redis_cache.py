@@ -8,6 +8,11 @@ import redis
 import json
 import pickle
 from datetime import timedelta
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from src.extensions import db
+from src.models.cache_generation import CacheGeneration
 
 
 class RedisCache:
@@ -173,6 +178,81 @@ def invalidate_cache(pattern):
     return cache.delete_pattern(pattern)
 
 
+GENERATION_KEY_PREFIX = 'generation:'
+
+
+def get_generation(name):
+    """
+    Legge il numero di generazione di una cache in-process
+    Una sola GET su Redis; senza Redis legge la tabella cache_generation.
+    Se la chiave manca su Redis (mai invalidata, flush o riavvio) il valore
+    del database viene ricopiato con SET NX: le letture successive non
+    toccano più il database e un bump concorrente non viene sovrascritto.
+
+    Args:
+        name: Nome della cache (es: 'username_blacklist')
+
+    Returns:
+        Intero che cambia a ogni invalidazione (0 se mai invalidata)
+    """
+    key = f"{GENERATION_KEY_PREFIX}{name}"
+    if cache.redis_client is not None:
+        try:
+            value = cache.redis_client.get(key)
+            if value is not None:
+                return int(value)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Generation get error: {e}")
+
+    value = db.session.query(CacheGeneration.value).filter_by(name=name).scalar() or 0
+
+    if cache.redis_client is not None:
+        try:
+            cache.redis_client.set(key, value, nx=True)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Generation set error: {e}")
+    return value
+
+
+def bump_generation(name, step=1):
+    """
+    Invalida una cache in-process su tutti i worker
+    Incrementa il contatore nel database (fonte persistente) e lo copia su
+    Redis. Va chiamata dopo il commit dei dati da cui dipende la cache,
+    altrimenti un worker potrebbe ricostruirla con i dati vecchi. Esegue il
+    commit anche delle altre modifiche in sessione.
+
+    Returns:
+        Il nuovo numero di generazione
+    """
+    increment = (
+        update(CacheGeneration)
+        .where(CacheGeneration.name == name)
+        .values(value=CacheGeneration.value + step)
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(increment).rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.add(CacheGeneration(name=name, value=step))
+        except IntegrityError:
+            # Un altro worker ha creato la riga nel frattempo: il savepoint
+            # annulla solo l'INSERT, non le altre modifiche della sessione
+            db.session.execute(increment)
+    db.session.commit()
+
+    value = db.session.query(CacheGeneration.value).filter_by(name=name).scalar()
+
+    if cache.redis_client is not None:
+        try:
+            # SET invece di INCR: Redis resta allineato al DB anche dopo un flush
+            cache.redis_client.set(f"{GENERATION_KEY_PREFIX}{name}", value)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Generation set error: {e}")
+
+    return value
+
+
 # Esempi di utilizzo:
 """
 # 1. Cache semplice su funzione
@@ -0,0 +1,184 @@
+"""
+Response cache for Rio Capital Blog
+Cache stale-while-revalidate dei dati degli endpoint admin: i risultati
+in cache sono serviti subito; superato il soft TTL un solo worker li
+ricalcola in background (single-flight), gli altri continuano a servire
+la versione precedente. In cache vanno solo dati uguali per tutti gli
+utenti: le parti per-utente sono aggiunte dalla route.
+"""
+import threading
+import time
+
+import redis
+from flask import current_app, jsonify
+
+from src.extensions import db
+from src.utils.redis_cache import bump_generation, cache, get_generation
+
+
+ANALYTICS_CACHE = "analytics"
+
+# Secondi dopo cui una risposta va ricalcolata / non può più essere servita
+DEFAULT_SOFT_TTL = 60
+DEFAULT_HARD_TTL = 3600
+
+# Durata del lock di ricalcolo (oltre, un altro worker può riprovare)
+LOCK_TTL = 120
+
+# Attesa massima di una richiesta senza cache mentre un altro worker calcola
+MISS_WAIT_SECONDS = 5
+MISS_POLL_SECONDS = 0.1
+
+# Cache in-process usata quando Redis non è configurato
+LOCAL_MAX_ENTRIES = 256
+
+_local_entries = {}
+_local_locks = set()
+_local_guard = threading.Lock()
+
+
+def _load(key):
+    if cache.redis_client is not None:
+        return cache.get(key)
+    entry = _local_entries.get(key)
+    if entry is None or entry["expires_at"] < time.time():
+        return None
+    return entry
+
+
+def _store(key, entry, hard_ttl):
+    if cache.redis_client is not None:
+        cache.set(key, entry, hard_ttl)
+        return
+    with _local_guard:
+        if len(_local_entries) >= LOCAL_MAX_ENTRIES:
+            # Rimuove le voci più vecchie (generazioni superate incluse)
+            for old_key in sorted(_local_entries, key=lambda k: _local_entries[k]["computed_at"])[: LOCAL_MAX_ENTRIES // 4]:
+                _local_entries.pop(old_key, None)
+        _local_entries[key] = {**entry, "expires_at": entry["computed_at"] + hard_ttl}
+
+
+def _acquire(key):
+    """Lock di ricalcolo: SET NX su Redis, set in-process altrimenti"""
+    if cache.redis_client is not None:
+        try:
+            return bool(cache.redis_client.set(f"lock:{key}", b"1", nx=True, ex=LOCK_TTL))
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Response cache lock error: {e}")
+            return True
+    with _local_guard:
+        if key in _local_locks:
+            return False
+        _local_locks.add(key)
+        return True
+
+
+def _release(key):
+    if cache.redis_client is not None:
+        try:
+            cache.redis_client.delete(f"lock:{key}")
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Response cache unlock error: {e}")
+        return
+    with _local_guard:
+        _local_locks.discard(key)
+
+
+def _cache_key(name, generation, args):
+    params = ",".join(repr(arg) for arg in args)
+    return f"response:{name}:{get_generation(generation)}:{params}"
+
+
+def _entry(payload):
+    return {"payload": payload, "computed_at": time.time()}
+
+
+def _refresh_in_background(builder, args, key, hard_ttl):
+    """
+    Ricalcolo in un thread con il solo app context: builder non può usare
+    request, sessione o utente corrente (la chiave non li contiene)
+    """
+    app = current_app._get_current_object()
+
+    def refresh():
+        with app.app_context():
+            try:
+                payload = builder(*args)
+                if payload is not None:
+                    _store(key, _entry(payload), hard_ttl)
+            except Exception as e:
+                app.logger.error(f"Response cache refresh error ({key}): {e}")
+            finally:
+                _release(key)
+                db.session.remove()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def cached_payload(name, builder, *args, soft_ttl=DEFAULT_SOFT_TTL, hard_ttl=DEFAULT_HARD_TTL,
+                   generation=ANALYTICS_CACHE):
+    """
+    Risultato di builder(*args) con stale-while-revalidate
+
+    builder riceve solo parametri espliciti (già validati dalla route) e
+    restituisce un dizionario serializzabile, uguale per tutti gli utenti;
+    None (es: risorsa inesistente) non viene messo in cache. I dati
+    dell'utente corrente vanno aggiunti dalla route dopo la lettura.
+    La chiave include name, args e la generazione `generation`:
+    invalidate_analytics_cache() rende obsolete tutte le voci.
+
+    Usage:
+        payload, cache_info = cached_payload("dashboard", build_dashboard, time_range)
+        return cached_response(payload, cache_info)
+
+    Returns:
+        (payload, cache_info) con cache_info = (stato, computed_at)
+    """
+    key = _cache_key(name, generation, args)
+
+    entry = _load(key)
+    if entry is not None:
+        if time.time() - entry["computed_at"] < soft_ttl:
+            return entry["payload"], ("HIT", entry["computed_at"])
+        if _acquire(key):
+            _refresh_in_background(builder, args, key, hard_ttl)
+        return entry["payload"], ("STALE", entry["computed_at"])
+
+    if not _acquire(key):
+        # Un altro worker sta calcolando la stessa chiave: attende il risultato
+        deadline = time.monotonic() + MISS_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(MISS_POLL_SECONDS)
+            entry = _load(key)
+            if entry is not None:
+                return entry["payload"], ("HIT", entry["computed_at"])
+        return builder(*args), ("MISS", time.time())
+
+    try:
+        entry = _entry(builder(*args))
+        if entry["payload"] is not None:
+            _store(key, entry, hard_ttl)
+        return entry["payload"], ("MISS", entry["computed_at"])
+    finally:
+        _release(key)
+
+
+def cached_response(payload, cache_info):
+    """Risposta JSON con gli header X-Cache e Age"""
+    state, computed_at = cache_info
+    response = jsonify(payload)
+    response.headers["X-Cache"] = state
+    response.headers["Age"] = str(int(time.time() - computed_at))
+    return response
+
+
+def invalidate_analytics_cache():
+    """
+    Invalida le risposte analytics su tutti i worker
+    Da chiamare dopo il commit di donazioni o articoli.
+    """
+    try:
+        bump_generation(ANALYTICS_CACHE)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Analytics cache invalidation error: {e}")
@@ -0,0 +1,208 @@
+"""
+SMTP connection pool for Rio Capital Blog
+Connessioni SMTP autenticate riusate tra un invio e l'altro (route e worker
+Celery dello stesso processo), invece di handshake TLS + login per ogni email.
+
+- NOOP di verifica sulle connessioni rimaste inattive
+- riconnessione e nuovo tentativo se il server ha chiuso la connessione
+- chiusura dopo max_messages invii (limite tipico dei provider)
+- pool separato per ogni processo (i worker Celery prefork fanno fork)
+
+Prova in locale con un server fittizio:
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_SECURITY=none flask smtp-check --to test@example.com
+"""
+import os
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+
+SECURITY_MODES = ("ssl", "starttls", "none")
+
+# Errori per cui la connessione va scartata (e l'invio ritentato una volta)
+# (non OSError in generale: SMTPException ne deriva, e un destinatario
+# rifiutato non è un problema della connessione)
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+
+def default_security(port):
+    """465 = SSL implicito, altrimenti STARTTLS (comportamento storico)"""
+    return "ssl" if int(port) == 465 else "starttls"
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool thread-safe di connessioni SMTP
+
+    Usage:
+        pool = SMTPConnectionPool("smtp.example.com", 465, user, password)
+        pool.send(message)
+    """
+
+    def __init__(self, host, port, user=None, password=None, security=None, max_size=4,
+                 max_messages=100, idle_timeout=60, health_check_after=5, timeout=10):
+        security = (security or default_security(port)).lower()
+        if security not in SECURITY_MODES:
+            raise ValueError(f"SMTP_SECURITY non valido: {security}")
+
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.security = security
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._pid = os.getpid()
+        self.stats = {"opened": 0, "closed": 0, "reconnects": 0, "sent": 0}
+
+    def _connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        self.stats["opened"] += 1
+        return _PooledConnection(smtp)
+
+    def _close(self, connection):
+        self.stats["closed"] += 1
+        try:
+            connection.smtp.quit()
+        except Exception:
+            try:
+                connection.smtp.close()
+            except Exception:
+                pass
+
+    def _check_fork(self):
+        """Dopo un fork le connessioni del padre non vanno usate (socket condivisi)"""
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._idle = []
+            self._slots = threading.BoundedSemaphore(self.max_size)
+            self._pid = os.getpid()
+
+    def _is_alive(self, connection):
+        if time.monotonic() - connection.last_used < self.health_check_after:
+            return True
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _take_idle(self):
+        """Connessione inattiva più recente ancora valida (LIFO), o None"""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if now - connection.last_used > self.idle_timeout or not self._is_alive(connection):
+                self._close(connection)
+                continue
+            return connection
+
+    def _reset(self, connection):
+        """Dopo un errore SMTP annulla la transazione e rimette la connessione nel pool"""
+        try:
+            connection.smtp.rset()
+        except Exception:
+            self._close(connection)
+            return
+        self._release(connection)
+
+    def _release(self, connection):
+        connection.last_used = time.monotonic()
+        if connection.messages_sent >= self.max_messages:
+            self._close(connection)
+            return
+        with self._lock:
+            self._idle.append(connection)
+
+    @contextmanager
+    def connection(self):
+        """
+        Connessione in uso esclusivo. Se il blocco solleva un errore di
+        connessione, la connessione viene scartata invece di tornare nel pool.
+        """
+        self._check_fork()
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise smtplib.SMTPException("Nessuna connessione SMTP disponibile nel pool")
+        try:
+            connection = self._take_idle() or self._connect()
+            try:
+                yield connection
+            except CONNECTION_ERRORS:
+                # Server riavviato o rete caduta: anche le altre connessioni
+                # inattive sono probabilmente morte, non vanno ritentate
+                self._close(connection)
+                self.close_all()
+                raise
+            except BaseException:
+                self._reset(connection)
+                raise
+            self._release(connection)
+        finally:
+            slots.release()
+
+    def send(self, message):
+        """
+        Invia un messaggio (email.message.Message). Se la connessione è stata
+        chiusa dal server viene aperta una nuova connessione e l'invio ritentato
+        una volta.
+        """
+        for attempt in range(2):
+            try:
+                with self.connection() as connection:
+                    connection.smtp.send_message(message)
+                    connection.messages_sent += 1
+                    self.stats["sent"] += 1
+                    return
+            except CONNECTION_ERRORS:
+                if attempt:
+                    raise
+                self.stats["reconnects"] += 1
+
+    def close_all(self):
+        """Chiude le connessioni inattive (es: alla chiusura del processo)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, port, user=None, password=None, security=None, **options):
+    """Pool condiviso dal processo per una configurazione SMTP"""
+    key = (host, int(port), user, (security or default_security(port)).lower())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(host, port, user, password, security, **options)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,102 @@
+"""
+Aggregate stats for Rio Capital Blog
+Statistiche calcolate con una sola scansione per tabella (aggregazione
+condizionale) ed eseguite in parallelo su connessioni separate del pool
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import case, func, literal_column, select
+
+from src.extensions import db
+from src.utils.db_helpers import dialect_name
+
+
+# Connessioni usate al massimo da una singola richiesta di statistiche
+MAX_PARALLEL_QUERIES = 4
+
+
+def _supports_filter():
+    dialect = db.engine.dialect
+    if dialect.name == "postgresql":
+        return True
+    if dialect.name == "sqlite":
+        return dialect.dbapi.sqlite_version_info >= (3, 30)
+    return False
+
+
+def _aggregate(name, value, condition):
+    """
+    Aggregato condizionale: FILTER (WHERE ...) dove supportato (PostgreSQL,
+    SQLite >= 3.30), altrimenti CASE WHEN ... END dentro l'aggregato.
+    Le due forme ignorano le righe che non soddisfano la condizione.
+    """
+    aggregate = getattr(func, name)
+    if condition is None:
+        return aggregate(value)
+    if _supports_filter():
+        return aggregate(value).filter(condition)
+    return aggregate(case((condition, value)))
+
+
+def count_if(condition=None):
+    """COUNT delle righe che soddisfano la condizione (tutte se None)"""
+    if condition is None:
+        return func.count()
+    return _aggregate("count", literal_column("1"), condition)
+
+
+def sum_if(value, condition=None):
+    """SUM della colonna sulle righe che soddisfano la condizione"""
+    return func.coalesce(_aggregate("sum", value, condition), 0)
+
+
+def max_if(value, condition=None):
+    """MAX della colonna sulle righe che soddisfano la condizione"""
+    return _aggregate("max", value, condition)
+
+
+def table_stats(source, where=(), **measures):
+    """
+    SELECT di più aggregati su una tabella, in una sola scansione
+
+    Usage:
+        table_stats(Article, total=count_if(), published=count_if(Article.published.is_(True)))
+    """
+    query = select(*[expr.label(name) for name, expr in measures.items()])
+    if source is not None:
+        query = query.select_from(source)
+    return query.where(*where)
+
+
+def _first_row(engine, query):
+    with engine.connect() as connection:
+        row = connection.execute(query).first()
+        return dict(row._mapping) if row is not None else None
+
+
+def run_stats(queries):
+    """
+    Esegue le query di statistiche e restituisce la prima riga di ognuna
+
+    Su SQLite (un solo writer, connessioni per thread) le query vanno in
+    sequenza sulla sessione; altrimenti ognuna usa la propria connessione
+    del pool, in parallelo.
+
+    Args:
+        queries: Dizionario {nome: select}
+
+    Returns:
+        Dizionario {nome: dict della prima riga o None}
+    """
+    if len(queries) <= 1 or dialect_name() == "sqlite":
+        results = {}
+        for name, query in queries.items():
+            row = db.session.execute(query).first()
+            results[name] = dict(row._mapping) if row is not None else None
+        return results
+
+    engine = db.engine
+    workers = min(len(queries), MAX_PARALLEL_QUERIES)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(_first_row, engine, query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
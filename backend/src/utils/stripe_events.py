@@ -0,0 +1,313 @@
+"""
+Stripe events for Rio Capital Blog
+Il webhook salva l'evento grezzo in stripe_event (chiave = id evento, quindi
+le consegne ripetute sono ignorate) e risponde subito; il consumer Celery
+applica gli eventi in attesa alle donazioni a blocchi, con un solo commit
+per blocco.
+"""
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from src.extensions import db
+from src.models.donation import Donation, StripeEvent
+from src.utils.db_helpers import dialect_name
+from src.utils.redis_cache import cache
+
+
+DEFAULT_BATCH_SIZE = 100
+
+# Tentativi prima di marcare un evento come 'failed'
+MAX_ATTEMPTS = 5
+
+# Ritardo del consumer dopo il primo evento: una raffica finisce in un blocco
+PROCESS_COUNTDOWN = 2
+SCHEDULE_LOCK_KEY = "stripe:events:scheduled"
+
+COMPLETED_EVENTS = ("checkout.session.completed", "checkout.session.async_payment_succeeded")
+FAILED_EVENTS = ("checkout.session.expired", "checkout.session.async_payment_failed")
+REFUND_EVENTS = ("charge.refunded",)
+
+
+def store_event(event_id, event_type, payload):
+    """
+    Salva un evento verificato (payload JSON grezzo) ed esegue il commit
+
+    Returns:
+        True se l'evento è nuovo, False se era già stato ricevuto
+    """
+    db.session.add(StripeEvent(id=event_id, event_type=event_type, payload=payload))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Consegna ripetuta (anche concorrente) dello stesso evento
+        db.session.rollback()
+        return False
+
+
+def schedule_processing():
+    """
+    Accoda il consumer, al più un task per finestra di PROCESS_COUNTDOWN
+    secondi (SET NX su Redis). Senza Redis il broker non è disponibile e il
+    webhook non deve attenderne la connessione: gli eventi restano in attesa
+    per il task periodico o per 'flask process-stripe-events'.
+    """
+    from src.celery_app import process_stripe_events_task
+
+    if cache.redis_client is None:
+        return
+
+    try:
+        if not cache.redis_client.set(SCHEDULE_LOCK_KEY, b"1", nx=True, ex=PROCESS_COUNTDOWN):
+            return
+        process_stripe_events_task.apply_async(countdown=PROCESS_COUNTDOWN, retry=False)
+    except Exception as e:
+        current_app.logger.warning(f"Stripe consumer not scheduled, left to beat: {e}")
+
+
+class _DonationLookup:
+    """Donazioni del blocco indicizzate per id e per riferimento Stripe"""
+
+    def __init__(self, objects):
+        ids, refs = set(), set()
+        for obj in objects:
+            donation_id = _donation_id(obj)
+            if donation_id is not None:
+                ids.add(donation_id)
+            refs.update(ref for ref in (obj.get("id"), obj.get("payment_intent")) if ref)
+
+        self.by_id, self.by_ref = {}, {}
+        if ids or refs:
+            for donation in Donation.query.filter(
+                or_(Donation.id.in_(ids), Donation.transaction_id.in_(refs))
+            ):
+                self.add(donation)
+
+    def add(self, donation):
+        if donation.id is not None:
+            self.by_id[donation.id] = donation
+        if donation.transaction_id:
+            self.by_ref[donation.transaction_id] = donation
+
+    def find(self, obj):
+        donation_id = _donation_id(obj)
+        if donation_id in self.by_id:
+            return self.by_id[donation_id]
+        for ref in (obj.get("id"), obj.get("payment_intent")):
+            if ref in self.by_ref:
+                return self.by_ref[ref]
+        return None
+
+
+def _donation_id(obj):
+    value = (obj.get("metadata") or {}).get("donation_id") or obj.get("client_reference_id")
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _donation_from_session(session):
+    """Donazione per una sessione senza riga pending (es: creata fuori dal sito)"""
+    metadata = session.get("metadata") or {}
+    customer = session.get("customer_details") or {}
+    anonymous = str(metadata.get("anonymous", "")).lower() == "true"
+    return Donation(
+        donor_name=None if anonymous else customer.get("name"),
+        donor_email=None if anonymous else customer.get("email"),
+        amount=(session.get("amount_total") or 0) / 100,
+        currency=(session.get("currency") or "eur").upper(),
+        message=metadata.get("message") or None,
+        anonymous=anonymous,
+        payment_method=(session.get("payment_method_types") or ["card"])[0],
+        transaction_id=session.get("id"),
+        status="pending",
+    )
+
+
+def _apply(event_type, obj, lookup):
+    """
+    Applica un evento alle donazioni (senza commit)
+
+    Returns:
+        True se una donazione ha cambiato stato
+    """
+    from src.utils.leaderboards import record_donation
+
+    if event_type in COMPLETED_EVENTS:
+        if obj.get("payment_status") not in ("paid", "no_payment_required"):
+            # Pagamento asincrono: arriverà async_payment_succeeded
+            return False
+        donation = lookup.find(obj)
+        if donation is None:
+            donation = _donation_from_session(obj)
+            db.session.add(donation)
+        if donation.status == "completed":
+            return False
+
+        customer = obj.get("customer_details") or {}
+        if not donation.anonymous:
+            donation.donor_name = donation.donor_name or customer.get("name")
+            donation.donor_email = donation.donor_email or customer.get("email")
+        donation.status = "completed"
+        donation.transaction_id = obj.get("payment_intent") or obj.get("id")
+        lookup.add(donation)
+        record_donation(donation)
+        return True
+
+    if event_type in FAILED_EVENTS:
+        donation = lookup.find(obj)
+        if donation is None or donation.status != "pending":
+            return False
+        donation.status = "failed"
+        return True
+
+    if event_type in REFUND_EVENTS:
+        donation = lookup.find(obj)
+        # I rimborsi parziali non cambiano lo stato della donazione
+        if donation is None or donation.status != "completed" or not obj.get("refunded"):
+            return False
+        donation.status = "refunded"
+        record_donation(donation, refund=True)
+        return True
+
+    return False
+
+
+def process_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Applica un blocco di eventi in attesa, in ordine di ricezione
+    Le donazioni del blocco sono lette con una sola query; ogni evento è
+    applicato in un savepoint e il blocco è salvato con un solo commit. Su
+    PostgreSQL le righe sono
+    prese con SKIP LOCKED, quindi più consumer non si sovrappongono.
+
+    Returns:
+        (eventi elaborati, donazioni modificate)
+    """
+    from src.utils.donation_feed import refresh_donation_feed
+    from src.utils.response_cache import invalidate_analytics_cache
+
+    query = (
+        StripeEvent.query.filter(StripeEvent.status == "pending")
+        .order_by(StripeEvent.received_at, StripeEvent.id)
+        .limit(batch_size)
+    )
+    if dialect_name() == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    events = query.all()
+    if not events:
+        return 0, 0
+
+    parsed = []
+    for event in events:
+        try:
+            parsed.append((event, json.loads(event.payload)["data"]["object"]))
+        except (ValueError, KeyError, TypeError) as e:
+            event.status = "failed"
+            event.error = f"Payload non valido: {e}"
+
+    lookup = _DonationLookup(obj for _, obj in parsed)
+    changed = 0
+    now = datetime.utcnow()
+
+    for event, obj in parsed:
+        event.attempts = (event.attempts or 0) + 1
+        try:
+            # Savepoint per evento: un errore (anche nel flush) annulla solo
+            # le sue modifiche, non quelle degli altri eventi del blocco
+            with db.session.begin_nested():
+                applied = _apply(event.event_type, obj, lookup)
+        except Exception as e:
+            event.error = str(e)
+            event.status = "failed" if event.attempts >= MAX_ATTEMPTS else "pending"
+            # Le donazioni annullate dal savepoint non vanno riusate dagli eventi successivi
+            lookup = _DonationLookup(obj for _, obj in parsed)
+            continue
+
+        if applied:
+            changed += 1
+            event.status = "processed"
+        else:
+            event.status = "ignored"
+        event.error = None
+        event.processed_at = now
+
+    # Le donazioni cambiate su giorni già chiusi riaprono il rollup del giorno
+    # (listener before_flush di analytics_rollup): lo ricalcola rollup_pending
+    db.session.commit()
+
+    if changed:
+        invalidate_analytics_cache()
+        refresh_donation_feed()
+
+    return len(events), changed
+
+
+def process_all(batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """Svuota la coda a blocchi; restituisce (eventi, donazioni modificate)"""
+    total_events = total_changed = batches = 0
+    while max_batches is None or batches < max_batches:
+        processed, changed = process_pending(batch_size)
+        total_events += processed
+        total_changed += changed
+        batches += 1
+        if processed < batch_size:
+            break
+    return total_events, total_changed
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Header Stripe-Signature per un payload (stesso schema v1 di Stripe)"""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(
+        secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def simulated_event(event_type="checkout.session.completed", amount=10.0, donor_name=None,
+                    donor_email=None, donation_id=None, payment_intent=None):
+    """
+    Evento fittizio con la forma di quelli Stripe, per provare il webhook
+    in locale senza account ('flask stripe-simulate')
+    """
+    payment_intent = payment_intent or f"pi_sim_{uuid.uuid4().hex[:24]}"
+    if event_type in REFUND_EVENTS:
+        obj = {
+            "id": f"ch_sim_{uuid.uuid4().hex[:24]}",
+            "object": "charge",
+            "amount": int(round(amount * 100)),
+            "amount_refunded": int(round(amount * 100)),
+            "payment_intent": payment_intent,
+            "refunded": True,
+        }
+    else:
+        obj = {
+            "id": f"cs_sim_{uuid.uuid4().hex[:24]}",
+            "object": "checkout.session",
+            "amount_total": int(round(amount * 100)),
+            "currency": "eur",
+            "customer_details": {"name": donor_name, "email": donor_email},
+            "metadata": {"donation_id": str(donation_id)} if donation_id else {},
+            "payment_intent": payment_intent,
+            "payment_method_types": ["card"],
+            "payment_status": "unpaid" if event_type in FAILED_EVENTS else "paid",
+        }
+
+    return {
+        "id": f"evt_sim_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "livemode": False,
+        "data": {"object": obj},
+    }
@@ -0,0 +1,161 @@
+"""
+Subscriber import for Rio Capital Blog
+Import CSV degli iscritti alla newsletter in streaming: il file viene letto
+riga per riga e gestito a blocchi di IMPORT_CHUNK_SIZE indirizzi, con per
+ogni blocco una sola SELECT per gli indirizzi già presenti e un solo
+INSERT executemany (ON CONFLICT DO NOTHING, quindi sicuro anche con
+iscrizioni concorrenti) e un commit.
+"""
+import codecs
+import csv
+import re
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.newsletter import NewsletterSubscriber
+from src.utils.db_helpers import DEFAULT_CHUNK_SIZE, insert_ignore
+
+
+# Stesso formato accettato da /newsletter/subscribe
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+# Lunghezza della colonna: oltre, PostgreSQL rifiuta l'INSERT (DataError)
+EMAIL_MAX_LENGTH = NewsletterSubscriber.email.type.length
+
+# Indirizzi per blocco (anche dimensione della IN (...) di controllo)
+IMPORT_CHUNK_SIZE = DEFAULT_CHUNK_SIZE
+
+# Righe non valide riportate nella risposta (le altre sono solo contate)
+MAX_REPORTED_ERRORS = 20
+
+EMAIL_HEADERS = ("email", "e-mail", "mail", "indirizzo email")
+
+
+def _text_lines(stream, encoding="utf-8-sig"):
+    """Righe di testo da uno stream binario, decodificate in modo incrementale"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    while True:
+        block = stream.read(64 * 1024)
+        if not block:
+            break
+        # L'ultima riga può essere incompleta: resta per il blocco successivo
+        *lines, pending = (pending + decoder.decode(block)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _email_rows(stream):
+    """
+    (numero riga, email) dal CSV: colonna con intestazione email, o la
+    prima colonna se il file non ha intestazione
+    """
+    reader = csv.reader(_text_lines(stream))
+    first = next(reader, None)
+    if first is None:
+        return
+
+    headers = [value.strip().lower() for value in first]
+    column = next((i for i, value in enumerate(headers) if value in EMAIL_HEADERS), None)
+    if column is None:
+        column = 0
+        if first:
+            yield 1, first[0]
+
+    for line_number, row in enumerate(reader, start=2):
+        if len(row) > column:
+            yield line_number, row[column]
+        elif row:
+            yield line_number, ""
+
+
+class ImportReport:
+    """Contatori dell'import restituiti dall'endpoint"""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+
+    def invalid_row(self, line_number, value):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "value": value[:120]})
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "existing": self.existing,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+def _import_chunk(chunk, seen, report):
+    """Valida, deduplica e inserisce un blocco di (riga, email); un commit"""
+    normalized = [(line_number, value.strip().lower()) for line_number, value in chunk]
+    valid = {}
+    for line_number, email in normalized:
+        if len(email) > EMAIL_MAX_LENGTH or not EMAIL_PATTERN.match(email):
+            report.invalid_row(line_number, email)
+        elif email in valid or email in seen:
+            report.duplicates += 1
+        else:
+            valid[email] = line_number
+    if not valid:
+        return
+
+    existing = set(
+        db.session.execute(
+            select(NewsletterSubscriber.email).where(NewsletterSubscriber.email.in_(list(valid)))
+        ).scalars()
+    )
+    report.existing += len(existing)
+    seen.update(valid)
+
+    now = datetime.utcnow()
+    rows = [
+        {"email": email, "subscribed_at": now, "is_active": True, "preferences": {}}
+        for email in valid
+        if email not in existing
+    ]
+    if rows:
+        result = db.session.execute(insert_ignore(NewsletterSubscriber.__table__), rows)
+        # rowcount non è sempre disponibile con executemany: al più le righe inviate
+        inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+        report.inserted += inserted
+        report.existing += len(rows) - inserted
+    db.session.commit()
+
+
+def import_subscribers(stream, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Importa gli iscritti da uno stream CSV binario (body della richiesta o
+    file caricato). Gli iscritti esistenti, anche disattivati, non vengono
+    modificati e non viene inviata l'email di conferma.
+
+    Returns:
+        ImportReport
+    """
+    report = ImportReport()
+    # Indirizzi già visti nel file, per i duplicati tra blocchi diversi
+    seen = set()
+    rows = _email_rows(stream)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        report.rows += len(chunk)
+        _import_chunk(chunk, seen, report)
+    return report
@@ -0,0 +1,212 @@
+"""
+Time-series helpers for Rio Capital Blog analytics
+Una query GROUP BY per metrica, con i giorni mancanti riempiti in Python
+"""
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import String, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from src.extensions import db
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class date_bucket(FunctionElement):
+    """
+    Giorno (YYYY-MM-DD) di una colonna datetime, portabile tra dialetti
+
+    Compila in strftime su SQLite, to_char(date_trunc(...)) su PostgreSQL e
+    DATE_FORMAT su MySQL. Restituisce sempre una stringa, così le chiavi del
+    risultato sono identiche su tutti i database.
+    """
+    name = "date_bucket"
+    type = String()
+    inherit_cache = True
+
+
+@compiles(date_bucket)
+def _compile_date_bucket(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(date_bucket, "postgresql")
+def _compile_date_bucket_postgresql(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    return f"to_char(date_trunc('day', {expr}), 'YYYY-MM-DD')"
+
+
+@compiles(date_bucket, "mysql")
+def _compile_date_bucket_mysql(element, compiler, **kw):
+    return f"DATE_FORMAT({compiler.process(element.clauses, **kw)}, '%%Y-%%m-%%d')"
+
+
+def day_start(value):
+    """Mezzanotte del giorno di `value` (date o datetime)"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return datetime.combine(value, time.min)
+
+
+def day_keys(start, end):
+    """
+    Chiavi YYYY-MM-DD di tutti i giorni tra start ed end (inclusi)
+
+    Args:
+        start: date o datetime iniziale
+        end: date o datetime finale
+    """
+    current = start.date() if isinstance(start, datetime) else start
+    last = end.date() if isinstance(end, datetime) else end
+    keys = []
+    while current <= last:
+        keys.append(current.strftime(DATE_FORMAT))
+        current += timedelta(days=1)
+    return keys
+
+
+def daily_totals(date_column, start, end, value=None, filters=()):
+    """
+    Aggrega una metrica per giorno con una sola query GROUP BY
+
+    Args:
+        date_column: Colonna datetime su cui raggruppare (es: Comment.created_at)
+        start: Inizio intervallo (troncato a mezzanotte)
+        end: Fine intervallo (incluso il giorno di `end`)
+        value: Espressione da sommare; None = COUNT(*)
+        filters: Condizioni aggiuntive per la WHERE
+
+    Returns:
+        Dizionario {YYYY-MM-DD: valore} con i soli giorni non vuoti
+    """
+    bucket = date_bucket(date_column)
+    aggregate = func.count() if value is None else func.sum(value)
+
+    query = (
+        select(bucket.label("day"), aggregate.label("total"))
+        .where(date_column >= day_start(start))
+        .where(date_column < day_start(end) + timedelta(days=1))
+        .where(*filters)
+        .group_by(bucket)
+    )
+    return {day: total for day, total in db.session.execute(query) if day is not None}
+
+
+def fill_series(keys, series, cast=int):
+    """
+    Unisce una o più serie giornaliere riempiendo i giorni mancanti con 0
+
+    Args:
+        keys: Giorni da restituire, in ordine (vedi day_keys)
+        series: Dizionario {nome_metrica: {YYYY-MM-DD: valore}}
+        cast: Conversione applicata ai valori (int, float, ...)
+
+    Returns:
+        Lista di dizionari {"date": ..., <metrica>: valore, ...}
+    """
+    return [
+        {"date": key, **{name: cast(values.get(key) or 0) for name, values in series.items()}}
+        for key in keys
+    ]
+
+
+GRANULARITIES = ("day", "week", "month")
+
+# Oltre questi intervalli i punti giornalieri diventano settimanali / mensili
+DAY_GRANULARITY_MAX_DAYS = 90
+WEEK_GRANULARITY_MAX_DAYS = 366
+
+
+def granularity_for(start, end):
+    """Granularità dei bucket in base all'ampiezza dell'intervallo"""
+    days = (day_start(end) - day_start(start)).days
+    if days <= DAY_GRANULARITY_MAX_DAYS:
+        return "day"
+    if days <= WEEK_GRANULARITY_MAX_DAYS:
+        return "week"
+    return "month"
+
+
+def bucket_key(key, granularity):
+    """Chiave del bucket (primo giorno: lunedì della settimana o 1 del mese)"""
+    if granularity == "day":
+        return key
+    day = datetime.strptime(key, DATE_FORMAT).date()
+    if granularity == "week":
+        day -= timedelta(days=day.weekday())
+    else:
+        day = day.replace(day=1)
+    return day.strftime(DATE_FORMAT)
+
+
+def bucket_keys(keys, granularity):
+    """Chiavi dei bucket, in ordine e senza duplicati"""
+    return list(dict.fromkeys(bucket_key(key, granularity) for key in keys))
+
+
+def bucket_series(series, granularity):
+    """
+    Somma le serie giornaliere per bucket
+
+    Args:
+        series: Dizionario {nome_metrica: {YYYY-MM-DD: valore}}
+        granularity: 'day', 'week' o 'month'
+    """
+    if granularity == "day":
+        return series
+    bucketed = {}
+    for name, values in series.items():
+        totals = {}
+        for key, value in values.items():
+            bucket = bucket_key(key, granularity)
+            totals[bucket] = totals.get(bucket, 0) + (value or 0)
+        bucketed[name] = totals
+    return bucketed
+
+
+def _row_value(row):
+    return sum(value for name, value in row.items() if name != "date")
+
+
+def downsample(rows, max_points, value=_row_value):
+    """
+    Largest-Triangle-Three-Buckets: riduce una serie a max_points punti
+    mantenendone la forma (picchi e minimi). Primo e ultimo punto restano.
+
+    Args:
+        rows: Lista ordinata di dizionari (vedi fill_series)
+        max_points: Numero massimo di punti (minimo 3); None o >= len(rows) = invariata
+        value: Valore y di una riga (default: somma delle metriche)
+    """
+    if not max_points or max_points >= len(rows):
+        return rows
+    max_points = max(max_points, 3)
+    if max_points >= len(rows):
+        return rows
+
+    ys = [float(value(row)) for row in rows]
+    every = (len(rows) - 2) / (max_points - 2)
+    selected = [0]
+    a = 0
+
+    for i in range(max_points - 2):
+        # Media del bucket successivo (terzo vertice del triangolo)
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(rows))
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(ys[next_start:next_end]) / max(next_end - next_start, 1)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (ys[j] - ys[a]) - (a - j) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(len(rows) - 1)
+    return [rows[i] for i in selected]
@@ -0,0 +1,190 @@
+"""
+Trending score for Rio Capital Blog
+Punteggio di engagement con decadimento esponenziale, mantenuto in modo
+incrementale su article.trending_score (colonna indicizzata).
+
+Usa il "forward decay": ogni evento aggiunge peso * 2^((t - epoch) / half_life),
+quindi gli eventi recenti pesano di più e il valore salvato non va mai
+ricalcolato nel tempo. L'ordinamento per trending_score equivale a quello
+per punteggio decaduto al momento attuale. Il task orario dei rollup sposta
+l'epoca a ieri (rebase_trending), così il moltiplicatore resta piccolo e il
+float non va mai in overflow.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app, g
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.orm import joinedload
+
+from src.extensions import db
+from src.models.article import Article
+from src.utils.redis_cache import bump_generation, get_generation
+
+
+# Peso di ogni tipo di evento
+WEIGHTS = {
+    "view": 1.0,
+    "like": 3.0,
+    "share": 4.0,
+    "comment": 5.0,
+}
+
+
+# Contatore in cache_generation: giorni di cui l'epoca è stata spostata
+# in avanti rispetto a TRENDING_EPOCH
+EPOCH_GENERATION = "trending_epoch"
+
+
+def _epoch():
+    """Epoca corrente del forward decay (letta una volta per contesto)"""
+    if "trending_epoch" not in g:
+        base = datetime.strptime(current_app.config["TRENDING_EPOCH"], "%Y-%m-%d")
+        g.trending_epoch = base + timedelta(days=get_generation(EPOCH_GENERATION))
+    return g.trending_epoch
+
+
+def _half_life_seconds():
+    return current_app.config["TRENDING_HALF_LIFE_HOURS"] * 3600
+
+
+def decay_factor(at=None):
+    """Moltiplicatore forward-decay per un evento avvenuto in `at` (default: ora)"""
+    elapsed = ((at or datetime.utcnow()) - _epoch()).total_seconds()
+    return 2.0 ** (elapsed / _half_life_seconds())
+
+
+def current_score(stored_score, now=None):
+    """Punteggio decaduto ad oggi, comparabile tra articoli (per la visualizzazione)"""
+    return (stored_score or 0.0) / decay_factor(now)
+
+
+def _increment(delta):
+    score = func.coalesce(Article.__table__.c.trending_score, 0.0) + delta
+    # Le rimozioni (unlike) non devono portare il punteggio sotto zero
+    return case((score < 0, 0.0), else_=score)
+
+
+def bump_trending(article_id, event_type, at=None, count=1, remove=False):
+    """
+    Aggiorna il punteggio di un articolo per un evento. Non esegue il commit.
+
+    Args:
+        article_id: Articolo
+        event_type: Chiave di WEIGHTS
+        at: Momento dell'evento (per le rimozioni: quello dell'evento originale)
+        count: Numero di eventi
+        remove: True per annullare un evento precedente (es: unlike)
+    """
+    delta = WEIGHTS[event_type] * count * decay_factor(at)
+    if remove:
+        delta = -delta
+
+    table = Article.__table__
+    db.session.execute(
+        update(table).where(table.c.id == article_id).values(trending_score=_increment(delta))
+    )
+
+
+def bump_trending_many(events):
+    """
+    Aggiornamento in blocco: un solo UPDATE executemany
+
+    Args:
+        events: Iterabile di (article_id, event_type, at)
+    """
+    deltas = defaultdict(float)
+    for article_id, event_type, at in events:
+        if article_id is not None:
+            deltas[article_id] += WEIGHTS[event_type] * decay_factor(at)
+
+    if not deltas:
+        return
+
+    table = Article.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam("article_id"))
+        .values(trending_score=_increment(bindparam("delta"))),
+        [{"article_id": article_id, "delta": delta} for article_id, delta in deltas.items()],
+    )
+
+
+def trending_articles(limit=10, published_only=True, since=None):
+    """Top-K per punteggio: una lettura sull'indice di trending_score"""
+    query = Article.query.options(joinedload(Article.category), joinedload(Article.author))
+    if published_only:
+        # Esclude anche gli articoli programmati
+        query = query.filter(
+            Article.published.is_(True),
+            or_(Article.published_at.is_(None), Article.published_at <= datetime.utcnow()),
+        )
+    if since is not None:
+        query = query.filter(Article.created_at >= since)
+    return query.order_by(Article.trending_score.desc(), Article.id.desc()).limit(limit).all()
+
+
+def rebuild_trending():
+    """
+    Ricalcola tutti i punteggi dalle tabelle sorgente (dopo un cambio di
+    TRENDING_EPOCH o per il backfill iniziale). Gli eventi sono aggregati per
+    articolo e giorno con GROUP BY; il decadimento usa il mezzogiorno del giorno.
+    Non esegue il commit.
+    """
+    from src.models.analytics import PageViewEvent
+    from src.models.comment import Comment
+    from src.models.like import ArticleLike
+    from src.models.share import Share
+    from src.utils.timeseries import date_bucket
+
+    sources = [
+        ("like", ArticleLike.article_id, ArticleLike.created_at, ()),
+        ("comment", Comment.article_id, Comment.created_at, ()),
+        ("share", Share.article_id, Share.created_at, ()),
+        ("view", PageViewEvent.article_id, PageViewEvent.occurred_at, (PageViewEvent.event_type == "view",)),
+    ]
+
+    scores = defaultdict(float)
+    for event_type, article_column, date_column, filters in sources:
+        bucket = date_bucket(date_column)
+        rows = db.session.execute(
+            select(article_column, bucket, func.count())
+            .where(article_column.isnot(None), date_column.isnot(None), *filters)
+            .group_by(article_column, bucket)
+        )
+        for article_id, day, count in rows:
+            at = datetime.strptime(day, "%Y-%m-%d").replace(hour=12)
+            scores[article_id] += WEIGHTS[event_type] * count * decay_factor(at)
+
+    table = Article.__table__
+    db.session.execute(update(table).values(trending_score=0.0))
+    if scores:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("article_id"))
+            .values(trending_score=bindparam("score")),
+            [{"article_id": article_id, "score": score} for article_id, score in scores.items()],
+        )
+    return len(scores)
+
+
+def rebase_trending(now=None):
+    """
+    Sposta l'epoca a ieri e divide tutti i punteggi per lo stesso fattore:
+    i punteggi decaduti e l'ordinamento non cambiano. Un solo UPDATE,
+    salvato con un commit insieme al nuovo contatore dell'epoca.
+
+    Returns:
+        Giorni di cui l'epoca è stata spostata (0 se già aggiornata)
+    """
+    target = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    days = (target - _epoch()).days
+    if days <= 0:
+        return 0
+
+    table = Article.__table__
+    factor = 2.0 ** (-days * 86400 / _half_life_seconds())
+    db.session.execute(update(table).values(trending_score=table.c.trending_score * factor))
+    bump_generation(EPOCH_GENERATION, step=days)
+    g.pop("trending_epoch", None)
+    return days
@@ -0,0 +1,133 @@
+"""
+Username blacklist for Rio Capital Blog
+Parole riservate e username bannati, salvati nel database e compilati in un
+matcher in memoria per ogni worker
+"""
+import json
+import os
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.extensions import db
+from src.models.username_blacklist import UsernameBlacklistEntry
+from src.utils.redis_cache import bump_generation, get_generation
+
+
+GENERATION_NAME = 'username_blacklist'
+
+# Seed iniziale (usato anche come fallback se la tabella non è disponibile)
+SEED_PATH = os.path.join(os.path.dirname(__file__), 'forbidden_usernames.json')
+
+
+class UsernameMatcher:
+    """Matcher compilato: set per le corrispondenze esatte, una regex per le substring"""
+
+    def __init__(self, exact_matches, substring_matches):
+        self.exact_matches = frozenset(term.lower() for term in exact_matches)
+        substrings = sorted({term.lower() for term in substring_matches if term}, key=len, reverse=True)
+        self._substring_re = (
+            re.compile('|'.join(re.escape(term) for term in substrings)) if substrings else None
+        )
+
+    def is_reserved(self, username):
+        return username.lower() in self.exact_matches
+
+    def contains_restricted(self, username):
+        return self._substring_re is not None and self._substring_re.search(username.lower()) is not None
+
+
+_matcher = None
+_matcher_generation = None
+_lock = threading.Lock()
+
+
+def _load_seed():
+    try:
+        with open(SEED_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('exact_matches', []), data.get('substring_matches', [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return [], []
+
+
+def _build_matcher():
+    rows = db.session.query(UsernameBlacklistEntry.term, UsernameBlacklistEntry.match_type).all()
+    exact = [term for term, match_type in rows if match_type == 'exact']
+    substrings = [term for term, match_type in rows if match_type == 'substring']
+    return UsernameMatcher(exact, substrings)
+
+
+def get_matcher():
+    """
+    Restituisce il matcher del worker, ricostruendolo solo se la generazione
+    è cambiata dall'ultima compilazione (un GET su Redis per richiesta)
+    """
+    global _matcher, _matcher_generation
+
+    try:
+        generation = get_generation(GENERATION_NAME)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Username blacklist generation unavailable: {e}")
+        if _matcher is None:
+            _matcher = UsernameMatcher(*_load_seed())
+        return _matcher
+
+    if _matcher is not None and generation == _matcher_generation:
+        return _matcher
+
+    with _lock:
+        if _matcher is None or generation != _matcher_generation:
+            try:
+                _matcher = _build_matcher()
+                _matcher_generation = generation
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.error(f"Username blacklist reload failed: {e}")
+                if _matcher is None:
+                    _matcher = UsernameMatcher(*_load_seed())
+
+    return _matcher
+
+
+def add_banned_username(user, reason):
+    """
+    Aggiunge lo username di un utente bannato alla blacklist (substring)
+    Non esegue il commit: dopo il commit chiamare invalidate_blacklist().
+    """
+    term = user.username.lower()
+    entry = UsernameBlacklistEntry.query.filter_by(term=term, match_type='substring').first()
+    if entry is None:
+        entry = UsernameBlacklistEntry(term=term, match_type='substring', source='ban')
+        db.session.add(entry)
+    entry.banned_user_id = user.id
+    entry.reason = reason
+    return entry
+
+
+def seed_blacklist():
+    """
+    Importa le parole riservate da forbidden_usernames.json (idempotente)
+    Non esegue il commit.
+
+    Returns:
+        Numero di voci aggiunte
+    """
+    exact, substrings = _load_seed()
+    existing = set(db.session.query(UsernameBlacklistEntry.term, UsernameBlacklistEntry.match_type).all())
+
+    added = 0
+    for match_type, terms in (('exact', exact), ('substring', substrings)):
+        for term in {t.lower() for t in terms}:
+            if (term, match_type) not in existing:
+                db.session.add(UsernameBlacklistEntry(term=term, match_type=match_type, source='reserved'))
+                added += 1
+    return added
+
+
+def invalidate_blacklist():
+    """Forza la ricostruzione del matcher su tutti i worker"""
+    return bump_generation(GENERATION_NAME)
@@ -0,0 +1,55 @@
+"""
+Test fixtures for Rio Capital Blog
+App di test su SQLite temporaneo, senza Redis e senza rate limit
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from src.extensions import db  # noqa: E402
+from src.main import create_app  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    from src.utils import response_cache
+
+    # Cache in-process condivisa dal modulo: vuota per ogni test
+    response_cache._local_entries.clear()
+    response_cache._local_locks.clear()
+    app = create_app("testing", config_overrides={
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/test.db",
+        "REDIS_URL": None,
+        "CACHE_REDIS_URL": None,
+        "RATELIMIT_ENABLED": False,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Crea un utente con password nota (Pw123456!)"""
+    def make_user(username, role="user"):
+        from src.models.user import User
+
+        user = User(username=username, email=f"{username}@example.com", role=role)
+        user.set_password("Pw123456!")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+def login(client, username):
+    response = client.post("/api/auth/login", json={"username": username, "password": "Pw123456!"})
+    assert response.status_code == 200, response.get_json()
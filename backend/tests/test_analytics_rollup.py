@@ -0,0 +1,90 @@
+"""Ricalcolo dei rollup giornalieri dopo modifiche a giorni chiusi"""
+from datetime import datetime, timedelta
+
+from conftest import login
+
+from src.extensions import db
+from src.models.analytics import AnalyticsDaily, AnalyticsRollupDay
+from src.models.article import Article
+from src.models.category import Category
+from src.models.comment import Comment
+from src.models.donation import Donation
+from src.utils.analytics_rollup import REROLL_DAYS, backfill, rollup_pending
+
+
+def _site_value(day, metric):
+    row = AnalyticsDaily.query.filter_by(day=day, metric=metric, dimension="site", entity_id=0).one()
+    return row.value
+
+
+def test_changes_on_closed_days_are_rolled_up_again(app, make_user):
+    author = make_user("autore")
+    category = Category(name="Mercati", slug="mercati", created_by=author.id)
+    db.session.add(category)
+    db.session.commit()
+
+    # Oltre la finestra REROLL_DAYS: solo la riapertura del giorno lo ricalcola
+    created_at = datetime.utcnow() - timedelta(days=REROLL_DAYS + 10)
+    day = created_at.date()
+    article = Article(title="T", slug="t", content="x", author_id=author.id, category_id=category.id)
+    db.session.add(article)
+    db.session.commit()
+    comment = Comment(content="c", article_id=article.id, user_id=author.id, created_at=created_at)
+    donation = Donation(amount=25.0, payment_method="stripe", status="completed", created_at=created_at)
+    db.session.add_all([comment, donation])
+    db.session.commit()
+
+    backfill(day)
+    assert _site_value(day, "revenue") == 25.0
+    assert _site_value(day, "comments") == 1
+
+    donation.status = "refunded"
+    db.session.delete(comment)
+    db.session.commit()
+    assert db.session.get(AnalyticsRollupDay, day).closed is False
+
+    assert day in rollup_pending()
+    assert _site_value(day, "revenue") == 0
+    assert _site_value(day, "comments") == 0
+    assert db.session.get(AnalyticsRollupDay, day).closed is True
+
+
+def test_unrelated_updates_do_not_reopen_days(app):
+    created_at = datetime.utcnow() - timedelta(days=REROLL_DAYS + 10)
+    donation = Donation(amount=10.0, payment_method="stripe", status="completed", created_at=created_at)
+    db.session.add(donation)
+    db.session.commit()
+    backfill(created_at.date())
+
+    donation.message = "Grazie"
+    db.session.commit()
+
+    assert db.session.get(AnalyticsRollupDay, created_at.date()).closed is True
+
+
+def test_bulk_comment_delete_reopens_closed_days(app, client, make_user):
+    admin = make_user("admin", role="admin")
+    category = Category(name="Mercati", slug="mercati", created_by=admin.id)
+    db.session.add(category)
+    db.session.commit()
+    article = Article(title="T", slug="t", content="x", author_id=admin.id, category_id=category.id)
+    db.session.add(article)
+    db.session.commit()
+
+    created_at = datetime.utcnow() - timedelta(days=REROLL_DAYS + 10)
+    day = created_at.date()
+    comment = Comment(content="c", article_id=article.id, user_id=admin.id, created_at=created_at)
+    db.session.add(comment)
+    db.session.commit()
+    backfill(day)
+    assert _site_value(day, "comments") == 1
+
+    # DELETE Core: nessun evento ORM, il giorno va riaperto esplicitamente
+    login(client, "admin")
+    response = client.patch(
+        "/api/admin/comments/moderate-bulk", json={"comment_ids": [comment.id], "action": "delete"}
+    )
+    assert response.status_code == 200
+
+    assert day in rollup_pending()
+    assert _site_value(day, "comments") == 0
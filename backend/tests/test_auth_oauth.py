@@ -0,0 +1,26 @@
+"""Completamento della registrazione con Google OAuth"""
+from src.models.user import User
+
+
+def _oauth_session(client, email="nuovo@example.com"):
+    with client.session_transaction() as sess:
+        sess["oauth_profile"] = {"email": email, "first_name": "Mario", "last_name": "Rossi"}
+
+
+def test_complete_oauth_creates_user(client):
+    _oauth_session(client)
+
+    response = client.post("/api/auth/complete-oauth", json={"username": "mario_rossi"})
+
+    assert response.status_code == 201
+    assert response.get_json()["user"]["username"] == "mario_rossi"
+    user = User.query.filter_by(email="nuovo@example.com").one()
+    assert user.password_hash
+    with client.session_transaction() as sess:
+        assert "oauth_profile" not in sess
+
+
+def test_complete_oauth_without_session(client):
+    response = client.post("/api/auth/complete-oauth", json={"username": "mario_rossi"})
+
+    assert response.status_code == 400
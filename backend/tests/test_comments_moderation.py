@@ -0,0 +1,76 @@
+"""Eliminazione e moderazione bulk dei commenti"""
+from conftest import login
+from src.extensions import db
+from src.models.article import Article
+from src.models.category import Category
+from src.models.comment import Comment
+from src.routes import comments as comments_routes
+
+
+def _thread(author):
+    category = Category(name="Mercati", slug="mercati", created_by=author.id)
+    db.session.add(category)
+    db.session.commit()
+    article = Article(title="T", slug="t", content="x", author_id=author.id, category_id=category.id)
+    db.session.add(article)
+    db.session.commit()
+    parent = Comment(content="padre", article_id=article.id, user_id=author.id)
+    other = Comment(content="altro", article_id=article.id, user_id=author.id)
+    db.session.add_all([parent, other])
+    db.session.commit()
+    reply = Comment(content="risposta", article_id=article.id, user_id=author.id, parent_id=parent.id)
+    db.session.add(reply)
+    db.session.commit()
+    return parent.id, other.id, reply.id
+
+
+def test_delete_removes_replies_on_every_endpoint(app, client, make_user):
+    admin = make_user("admin", role="admin")
+    login(client, "admin")
+
+    for path, method, body in (
+        ("/api/comments/{id}", "delete", lambda comment_id: None),
+        ("/api/admin/comments/{id}/moderate", "patch", lambda comment_id: {"action": "delete"}),
+        ("/api/admin/comments/moderate-bulk", "patch", lambda comment_id: {"action": "delete", "comment_ids": [comment_id]}),
+    ):
+        Comment.query.delete()
+        Article.query.delete()
+        Category.query.delete()
+        db.session.commit()
+        parent_id, other_id, reply_id = _thread(admin)
+
+        response = getattr(client, method)(path.format(id=parent_id), json=body(parent_id))
+        assert response.status_code == 200, response.get_json()
+
+        db.session.expire_all()
+        assert db.session.get(Comment, reply_id) is None, path
+        assert db.session.get(Comment, other_id) is not None
+        if path.endswith("bulk"):
+            # Solo il commento selezionato, non la risposta eliminata con lui
+            assert response.get_json()["processed"] == 1
+
+
+def test_bulk_moderation_is_all_or_nothing(app, client, make_user, monkeypatch):
+    admin = make_user("admin", role="admin")
+    parent_id, other_id, _ = _thread(admin)
+    login(client, "admin")
+
+    update_comments = comments_routes._bulk_update_comments
+    calls = []
+
+    def failing_update(ids, values):
+        calls.append(ids)
+        if len(calls) > 1:
+            raise RuntimeError("database non disponibile")
+        return update_comments(ids, values)
+
+    monkeypatch.setattr(comments_routes, "chunked", lambda ids: ([comment_id] for comment_id in ids))
+    monkeypatch.setattr(comments_routes, "_bulk_update_comments", failing_update)
+
+    response = client.patch(
+        "/api/admin/comments/moderate-bulk", json={"comment_ids": [parent_id, other_id], "action": "approve"}
+    )
+    assert response.status_code == 500
+
+    db.session.expire_all()
+    assert db.session.get(Comment, parent_id).status == "pending"
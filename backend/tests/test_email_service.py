@@ -0,0 +1,13 @@
+"""Configurazione del pool SMTP di EmailService"""
+from src.utils import smtp_pool
+from src.utils.email_service import EmailService
+
+
+def test_pool_uses_app_config(app, monkeypatch):
+    # Pool per processo: nessun pool creato da altri test
+    monkeypatch.setattr(smtp_pool, "_pools", {})
+    app.config.update(SMTP_POOL_SIZE=2, SMTP_MAX_MESSAGES_PER_CONNECTION=7, SMTP_IDLE_TIMEOUT=5)
+
+    pool = EmailService().pool
+
+    assert (pool.max_size, pool.max_messages, pool.idle_timeout) == (2, 7, 5)
@@ -0,0 +1,29 @@
+"""Export CSV della dashboard analytics"""
+import csv
+import io
+from datetime import datetime, timedelta
+
+from conftest import login
+from src.extensions import db
+from src.models.donation import Donation
+
+
+def test_analytics_donations_export_keeps_legacy_columns(app, client, make_user):
+    make_user("admin", role="admin")
+    now = datetime.utcnow()
+    db.session.add_all([
+        Donation(donor_name="Anna", amount=5.0, payment_method="card", status="completed",
+                 created_at=now - timedelta(days=1)),
+        Donation(amount=7.5, payment_method="card", status="pending", anonymous=True, created_at=now),
+    ])
+    db.session.commit()
+    login(client, "admin")
+
+    response = client.get("/api/analytics/export?type=donations")
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+    assert rows[0] == ["ID", "Nome Donatore", "Email", "Importo", "Messaggio", "Anonimo", "Stato", "Data"]
+    # Dalle più recenti
+    assert [row[1] for row in rows[1:]] == ["", "Anna"]
+    assert rows[1][5] == "Sì"
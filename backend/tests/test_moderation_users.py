@@ -0,0 +1,35 @@
+"""Lista utenti della moderazione: filtri e ordinamento lato server"""
+from conftest import login
+
+
+def _all_pages(client, **params):
+    users, cursor = [], None
+    while True:
+        query = {**params, "limit": 2}
+        if cursor:
+            query["cursor"] = cursor
+        data = client.get("/api/moderation/users", query_string=query).get_json()
+        users.extend(user["username"] for user in data["users"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            return users
+
+
+def test_users_are_filtered_and_sorted_across_pages(app, client, make_user):
+    make_user("admin", role="admin")
+    for username in ("delta", "alfa", "echo", "bravo", "charlie"):
+        make_user(username)
+    make_user("zulu", role="admin")
+    login(client, "admin")
+
+    assert _all_pages(client, sort="username", direction="asc") == [
+        "admin", "alfa", "bravo", "charlie", "delta", "echo", "zulu",
+    ]
+    assert _all_pages(client, sort="username", direction="desc", role="user") == [
+        "echo", "delta", "charlie", "bravo", "alfa",
+    ]
+    # Default: più recenti prima
+    assert _all_pages(client, q="a", role="admin") == ["zulu", "admin"]
+
+    response = client.get("/api/moderation/users", query_string={"sort": "password_hash"})
+    assert response.status_code == 400
@@ -0,0 +1,67 @@
+"""Beacon analytics: timestamp UTC, rate limit e ingestione idempotente"""
+import time
+from datetime import datetime
+
+from src.extensions import db
+from src.main import create_app
+from src.models.analytics import PageViewEvent
+from src.models.article import Article
+from src.models.category import Category
+from src.models.share import Share
+from src.utils.page_views import ingest_events, normalize_event
+
+
+def test_event_timestamp_is_utc_whatever_the_local_timezone(monkeypatch):
+    now = datetime(2025, 6, 1, 11, 54)
+    monkeypatch.setenv("TZ", "Europe/Rome")
+    time.tzset()
+    try:
+        event = normalize_event({"type": "view", "article_id": 1}, "v" * 16, now)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert datetime.utcfromtimestamp(event["ts"]) == now
+
+
+def test_reprocessed_batch_is_not_counted_twice(app, make_user):
+    author = make_user("autore")
+    category = Category(name="Mercati", slug="mercati", created_by=author.id)
+    db.session.add(category)
+    db.session.commit()
+    article = Article(title="T", slug="t", content="x", author_id=author.id, category_id=category.id)
+    db.session.add(article)
+    db.session.commit()
+
+    events = [
+        normalize_event({"type": "view", "article_id": article.id}, "a" * 16),
+        normalize_event({"type": "view", "article_id": article.id}, "b" * 16),
+        normalize_event({"type": "share", "article_id": article.id, "platform": "x"}, "a" * 16),
+    ]
+    assert ingest_events(events) == 3
+    # Il drainer ripassa lo stesso blocco dopo un crash
+    assert ingest_events(events) == 0
+
+    db.session.refresh(article)
+    assert article.views_count == 2
+    assert Share.query.filter_by(article_id=article.id).count() == 1
+    assert PageViewEvent.query.count() == 3
+
+
+def test_events_endpoint_is_rate_limited(tmp_path):
+    app = create_app("testing", config_overrides={
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/test.db",
+        "REDIS_URL": None,
+        "CACHE_REDIS_URL": None,
+        "RATELIMIT_ENABLED": True,
+        "RATELIMIT_STORAGE_URI": "memory://",
+        "ANALYTICS_EVENT_DIR": str(tmp_path / "events"),
+    })
+    client = app.test_client()
+
+    statuses = [
+        client.post("/api/analytics/events", json={"type": "view", "article_id": 1}).status_code
+        for _ in range(61)
+    ]
+    assert statuses[:60] == [204] * 60
+    assert statuses[60] == 429
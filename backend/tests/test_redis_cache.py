@@ -0,0 +1,34 @@
+"""Numeri di generazione delle cache in-process"""
+from src.utils.redis_cache import bump_generation, cache, get_generation
+
+
+class _FakeRedis:
+    """Solo GET/SET (con NX) su un dizionario"""
+
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, **kwargs):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+
+def test_missing_redis_key_is_filled_from_the_database(app, monkeypatch):
+    bump_generation("username_blacklist")
+    client = _FakeRedis()
+    # Redis svuotato (flush o riavvio) dopo l'ultimo bump
+    monkeypatch.setattr(cache, "redis_client", client)
+
+    assert get_generation("username_blacklist") == 1
+    assert client.data["generation:username_blacklist"] == b"1"
+
+    # Un bump successivo non viene sovrascritto dal valore ricopiato
+    bump_generation("username_blacklist")
+    assert get_generation("username_blacklist") == 2
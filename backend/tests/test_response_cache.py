@@ -0,0 +1,57 @@
+"""Cache stale-while-revalidate delle analytics admin"""
+import time
+
+from src.extensions import db
+from src.models.article import Article
+from src.models.category import Category
+from src.models.like import ArticleLike
+from src.utils.response_cache import cached_payload
+
+from conftest import login
+
+
+def test_stale_entry_is_refreshed_in_background(app):
+    calls = []
+
+    def builder(value):
+        calls.append(value)
+        return {"value": value, "call": len(calls)}
+
+    payload, (state, _) = cached_payload("test", builder, 1, soft_ttl=0)
+    assert (payload["call"], state) == (1, "MISS")
+
+    payload, (state, _) = cached_payload("test", builder, 1, soft_ttl=0)
+    assert (payload["call"], state) == (1, "STALE")
+
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    payload, _ = cached_payload("test", builder, 1, soft_ttl=60)
+    assert payload["call"] == 2
+
+
+def test_dashboard_likes_are_per_admin(app, client, make_user):
+    first = make_user("admin_uno", role="admin")
+    make_user("admin_due", role="admin")
+    category = Category(name="Mercati", slug="mercati", created_by=first.id)
+    db.session.add(category)
+    db.session.commit()
+    article = Article(
+        title="Titolo", slug="titolo", content="Testo", author_id=first.id,
+        category_id=category.id, published=True, trending_score=1.0,
+    )
+    db.session.add(article)
+    db.session.commit()
+    db.session.add(ArticleLike(article_id=article.id, user_id=first.id))
+    db.session.commit()
+
+    login(client, "admin_uno")
+    articles = client.get("/api/analytics/dashboard").get_json()["articles"]
+    assert [a["user_has_liked"] for a in articles] == [True]
+
+    client.post("/api/auth/logout")
+    login(client, "admin_due")
+    response = client.get("/api/analytics/dashboard")
+    assert response.headers["X-Cache"] == "HIT"
+    assert [a["user_has_liked"] for a in response.get_json()["articles"]] == [False]
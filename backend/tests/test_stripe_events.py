@@ -0,0 +1,94 @@
+"""Consumer degli eventi Stripe e creazione della sessione di checkout"""
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import stripe
+from sqlalchemy import text
+
+from src.extensions import db
+from src.models.analytics import AnalyticsDaily
+from src.models.donation import Donation, StripeEvent
+from src.utils import leaderboards
+from src.utils.analytics_rollup import REROLL_DAYS, backfill, rollup_pending
+from src.utils.stripe_events import process_pending, simulated_event, store_event
+
+
+def _store(event):
+    store_event(event["id"], event["type"], json.dumps(event))
+    return event["id"]
+
+
+def test_failing_event_does_not_leak_into_the_batch(app, monkeypatch):
+    first = Donation(amount=10.0, payment_method="card", status="pending", donor_email="a@example.com")
+    second = Donation(amount=20.0, payment_method="card", status="pending", donor_email="b@example.com")
+    db.session.add_all([first, second])
+    db.session.commit()
+    first_id, second_id = first.id, second.id
+
+    record_donation = leaderboards.record_donation
+
+    def failing_record_donation(donation, refund=False):
+        if donation.id == first_id:
+            raise RuntimeError("leaderboard non disponibile")
+        record_donation(donation, refund)
+
+    monkeypatch.setattr(leaderboards, "record_donation", failing_record_donation)
+
+    failed_id = _store(simulated_event(donation_id=first_id))
+    processed_id = _store(simulated_event(donation_id=second_id))
+
+    assert process_pending() == (2, 1)
+    db.session.expire_all()
+
+    # _apply aveva già segnato la prima donazione come completata: il savepoint lo annulla
+    assert db.session.get(Donation, first_id).status == "pending"
+    assert db.session.get(Donation, second_id).status == "completed"
+    assert db.session.get(StripeEvent, failed_id).status == "pending"
+    assert db.session.get(StripeEvent, processed_id).status == "processed"
+
+
+def test_completion_on_closed_day_is_rolled_up_again(app):
+    created_at = datetime.utcnow() - timedelta(days=REROLL_DAYS + 10)
+    day = created_at.date()
+    donation = Donation(amount=25.0, payment_method="card", status="pending", created_at=created_at)
+    db.session.add(donation)
+    db.session.commit()
+
+    backfill(day)
+    _store(simulated_event(amount=25.0, donation_id=donation.id))
+    process_pending()
+    rollup_pending()
+
+    row = AnalyticsDaily.query.filter_by(day=day, metric="revenue", dimension="site", entity_id=0).one()
+    assert row.value == 25.0
+
+
+def test_pending_donation_is_committed_before_calling_stripe(app, client, monkeypatch):
+    seen = []
+
+    def create(**params):
+        # Connessione separata: vede solo ciò che è già stato committato
+        with db.engine.connect() as connection:
+            seen.append(connection.execute(
+                text("SELECT status FROM donations WHERE id = :id"), {"id": int(params["client_reference_id"])}
+            ).scalar())
+        return SimpleNamespace(id="cs_test_1", url="https://checkout.stripe.test/cs_test_1")
+
+    monkeypatch.setattr(stripe.checkout.Session, "create", create)
+
+    response = client.post("/api/stripe/create-checkout-session", json={"amount": 5, "paymentMethod": "card"})
+    assert response.status_code == 200
+    assert seen == ["pending"]
+    assert Donation.query.one().transaction_id == "cs_test_1"
+
+
+def test_donation_is_failed_when_stripe_rejects_the_session(app, client, monkeypatch):
+    def create(**params):
+        raise stripe.StripeError("API non raggiungibile")
+
+    monkeypatch.setattr(stripe.checkout.Session, "create", create)
+
+    response = client.post("/api/stripe/create-checkout-session", json={"amount": 5, "paymentMethod": "card"})
+    assert response.status_code == 500
+    assert Donation.query.one().status == "failed"
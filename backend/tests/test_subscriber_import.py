@@ -0,0 +1,16 @@
+"""Import CSV degli iscritti alla newsletter"""
+import io
+
+from src.models.newsletter import NewsletterSubscriber
+from src.utils.subscriber_import import EMAIL_MAX_LENGTH, import_subscribers
+
+
+def test_addresses_longer_than_the_column_are_invalid(app):
+    too_long = "a" * (EMAIL_MAX_LENGTH - len("@example.com") + 1) + "@example.com"
+    stream = io.BytesIO(f"email\nok@example.com\n{too_long}\n".encode("utf-8"))
+
+    report = import_subscribers(stream)
+
+    assert (report.inserted, report.invalid) == (1, 1)
+    assert report.errors[0]["line"] == 3
+    assert NewsletterSubscriber.query.count() == 1
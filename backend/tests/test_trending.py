@@ -0,0 +1,46 @@
+"""Forward decay del trending: spostamento periodico dell'epoca"""
+import math
+from datetime import datetime, timedelta
+
+from src.extensions import db
+from src.models.article import Article
+from src.models.category import Category
+from src.utils.trending import bump_trending, current_score, decay_factor, rebase_trending
+
+
+def test_rebase_keeps_scores_and_bounds_the_multiplier(app, make_user):
+    author = make_user("autore")
+    category = Category(name="Mercati", slug="mercati", created_by=author.id)
+    db.session.add(category)
+    db.session.commit()
+    old = Article(title="A", slug="a", content="x", author_id=author.id, category_id=category.id)
+    new = Article(title="B", slug="b", content="x", author_id=author.id, category_id=category.id)
+    db.session.add_all([old, new])
+    db.session.commit()
+
+    now = datetime.utcnow()
+    bump_trending(old.id, "comment", at=now - timedelta(days=3))
+    bump_trending(new.id, "like", at=now)
+    db.session.commit()
+    # Epoca di default (2025-01-01): moltiplicatore già enorme
+    assert decay_factor(now) > 2.0 ** 100
+    before = {article.id: current_score(article.trending_score, now) for article in (old, new)}
+
+    assert rebase_trending(now) > 0
+    assert rebase_trending(now) == 0
+    db.session.expire_all()
+
+    assert decay_factor(now) <= 2.0
+    for article in (old, new):
+        article = db.session.get(Article, article.id)
+        assert math.isclose(current_score(article.trending_score, now), before[article.id], rel_tol=1e-9)
+
+    # Gli eventi dopo lo spostamento usano la nuova epoca
+    bump_trending(old.id, "like", at=now)
+    db.session.commit()
+    db.session.expire_all()
+    assert math.isclose(
+        current_score(db.session.get(Article, old.id).trending_score, now),
+        before[old.id] + 3.0,
+        rel_tol=1e-9,
+    )
@@ -0,0 +1,67 @@
+"""Upload dell'avatar: avatar_url cambia solo a conversione completata"""
+import io
+
+from PIL import Image
+
+from conftest import login
+from src.extensions import db
+from src.models.user import User
+from src.routes import upload as upload_routes
+from src.utils import image_jobs
+from src.utils.convert_img import job_paths, process_job, write_json_atomic
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "navy").save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def _upload(client):
+    response = client.post("/api/upload/avatar", data={"avatar": (_png(), "me.png")})
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()
+
+
+def test_avatar_is_set_only_when_the_job_is_ready(app, client, make_user, monkeypatch, tmp_path):
+    folder = str(tmp_path / "uploads")
+    monkeypatch.setattr(image_jobs, "uploads_folder", lambda: folder)
+    monkeypatch.setattr(upload_routes, "uploads_folder", lambda: folder)
+    monkeypatch.setattr(image_jobs, "dispatch", lambda job_id: None)
+    user_id = make_user("mario").id
+    login(client, "mario")
+
+    staged = _upload(client)
+    assert "avatar_url" not in staged
+    assert db.session.get(User, user_id).avatar_url is None
+
+    # Conversione ancora in corso: nessun avatar da confermare
+    assert client.put(f"/api/upload/avatar/{staged['token']}").status_code == 409
+
+    assert process_job(folder, staged["token"]) == "ready"
+    response = client.put(f"/api/upload/avatar/{staged['token']}")
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, user_id).avatar_url == response.get_json()["avatar_url"]
+    assert response.get_json()["avatar_url"] == "/static/uploads/avatars/profile_img_mario.webp"
+
+
+def test_failed_conversion_keeps_the_previous_avatar(app, client, make_user, monkeypatch, tmp_path):
+    folder = str(tmp_path / "uploads")
+    monkeypatch.setattr(image_jobs, "uploads_folder", lambda: folder)
+    monkeypatch.setattr(upload_routes, "uploads_folder", lambda: folder)
+    monkeypatch.setattr(image_jobs, "dispatch", lambda job_id: None)
+    user = make_user("mario")
+    user.avatar_url = "/static/uploads/avatars/vecchio.webp"
+    db.session.commit()
+    login(client, "mario")
+
+    staged = _upload(client)
+    write_json_atomic(job_paths(folder, staged["token"])["error"], {"error": "immagine troncata"})
+
+    response = client.put(f"/api/upload/avatar/{staged['token']}")
+    assert response.status_code == 422
+    assert response.get_json()["error"] == "immagine troncata"
+    db.session.expire_all()
+    assert db.session.get(User, user.id).avatar_url == "/static/uploads/avatars/vecchio.webp"
@@ -4,7 +4,9 @@ import {Clock} from 'lucide-react';
 import {differenceInDays, format, formatDistanceToNow} from 'date-fns';
 import ArticleActions from './ArticleActions.jsx';
 import FadeInOnScroll from './FadeInOnScroll.jsx';
+import OptimizedImage from './OptimizedImage.jsx';
 import {cn} from '../lib/utils';
+import {CARD_IMAGE_SIZES} from '../lib/images';
 
 const formatDate = (dateString) => {
   try {
@@ -47,10 +49,14 @@ const ArticleCard = ({ article, variant = 'standard', className, delay = 0 }) =>
           'h-[165px]': variant === 'small',
         })}
       >
-        <img
+        <OptimizedImage
           src={article.image_url || placeholderImage}
           alt={article.title}
-          className="w-full h-full object-cover transition-transform duration-400 ease-[cubic-bezier(0.16,1,0.3,1)] group-hover:scale-105"
+          variants={article.image_variants}
+          sizes={CARD_IMAGE_SIZES[variant]}
+          priority={variant === 'hero'}
+          className="w-full h-full"
+          imgClassName="transition-[opacity,transform] duration-400 ease-[cubic-bezier(0.16,1,0.3,1)] group-hover:scale-105"
         />
       </div>
       <div
@@ -84,7 +84,8 @@ const ImageUploader = ({
         const backendUrl = import.meta.env.VITE_API_BASE_URL;
         const fullImageUrl = backendUrl + data.url;
 
-        setPreviewUrl(fullImageUrl);
+        // La versione ottimizzata è generata in background: anteprima dall'originale
+        setPreviewUrl(backendUrl + (data.preview_url || data.url));
         onImageUploaded?.(fullImageUrl);
 
         toast.success('Immagine caricata con successo!');
@@ -17,6 +17,7 @@ import { Input } from './ui/input';
 import { Badge } from './ui/badge';
 import UserActivityLog from './UserActivityLog';
 import AdminFilterPanel from './AdminFilterPanel';
+import { useDebounce } from '../hooks/useDebounce';
 
 const ModerationSection = () => {
   const [users, setUsers] = useState([]);
@@ -27,15 +28,24 @@ const ModerationSection = () => {
   const [roleFilter, setRoleFilter] = useState('all');
   const [selectedUser, setSelectedUser] = useState(null);
   const [showActivityLog, setShowActivityLog] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const debouncedSearch = useDebounce(searchQuery.trim());
 
+  // Filtri e ordinamento sono applicati dal server: a ogni cambio si riparte dalla prima pagina
   useEffect(() => {
     fetchUsers();
-  }, []);
+  }, [debouncedSearch, roleFilter, sortConfig]);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
-      console.log('🔍 Fetching users from /api/moderation/users');
-      const response = await fetch('/api/moderation/users', {
+      const params = new URLSearchParams({ sort: sortConfig.key, direction: sortConfig.direction });
+      if (roleFilter !== 'all') params.set('role', roleFilter);
+      if (debouncedSearch) params.set('q', debouncedSearch);
+      if (cursor) params.set('cursor', cursor);
+      const url = `/api/moderation/users?${params}`;
+      console.log('🔍 Fetching users from', url);
+      const response = await fetch(url, {
         credentials: 'include',
       });
       
@@ -45,7 +55,9 @@ const ModerationSection = () => {
         const data = await response.json();
         console.log('✅ Users data received:', data);
         console.log('👥 Number of users:', data.users?.length);
-        setUsers(data.users || []);
+        // Paginazione keyset: le pagine successive si accodano a quelle già caricate
+        setUsers((prev) => (cursor ? [...prev, ...(data.users || [])] : data.users || []));
+        setNextCursor(data.next_cursor || null);
       } else {
         const errorText = await response.text();
         console.error('❌ API Error:', response.status, errorText);
@@ -57,6 +69,13 @@ const ModerationSection = () => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchUsers(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleSort = (key) => {
     let direction = 'asc';
     if (sortConfig.key === key && sortConfig.direction === 'asc') {
@@ -65,68 +84,6 @@ const ModerationSection = () => {
     setSortConfig({ key, direction });
   };
 
-  const getSortedAndFilteredUsers = () => {
-    let filtered = [...users];
-
-    // Filtro per ricerca
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(user => 
-        user.username?.toLowerCase().includes(query) ||
-        user.email?.toLowerCase().includes(query) ||
-        user.first_name?.toLowerCase().includes(query) ||
-        user.last_name?.toLowerCase().includes(query)
-      );
-    }
-
-    // Filtro per ruolo
-    if (roleFilter !== 'all') {
-      filtered = filtered.filter(user => user.role === roleFilter);
-    }
-
-    // Ordinamento
-    if (!sortConfig.key) return filtered;
-
-    const sorted = filtered.sort((a, b) => {
-      let aValue, bValue;
-
-      switch (sortConfig.key) {
-        case 'created_at':
-          aValue = new Date(a.created_at);
-          bValue = new Date(b.created_at);
-          break;
-        case 'username':
-          aValue = (a.username || '').toLowerCase();
-          bValue = (b.username || '').toLowerCase();
-          break;
-        case 'email':
-          aValue = (a.email || '').toLowerCase();
-          bValue = (b.email || '').toLowerCase();
-          break;
-        case 'reports':
-          aValue = a.reports_count || 0;
-          bValue = b.reports_count || 0;
-          break;
-        case 'role':
-          aValue = a.role || '';
-          bValue = b.role || '';
-          break;
-        default:
-          return 0;
-      }
-
-      if (aValue < bValue) {
-        return sortConfig.direction === 'asc' ? -1 : 1;
-      }
-      if (aValue > bValue) {
-        return sortConfig.direction === 'asc' ? 1 : -1;
-      }
-      return 0;
-    });
-
-    return sorted;
-  };
-
   const getSortIcon = (columnKey) => {
     if (sortConfig.key !== columnKey) {
       return <ArrowUpDown className="w-[0.875rem] h-[0.875rem] opacity-50" />;
@@ -280,14 +237,14 @@ const ModerationSection = () => {
                 </tr>
               </thead>
               <tbody className="divide-y divide-input-gray">
-                {getSortedAndFilteredUsers().length === 0 ? (
+                {users.length === 0 ? (
                   <tr>
                     <td colSpan="6" className="text-center py-[3rem] text-gray">
                       No users found
                     </td>
                   </tr>
                 ) : (
-                  getSortedAndFilteredUsers().map((user) => (
+                  users.map((user) => (
                     <tr
                       key={user.id}
                       className="hover:bg-light-gray/30 transition-colors"
@@ -365,6 +322,14 @@ const ModerationSection = () => {
               </tbody>
             </table>
           </div>
+
+          {nextCursor && (
+            <div className="flex justify-center py-[1rem]">
+              <Button variant="outline" size="sm" onClick={loadMoreUsers} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more users'}
+              </Button>
+            </div>
+          )}
         </div>
       </div>
 
@@ -5,6 +5,8 @@ import React from 'react';
 import { Link } from 'react-router-dom';
 import { Clock } from 'lucide-react';
 import { cn } from '../lib/utils';
+import { CARD_IMAGE_SIZES } from '../lib/images';
+import OptimizedImage from './OptimizedImage';
 
 const NewsCard = ({
   article,
@@ -45,10 +47,14 @@ const NewsCard = ({
       className={cn(baseClasses, variantClasses[variant], className)}
     >
       <div className={cn("overflow-hidden bg-white relative", mediaClasses[variant])}>
-        <img
+        <OptimizedImage
           src={article.image_url}
           alt={article.title}
-          className="w-full h-full object-cover transition-transform duration-[400ms] ease-[cubic-bezier(0.16,1,0.3,1)] hover:scale-[1.04]"
+          variants={article.image_variants}
+          sizes={CARD_IMAGE_SIZES[variant]}
+          priority={variant === 'hero'}
+          className="w-full h-full"
+          imgClassName="transition-[opacity,transform] duration-[400ms] ease-[cubic-bezier(0.16,1,0.3,1)] hover:scale-[1.04]"
         />
       </div>
 
@@ -1,13 +1,18 @@
 // LitInvestorBlog-frontend/src/components/OptimizedImage.jsx
 
 import { useState } from 'react';
+import { variantSources } from '../lib/images';
+import { cn } from '../lib/utils';
 
 const OptimizedImage = ({
   src,
   alt,
   width,
   height,
+  variants,
+  sizes = '100vw',
   className = '',
+  imgClassName = '',
   priority = false,
 }) => {
   const [loaded, setLoaded] = useState(false);
@@ -29,20 +34,29 @@ const OptimizedImage = ({
     );
   }
 
+  // Varianti responsive (manifest image_variants): il browser sceglie il file più piccolo adeguato
+  const sources = variantSources(variants);
+
   return (
     <div className={`relative overflow-hidden ${className}`}>
       {!loaded && <div className="absolute inset-0 bg-gray-200 animate-pulse" />}
-      <img
-        src={optimizeSrc(src)}
-        alt={alt}
-        width={width}
-        height={height}
-        loading={priority ? 'eager' : 'lazy'}
-        decoding="async"
-        onLoad={() => setLoaded(true)}
-        onError={() => setError(true)}
-        className={`w-full h-full object-cover transition-opacity duration-300 ${loaded ? 'opacity-100' : 'opacity-0'}`}
-      />
+      <picture>
+        {sources.map((source) => (
+          <source key={source.type} type={source.type} srcSet={source.srcSet} sizes={sizes} />
+        ))}
+        <img
+          src={variants?.src || optimizeSrc(src)}
+          alt={alt}
+          width={width ?? variants?.width}
+          height={height ?? variants?.height}
+          loading={priority ? 'eager' : 'lazy'}
+          fetchpriority={priority ? 'high' : undefined}
+          decoding="async"
+          onLoad={() => setLoaded(true)}
+          onError={() => setError(true)}
+          className={cn('w-full h-full object-cover transition-opacity duration-300', loaded ? 'opacity-100' : 'opacity-0', imgClassName)}
+        />
+      </picture>
     </div>
   );
 };
@@ -34,26 +34,39 @@ import {
   FunctionSquare,
 } from 'lucide-react';
 import { toast } from 'sonner';
+import { waitForUpload } from '../utils/uploads';
 
 const RichTextEditor = ({
   value = '',
   onChange,
   placeholder = 'Scrivi il tuo articolo...',
   height = '400px',
+  slug = '',
 }) => {
   const [content, setContent] = useState(value);
   const [activeTab, setActiveTab] = useState('edit');
   const textareaRef = useRef(null);
   const imageInputRef = useRef(null);
+  // Contenuto aggiornato, letto al termine dell'elaborazione in background
+  const contentRef = useRef(value);
 
   const handleImageUpload = async (e) => {
     const file = e.target.files?.[0];
     if (!file) return;
 
+    if (!slug) {
+      toast.error('Inserisci il titolo prima di caricare immagini');
+      imageInputRef.current.value = '';
+      return;
+    }
+
     const toastId = toast.loading('Caricamento immagine in corso...');
 
     const formData = new FormData();
     formData.append('image', file);
+    formData.append('slug', slug);
+    formData.append('image_type', 'content');
+    formData.append('index', Date.now());
 
     try {
       const response = await fetch('/api/upload/image', {
@@ -69,10 +82,22 @@ const RichTextEditor = ({
 
       const data = await response.json();
       const backendUrl = 'http://localhost:5000';
+      const previewUrl = backendUrl + data.preview_url;
       const fullImageUrl = backendUrl + data.url;
 
-      const markdownImage = `\n![${file.name}](${fullImageUrl})\n`;
-      insertAtCursor(markdownImage);
+      // Anteprima dall'originale finché la versione WebP non è pronta
+      const markdownImage = `![${file.name}](${previewUrl})`;
+      insertAtCursor(`\n${markdownImage}\n`);
+      toast.loading('Ottimizzazione immagine in corso...', { id: toastId });
+
+      try {
+        await waitForUpload(data.token);
+      } catch (error) {
+        // L'originale viene rimosso anche in caso di errore: niente link rotti
+        handleContentChange(contentRef.current.split(markdownImage).join(''));
+        throw error;
+      }
+      handleContentChange(contentRef.current.split(previewUrl).join(fullImageUrl));
 
       toast.success('Immagine caricata con successo!', { id: toastId });
     } catch (error) {
@@ -89,7 +114,12 @@ const RichTextEditor = ({
     setContent(value);
   }, [value]);
 
+  useEffect(() => {
+    contentRef.current = content;
+  }, [content]);
+
   const handleContentChange = (newContent) => {
+    contentRef.current = newContent;
     setContent(newContent);
     onChange?.(newContent);
   };
@@ -126,8 +156,9 @@ const RichTextEditor = ({
     const start = textarea.selectionStart;
     const end = textarea.selectionEnd;
 
+    const current = contentRef.current;
     const newContent =
-      content.substring(0, start) + text + content.substring(end);
+      current.substring(0, start) + text + current.substring(end);
 
     handleContentChange(newContent);
 
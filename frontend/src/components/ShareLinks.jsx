@@ -7,11 +7,12 @@ import React, { useState, useEffect } from 'react';
 import { Linkedin, Mail, Link, Check, Share2 } from 'lucide-react';
 import { toast } from 'sonner';
 import { SiX } from 'react-icons/si';
+import { sendAnalyticsEvents } from '../utils/analytics';
 
 // --- MODIFICA: Breakpoint definito in rem (768px / 16px = 48rem) ---
 const MOBILE_BREAKPOINT_REM = 48;
 
-const ShareLinks = ({ articleTitle }) => {
+const ShareLinks = ({ articleTitle, articleId }) => {
   const [copied, setCopied] = useState(false);
   const [isMobileView, setIsMobileView] = useState(false);
   const [isNativeShareSupported, setIsNativeShareSupported] = useState(false);
@@ -58,7 +59,12 @@ const ShareLinks = ({ articleTitle }) => {
     },
   ];
 
+  const trackShare = (platform) => {
+    if (articleId) sendAnalyticsEvents([{ type: 'share', article_id: articleId, platform }]);
+  };
+
   const copyLink = () => {
+    trackShare('link');
     navigator.clipboard
       .writeText(pageUrl)
       .then(() => {
@@ -79,6 +85,7 @@ const ShareLinks = ({ articleTitle }) => {
         text: `Check out this article: ${articleTitle}`,
         url: pageUrl,
       });
+      trackShare('native');
     } catch (error) {
       console.log('Share action cancelled or failed', error);
     }
@@ -107,6 +114,7 @@ const ShareLinks = ({ articleTitle }) => {
           href={option.url}
           target="_blank"
           rel="noopener noreferrer"
+          onClick={() => trackShare(option.name.toLowerCase())}
           aria-label={`Share on ${option.name}`}
           className="p-[0.5rem] rounded-full text-dark-gray hover:text-blue-600 transition-colors flex items-center justify-center"
         >
@@ -2,6 +2,9 @@
 
 import { useState, useEffect } from 'react';
 
+// Punti massimi per serie nei grafici (il backend riduce con LTTB)
+const CHART_MAX_POINTS = 120;
+
 export const useAnalytics = (user) => {
   const [analytics, setAnalytics] = useState({
     overview: {
@@ -34,7 +37,7 @@ export const useAnalytics = (user) => {
 
     try {
       const response = await fetch(
-        `/api/analytics/dashboard?range=${timeRange}`,
+        `/api/analytics/dashboard?range=${timeRange}&max_points=${CHART_MAX_POINTS}`,
         {
           credentials: 'include',
         },
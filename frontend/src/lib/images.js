@@ -0,0 +1,28 @@
+// RioCapitalBlog-frontend/src/lib/images.js
+
+// Formati dal più leggero: il browser usa il primo <source> che supporta
+const FORMAT_ORDER = ['image/avif', 'image/webp'];
+
+// Larghezza a schermo delle copertine per variante di card (attributo sizes)
+export const CARD_IMAGE_SIZES = {
+  hero: '(min-width: 768px) 66vw, 100vw',
+  standard: '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw',
+  small: '(min-width: 1024px) 25vw, (min-width: 768px) 50vw, 100vw',
+};
+
+// srcset per un formato dal manifest image_variants restituito dall'API
+export function buildSrcSet(manifest, type = 'image/webp') {
+  if (!manifest?.variants?.length) return undefined;
+  const srcSet = manifest.variants
+    .filter((variant) => variant.type === type)
+    .map((variant) => `${variant.url} ${variant.width}w`)
+    .join(', ');
+  return srcSet || undefined;
+}
+
+// Un <source> per ogni formato presente nel manifest
+export function variantSources(manifest) {
+  return FORMAT_ORDER
+    .map((type) => ({ type, srcSet: buildSrcSet(manifest, type) }))
+    .filter((source) => source.srcSet);
+}
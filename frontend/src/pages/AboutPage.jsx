@@ -122,6 +122,7 @@ const AboutPage = () => {
                   onChange={setEditContent}
                   placeholder="Write your story here..."
                   height="200px"
+                  slug="about"
                 />
               ) : (
                 <div className="article-content">
@@ -16,6 +16,7 @@ import ShareLinks from '../components/ShareLinks';
 import ArticleContacts from '../components/ArticleContacts';
 import ArticleActions from '../components/ArticleActions';
 import CommentSection from '../components/CommentSection';
+import { trackArticleView } from '../utils/analytics';
 
 const ArticleDetailPage = () => {
   const {slug} = useParams();
@@ -40,6 +41,9 @@ const ArticleDetailPage = () => {
     if (slug) fetchArticle();
   }, [slug]);
 
+  const articleId = article?.id;
+  useEffect(() => trackArticleView(articleId), [articleId]);
+
   const formatDate = (dateString) => {
     try {
       return format(new Date(dateString), 'd MMMM yyyy', {locale: enUS});
@@ -98,7 +102,7 @@ const ArticleDetailPage = () => {
                 {article.title}
               </h1>
               <div className="flex items-center justify-between my-[1.5rem] sm:my-[2rem] gap-[1rem]">
-                <ShareLinks articleTitle={article.title}/>
+                <ShareLinks articleTitle={article.title} articleId={article.id}/>
                 {article && (
                     <ArticleActions
                         article={{
@@ -133,7 +137,7 @@ const ArticleDetailPage = () => {
                 Share Article
               </h3>
               <div className="mb-[1.5rem] sm:mb-[2rem]">
-                <ShareLinks articleTitle={article.title}/>
+                <ShareLinks articleTitle={article.title} articleId={article.id}/>
               </div>
             </footer>
 
@@ -12,10 +12,19 @@ import { Alert, AlertDescription } from '../components/ui/alert';
 import { SelectCustom } from '../components/ui/select-custom';
 import { Dropdown } from '../components/ui/dropdown';
 import RichTextEditor from '../components/RichTextEditor';
+import { waitForUpload } from '../utils/uploads';
 import { marked } from 'marked';
 import katex from 'katex';
 import 'katex/dist/katex.min.css';
 
+// Stesse regole di create_slug nel backend (routes/articles.py)
+const createSlug = (title) =>
+  title
+    .toLowerCase()
+    .replace(/[^\p{L}\p{N}_\s-]/gu, '')
+    .replace(/[-\s]+/g, '-')
+    .replace(/^-+|-+$/g, '');
+
 const ArticleEditorPage = () => {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -25,6 +34,7 @@ const ArticleEditorPage = () => {
   const [showPreview, setShowPreview] = useState(false);
 
   const originalContentRef = useRef(''); // Nuovo: per il confronto delle immagini
+  const [savedSlug, setSavedSlug] = useState(''); // Slug dell'articolo esistente
 
   const [formData, setFormData] = useState({
     title: '',
@@ -80,6 +90,7 @@ const ArticleEditorPage = () => {
             // ... campi SEO se presenti nel DB
           });
           originalContentRef.current = article.content || '';
+          setSavedSlug(article.slug || '');
         } catch (error) {
           toast.error(error.message);
           navigate('/admin/articles');
@@ -93,6 +104,9 @@ const ArticleEditorPage = () => {
     loadData();
   }, [id, navigate]);
 
+  // Cartella delle immagini: slug salvato o, per un nuovo articolo, dal titolo
+  const articleSlug = savedSlug || createSlug(formData.title);
+
   const handleInputChange = (e) => {
     const { name, value } = e.target;
     setFormData(prev => ({ ...prev, [name]: value }));
@@ -195,15 +209,20 @@ const ArticleEditorPage = () => {
   const handleImageUpload = async (e) => {
     const file = e.target.files[0];
     if (!file) return;
+    if (!articleSlug) {
+      toast.error('Enter a title before uploading the cover image.');
+      e.target.value = '';
+      return;
+    }
 
     const previewUrl = URL.createObjectURL(file);
     setFormData(prev => ({ ...prev, image_url: previewUrl }));
 
+    // Lo slug decide la cartella; 'cover' genera anche le varianti responsive
     const uploadData = new FormData();
     uploadData.append('image', file);
-    // Se stai creando un nuovo articolo, non hai uno slug.
-    // L'API deve gestire questo caso o devi passare un ID temporaneo.
-    // Per ora, presumiamo che l'API non richieda lo slug per l'upload.
+    uploadData.append('slug', articleSlug);
+    uploadData.append('image_type', 'cover');
 
     try {
       const response = await fetch('/api/upload/image', {
@@ -212,11 +231,15 @@ const ArticleEditorPage = () => {
       });
       const result = await response.json();
       if (!response.ok) throw new Error(result.error);
+      // URL finale solo quando la conversione in background è completata
+      await waitForUpload(result.token);
       setFormData(prev => ({ ...prev, image_url: result.url }));
       toast.success('Cover image uploaded.');
     } catch (error) {
       toast.error(`Image upload failed: ${error.message}`);
       setFormData(prev => ({ ...prev, image_url: '' }));
+    } finally {
+      URL.revokeObjectURL(previewUrl);
     }
   };
 
@@ -450,6 +473,7 @@ const ArticleEditorPage = () => {
                 }}
                 placeholder="Write your article content..."
                 height="500px"
+                slug={articleSlug}
               />
               {errors.content && <p className="text-sm text-red">{errors.content}</p>}
             </div>
@@ -16,6 +16,7 @@ import {
 import { toast } from 'sonner';
 import UserAvatar from '../components/ui/UserAvatar';
 import RoleBadge from '../components/ui/RoleBadge';
+import { waitForUpload } from '../utils/uploads';
 
 const ProfilePage = () => {
   const { user, setUser, updateProfile } = useAuth();
@@ -75,11 +76,36 @@ const ProfilePage = () => {
         body: uploadData,
       });
       const result = await response.json();
-      if (response.ok) {
+      if (!response.ok) {
+        toast.error(result.error || 'Upload failed.');
+        setAvatarPreview(user.avatar_url || null);
+        return;
+      }
+
+      // Anteprima dall'originale finché la versione WebP non è pronta
+      setAvatarPreview(result.preview_url);
+      try {
+        await waitForUpload(result.token);
+      } catch (error) {
+        toast.error(error.message || 'Avatar processing failed.');
+        setAvatarPreview(user.avatar_url || null);
+        return;
+      }
+
+      // Solo ora l'avatar viene salvato sul profilo
+      const confirmResponse = await fetch(`/api/upload/avatar/${result.token}`, {
+        method: 'PUT',
+      });
+      const confirmed = await confirmResponse.json();
+      if (confirmResponse.ok) {
         toast.success('Avatar updated successfully!');
-        setUser(prevUser => ({ ...prevUser, avatar_url: result.avatar_url }));
+        // Stesso URL per ogni avatar dell'utente: il token evita la copia in cache
+        setUser(prevUser => ({
+          ...prevUser,
+          avatar_url: `${confirmed.avatar_url}?v=${result.token}`,
+        }));
       } else {
-        toast.error(result.error || 'Upload failed.');
+        toast.error(confirmed.error || 'Upload failed.');
         setAvatarPreview(user.avatar_url || null);
       }
     } catch (error) {
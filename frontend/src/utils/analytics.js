@@ -41,3 +41,73 @@ export const initAnalytics = (measurementId) => {
     window.addEventListener('load', () => setTimeout(loadGA, 2000));
   }
 };
+
+// --- Beacon analytics interno (/api/analytics/events) ---
+
+const VISITOR_KEY = 'lit_visitor_id';
+
+const getVisitorId = () => {
+  try {
+    let id = window.localStorage.getItem(VISITOR_KEY);
+    if (!id) {
+      id = window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+      window.localStorage.setItem(VISITOR_KEY, id);
+    }
+    return id;
+  } catch {
+    return undefined;
+  }
+};
+
+export const sendAnalyticsEvents = (events) => {
+  if (typeof window === 'undefined' || !events.length) return;
+
+  const body = JSON.stringify({ visitor_id: getVisitorId(), events });
+  // sendBeacon sopravvive alla chiusura della pagina; text/plain evita il preflight CORS
+  if (navigator.sendBeacon && navigator.sendBeacon('/api/analytics/events', new Blob([body], { type: 'text/plain' }))) {
+    return;
+  }
+  fetch('/api/analytics/events', { method: 'POST', body, keepalive: true }).catch(() => {});
+};
+
+// Registra la visualizzazione e, all'uscita, il tempo di lettura dell'articolo.
+// Restituisce la funzione di cleanup da usare nello useEffect.
+export const trackArticleView = (articleId) => {
+  if (typeof window === 'undefined' || !articleId) return () => {};
+
+  sendAnalyticsEvents([{ type: 'view', article_id: articleId }]);
+
+  let visibleSince = document.visibilityState === 'visible' ? Date.now() : null;
+  let readMs = 0;
+  let sent = false;
+
+  const flushRead = () => {
+    if (visibleSince) {
+      readMs += Date.now() - visibleSince;
+      visibleSince = null;
+    }
+    const seconds = Math.round(readMs / 1000);
+    if (!sent && seconds > 0) {
+      sent = true;
+      sendAnalyticsEvents([{ type: 'read', article_id: articleId, seconds }]);
+    }
+  };
+
+  const onVisibilityChange = () => {
+    if (document.visibilityState === 'visible') {
+      visibleSince = Date.now();
+    } else if (visibleSince) {
+      readMs += Date.now() - visibleSince;
+      visibleSince = null;
+    }
+  };
+
+  document.addEventListener('visibilitychange', onVisibilityChange);
+  window.addEventListener('pagehide', flushRead);
+
+  return () => {
+    document.removeEventListener('visibilitychange', onVisibilityChange);
+    window.removeEventListener('pagehide', flushRead);
+    flushRead();
+  };
+};
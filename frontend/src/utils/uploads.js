@@ -0,0 +1,34 @@
+// LitInvestorBlog-frontend/src/utils/uploads.js
+
+// Gli upload rispondono subito con anteprima e token: la versione WebP
+// è generata in background e il suo stato si legge da /api/upload/status.
+const POLL_INTERVAL_MS = 1000;
+const POLL_TIMEOUT_MS = 120000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const waitForUpload = async (
+  token,
+  { interval = POLL_INTERVAL_MS, timeout = POLL_TIMEOUT_MS } = {},
+) => {
+  const deadline = Date.now() + timeout;
+
+  while (Date.now() < deadline) {
+    const response = await fetch(`/api/upload/status/${token}`, {
+      credentials: 'include',
+    });
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(data.error || 'Stato del caricamento non disponibile');
+    }
+    if (data.status === 'ready') return;
+    if (data.status === 'failed') {
+      throw new Error(data.error || 'Elaborazione immagine non riuscita');
+    }
+
+    await sleep(interval);
+  }
+
+  throw new Error('Elaborazione immagine non completata in tempo');
+};